@@ -0,0 +1,74 @@
+"""Benchmark :mod:`nirum.cbor` against JSON in payload size, and in time to
+encode values into payloads and to decode payloads back into values.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`)::
+
+    python benchmarks/cbor.py
+
+"""
+from __future__ import print_function
+
+import datetime
+import decimal
+import timeit
+import typing
+import uuid
+
+from fixture import Location, Offset, Point, Rectangle, Shape
+from six import text_type
+
+from nirum.cbor import deserialize_cbor, serialize_cbor
+from nirum.deserialize import deserialize_json
+from nirum.serialize import serialize_json
+
+
+def main(size=20000, repeat=5):
+    shapes = [
+        Rectangle(upper_left=Point(left=Offset(i * 1.5), top=Offset(-i * 1.5)),
+                  lower_right=Point(left=Offset(-i * 1.5),
+                                    top=Offset(i * 1.5)))
+        for i in range(size)
+    ]
+    locations = [
+        Location(name=text_type(i), lat=decimal.Decimal('37.5665'),
+                 lng=decimal.Decimal('126.9780'))
+        for i in range(size)
+    ]
+    primitives = [
+        [uuid.uuid4(), datetime.date(2016, 8, 5) + datetime.timedelta(i)]
+        for i in range(size)
+    ]
+    cases = [
+        ('shapes', typing.Sequence[Shape], shapes),
+        ('locations', typing.Sequence[Location], locations),
+        ('primitives', typing.Sequence[typing.Sequence[object]], primitives),
+    ]
+    print('{0} values each'.format(size))
+    print('{0:>10}  {1:>5}  {2:>10}  {3:>9}  {4:>9}'.format(
+        'case', 'codec', 'size', 'encode', 'decode'
+    ))
+    for name, cls, value in cases:
+        for codec, encode, decode in [
+            ('json', serialize_json, deserialize_json),
+            ('cbor', serialize_cbor, deserialize_cbor),
+        ]:
+            payload = encode(value)
+            encoding = min(timeit.repeat(lambda: encode(value),
+                                         number=1, repeat=repeat))
+            if name == 'primitives':
+                # Sequence[object] can't be deserialized; the size and
+                # encoding are what matter here.
+                decoding = '-'
+            else:
+                assert list(decode(cls, payload)) == value
+                decoding = '{0:.4f}s'.format(min(timeit.repeat(
+                    lambda: decode(cls, payload), number=1, repeat=repeat
+                )))
+            print('{0:>10}  {1:>5}  {2:>8} B  {3:>8.4f}s  {4:>9}'.format(
+                name, codec, len(payload), encoding, decoding
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark cold-start time and time to deserialize the first values in
+a fresh process, with and without :func:`nirum.deserialize.precompile()`
+at startup.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`)::
+
+    python benchmarks/cold_start.py
+
+"""
+from __future__ import print_function
+
+import json
+import subprocess
+import sys
+
+SCRIPT = '''
+import json, sys, timeit
+start = timeit.default_timer()
+import fixture
+from nirum.deserialize import deserialize_meta, precompile
+if sys.argv[1] == 'precompile':
+    precompile(fixture)
+ready = timeit.default_timer()
+deserialize_meta(fixture.Shape, {
+    '_type': 'shape', '_tag': 'rectangle',
+    'upper_left': {'_type': 'point', 'x': 1.0, 'top': 2.0},
+    'lower_right': {'_type': 'point', 'x': 3.0, 'top': 4.0},
+})
+deserialize_meta(fixture.Location, {
+    '_type': 'location', 'name': None, 'lat': '3.14', 'lng': '1.59',
+})
+first = timeit.default_timer()
+print(json.dumps([ready - start, first - ready]))
+'''
+
+
+def measure(mode, repeat):
+    results = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', SCRIPT, mode]
+        )
+        results.append(json.loads(output.decode('utf-8')))
+    return min(r[0] for r in results), min(r[1] for r in results)
+
+
+def main(repeat=5):
+    print('{0:>10}  {1:>10}  {2:>14}'.format(
+        'mode', 'startup', 'first values'
+    ))
+    for mode in 'lazy', 'precompile':
+        startup, first = measure(mode, repeat)
+        print('{0:>10}  {1:>9.4f}s  {2:>13.4f}s'.format(mode, startup, first))
+
+
+if __name__ == '__main__':
+    main()
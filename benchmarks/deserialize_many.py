@@ -0,0 +1,41 @@
+"""Benchmark :func:`nirum.deserialize.deserialize_many()` against a loop of
+:func:`nirum.deserialize.deserialize_meta()` calls.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`)::
+
+    python benchmarks/deserialize_many.py
+
+"""
+from __future__ import print_function
+
+import timeit
+
+from fixture import Point
+
+from nirum.deserialize import deserialize_many, deserialize_meta
+
+
+def main(size=10000, repeat=5):
+    values = [
+        {'_type': 'point', 'x': float(i), 'top': float(size - i)}
+        for i in range(size)
+    ]
+
+    def loop():
+        return [deserialize_meta(Point, value) for value in values]
+
+    def batch():
+        return deserialize_many(Point, values)
+
+    assert loop() == batch()
+    loop_time = min(timeit.repeat(loop, number=1, repeat=repeat))
+    batch_time = min(timeit.repeat(batch, number=1, repeat=repeat))
+    print('{0} records'.format(size))
+    print('deserialize_meta() loop: {0:.4f}s'.format(loop_time))
+    print('deserialize_many():      {0:.4f}s'.format(batch_time))
+    print('speedup:                 {0:.2f}x'.format(loop_time / batch_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark :func:`nirum.deserialize.deserialize_parallel()` against
+:func:`nirum.deserialize.deserialize_meta()` for growing array sizes, to find
+the crossover point where decoding in worker processes pays off.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`)::
+
+    python benchmarks/deserialize_parallel.py
+
+"""
+from __future__ import print_function
+
+import concurrent.futures
+import multiprocessing
+import timeit
+import typing
+
+from fixture import Point
+
+from nirum.deserialize import deserialize_meta, deserialize_parallel
+
+
+def main(sizes=(1000, 10000, 50000, 100000, 300000), repeat=3):
+    cls = typing.Sequence[Point]
+    workers = multiprocessing.cpu_count()
+    print('{0} workers'.format(workers))
+    print('{0:>8}  {1:>10}  {2:>10}  {3:>7}'.format(
+        'size', 'serial', 'parallel', 'speedup'
+    ))
+    crossover = None
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        # Warm the workers up so that process spawning isn't measured.
+        deserialize_parallel(cls, [], threshold=0, executor=executor)
+        for size in sizes:
+            values = [
+                {'_type': 'point', 'x': float(i), 'top': float(size - i)}
+                for i in range(size)
+            ]
+
+            def serial():
+                return deserialize_meta(cls, values)
+
+            def parallel():
+                return deserialize_parallel(cls, values, threshold=0,
+                                            executor=executor)
+
+            assert serial() == parallel()
+            serial_time = min(timeit.repeat(serial, number=1, repeat=repeat))
+            parallel_time = min(
+                timeit.repeat(parallel, number=1, repeat=repeat)
+            )
+            speedup = serial_time / parallel_time
+            if crossover is None and speedup > 1:
+                crossover = size
+            print('{0:>8}  {1:>9.4f}s  {2:>9.4f}s  {3:>6.2f}x'.format(
+                size, serial_time, parallel_time, speedup
+            ))
+    if crossover is None:
+        print('parallel decoding never paid off')
+    else:
+        print('crossover: around {0} elements'.format(crossover))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark :func:`nirum.serialize.iter_serialize()` against
+:func:`nirum.serialize.serialize_json()`, i.e.,
+:func:`nirum.serialize.serialize_meta()` followed by :func:`json.dumps()`,
+in time and peak memory allocated while encoding.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`), and Python 3.4 or higher for :mod:`tracemalloc`::
+
+    python benchmarks/iter_serialize.py
+
+"""
+from __future__ import print_function
+
+import hashlib
+import timeit
+import tracemalloc
+
+from fixture import Offset, Point, Rectangle
+from six import text_type
+
+from nirum.datastructures import Map
+from nirum.serialize import iter_serialize, serialize_json
+
+
+def digest_chunks(chunks):
+    # Consume chunks as a server would send them, without joining them.
+    h = hashlib.sha1()
+    for chunk in chunks:
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def measure(encode, repeat):
+    elapsed = min(timeit.repeat(encode, number=1, repeat=repeat))
+    tracemalloc.start()
+    try:
+        result = encode()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(size=20000, repeat=5):
+    shapes = [
+        Rectangle(upper_left=Point(left=Offset(i * 1.5), top=Offset(-i * 1.5)),
+                  lower_right=Point(left=Offset(-i * 1.5),
+                                    top=Offset(i * 1.5)))
+        for i in range(size)
+    ]
+    cases = [
+        ('shapes', shapes),
+        ('map', Map((text_type(i), shape.upper_left)
+                    for i, shape in enumerate(shapes))),
+    ]
+    print('{0} values each'.format(size))
+    print('{0:>7}  {1:>20}  {2:>9}  {3:>12}'.format(
+        'case', 'path', 'time', 'peak alloc'
+    ))
+    for name, value in cases:
+        results = []
+        for path, encode in [
+            ('serialize_json()',
+             lambda: digest_chunks([serialize_json(value)])),
+            ('iter_serialize()',
+             lambda: digest_chunks(iter_serialize(value))),
+        ]:
+            result, elapsed, peak = measure(encode, repeat)
+            results.append(result)
+            print('{0:>7}  {1:>20}  {2:>8.4f}s  {3:>8} KiB'.format(
+                name, path, elapsed, peak // 1024
+            ))
+        assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
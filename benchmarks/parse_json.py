@@ -0,0 +1,70 @@
+"""Benchmark :func:`nirum.parser.parse_json()` against
+:func:`nirum.deserialize.deserialize_json()`, i.e., :func:`json.loads()`
+followed by :func:`nirum.deserialize.deserialize_meta()`, in time and
+peak memory allocated while decoding.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`), and Python 3.4 or higher for :mod:`tracemalloc`::
+
+    python benchmarks/parse_json.py
+
+"""
+from __future__ import print_function
+
+import timeit
+import tracemalloc
+import typing
+
+from fixture import Offset, Point, Rectangle, Shape
+from six import text_type
+
+from nirum.deserialize import deserialize_json
+from nirum.parser import parse_json
+from nirum.serialize import serialize_json
+
+
+def measure(decode, repeat):
+    elapsed = min(timeit.repeat(decode, number=1, repeat=repeat))
+    tracemalloc.start()
+    try:
+        result = decode()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(size=20000, repeat=5):
+    shapes = [
+        Rectangle(upper_left=Point(left=Offset(i * 1.5), top=Offset(-i * 1.5)),
+                  lower_right=Point(left=Offset(-i * 1.5),
+                                    top=Offset(i * 1.5)))
+        for i in range(size)
+    ]
+    cases = [
+        ('shapes', typing.Sequence[Shape], shapes),
+        ('map', typing.Mapping[text_type, Point],
+         dict((text_type(i), shape.upper_left)
+              for i, shape in enumerate(shapes))),
+    ]
+    print('{0} values each'.format(size))
+    print('{0:>7}  {1:>20}  {2:>9}  {3:>12}'.format(
+        'case', 'path', 'time', 'peak alloc'
+    ))
+    for name, cls, value in cases:
+        document = serialize_json(value)
+        results = []
+        for path, decode in [
+            ('json + deserialize', lambda: deserialize_json(cls, document)),
+            ('parse_json()', lambda: parse_json(cls, document)),
+        ]:
+            result, elapsed, peak = measure(decode, repeat)
+            results.append(result)
+            print('{0:>7}  {1:>20}  {2:>8.4f}s  {3:>8} KiB'.format(
+                name, path, elapsed, peak // 1024
+            ))
+        assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark :func:`nirum.sharing.serialize_shared()` against
+:func:`nirum.serialize.serialize_json()` for a payload which has the same
+values many times, in payload size, time to encode and decode it, and
+memory allocated by decoded values.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`), and Python 3.4 or higher for :mod:`tracemalloc`::
+
+    python benchmarks/serialize_shared.py
+
+"""
+from __future__ import print_function
+
+import json
+import timeit
+import tracemalloc
+import typing
+
+from fixture import Offset, Point, Rectangle, Shape
+
+from nirum.deserialize import deserialize_json
+from nirum.serialize import serialize_json
+from nirum.sharing import deserialize_shared, serialize_shared
+
+
+def measure_memory(decode):
+    tracemalloc.start()
+    try:
+        value = decode()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, size
+
+
+def main(size=20000, distinct=100, repeat=5):
+    points = [Point(left=Offset(i * 1.5), top=Offset(-i * 1.5))
+              for i in range(distinct)]
+    shapes = [
+        Rectangle(upper_left=points[i % distinct],
+                  lower_right=Point(left=Offset(i * 1.5), top=Offset(0.0)))
+        for i in range(size)
+    ]
+    cls = typing.Sequence[Shape]
+    print('{0} rectangles sharing {1} distinct upper left points'.format(
+        size, distinct
+    ))
+    print('{0:>20}  {1:>10}  {2:>9}  {3:>9}  {4:>12}'.format(
+        'path', 'size', 'encode', 'decode', 'decoded mem'
+    ))
+    for path, encode, decode in [
+        ('serialize_json()', lambda: serialize_json(shapes),
+         lambda payload: deserialize_json(cls, payload)),
+        ('serialize_shared()',
+         lambda: json.dumps(serialize_shared(shapes, cls)),
+         lambda payload: deserialize_shared(cls, json.loads(payload))),
+    ]:
+        payload = encode()
+        encoding = min(timeit.repeat(encode, number=1, repeat=repeat))
+        decoding = min(timeit.repeat(lambda: decode(payload),
+                                     number=1, repeat=repeat))
+        value, memory = measure_memory(lambda: decode(payload))
+        assert list(value) == shapes
+        print('{0:>20}  {1:>8} B  {2:>8.4f}s  {3:>8.4f}s  {4:>8} KiB'.format(
+            path, len(payload), encoding, decoding, memory // 1024
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark memory usage of records deserialized with and without
+:func:`nirum.deserialize.set_text_interning()`, on a dataset where the same
+short strings repeat over and over.
+
+It requires the schema fixture to be built and installed first
+(see also :file:`tox.ini`), and works only on Unix::
+
+    python benchmarks/text_interning.py
+
+"""
+from __future__ import print_function
+
+import subprocess
+import sys
+
+SCRIPT = '''
+import gc, json, os, resource, sys
+
+
+def rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except IOError:  # not Linux; fall back to the peak
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+
+from fixture import Location
+from nirum.deserialize import (deserialize_many, intern_fields,
+                               set_text_interning)
+
+if sys.argv[1] == 'interned':
+    set_text_interning(1024)
+    intern_fields(Location, 'name')
+names = ['KR', 'JP', 'US', 'DE', 'FR', 'GB', 'CN', 'BR', 'IN', 'CA']
+payload = json.dumps([
+    {'_type': 'location', 'name': names[i % len(names)] + '-seoul',
+     'lat': '37.5', 'lng': '127.0'}
+    for i in range(int(sys.argv[2]))
+])
+gc.collect()
+before = rss()
+records = deserialize_many(Location, json.loads(payload))
+del payload
+gc.collect()
+after = rss()
+names = set(id(record.name) for record in records)
+print(after - before, len(names))
+'''
+
+
+def measure(mode, size):
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT, mode, str(size)]
+    )
+    growth, distinct = output.split()
+    return int(growth) // 1024, int(distinct)
+
+
+def main(size=200000):
+    print('{0} records'.format(size))
+    print('{0:>9}  {1:>12}  {2:>14}'.format(
+        'mode', 'RSS growth', 'name objects'
+    ))
+    for mode in 'plain', 'interned':
+        growth, distinct = measure(mode, size)
+        print('{0:>9}  {1:>9} KiB  {2:>14}'.format(mode, growth, distinct))
+
+
+if __name__ == '__main__':
+    main()
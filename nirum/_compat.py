@@ -1,7 +1,12 @@
+import collections
 import datetime
+import threading
 import typing
 
-__all__ = 'utc', 'is_optional_type', 'is_union_type', 'get_union_types'
+__all__ = (
+    'utc', 'is_optional_type', 'is_union_type', 'get_union_types',
+    'lru_cache',
+)
 
 
 try:
@@ -57,3 +62,35 @@ if hasattr(typing.Tuple, '__tuple_params__'):
 else:
     def get_tuple_param_types(type_):
         return type_.__args__
+
+
+try:
+    from functools import lru_cache
+except ImportError:
+    def lru_cache(maxsize=128):
+        """A minimal substitute of :func:`functools.lru_cache()` for
+        Python 2.  Unlike the original, the decorated function can take
+        only a single argument.
+
+        """
+        def decorator(function):
+            cache = collections.OrderedDict()
+            lock = threading.Lock()
+
+            def wrapper(arg):
+                with lock:
+                    try:
+                        value = cache.pop(arg)
+                    except KeyError:
+                        pass
+                    else:
+                        cache[arg] = value
+                        return value
+                value = function(arg)
+                with lock:
+                    cache[arg] = value
+                    if len(cache) > maxsize:
+                        cache.popitem(last=False)
+                return value
+            return wrapper
+        return decorator
@@ -0,0 +1,501 @@
+""":mod:`nirum.cbor` --- Compact binary codec
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A second wire format for the same data model as the JSON serializer,
+based on CBOR (:rfc:`8949`), which is self-describing as JSON is, but more
+compact and cheaper to parse.  Values are encoded into the same structure
+as :func:`nirum.serialize.serialize_meta()` makes (e.g., records are maps
+with ``"_type"``), except that a few primitives are encoded into their
+tagged binary forms:
+
+- :class:`uuid.UUID` into 16 bytes tagged 37,
+- :class:`decimal.Decimal` into a decimal fraction tagged 4,
+- :class:`datetime.datetime` into an RFC 3339 string tagged 0 (naive
+  datetimes into untagged strings instead, since RFC 3339 requires
+  an offset), and
+  :class:`datetime.date` into a full-date string tagged 1004.
+
+:func:`loads()` turns them back into the strings the JSON serializer would
+make, so that decoded values can be deserialized by
+:func:`nirum.deserialize.deserialize_meta()` as they are.
+
+Only definite-length items are supported.
+
+.. versionadded:: 0.6.4
+
+"""
+import codecs
+import datetime
+import decimal
+import operator
+import struct
+import uuid
+import weakref
+
+from six import PY3, binary_type, integer_types, text_type
+from six.moves import range
+
+from .deserialize import deserialize_meta
+from .serialize import (compile_serializer, serialize_meta, _get_cached,
+                        _serialize_collection, _serialize_mapping)
+
+__all__ = 'CONTENT_TYPE', 'deserialize_cbor', 'loads', 'serialize_cbor'
+
+#: (:class:`str`) The media type of CBOR payloads.
+CONTENT_TYPE = 'application/cbor'
+
+_MAJOR_UNSIGNED = 0
+_MAJOR_NEGATIVE = 1
+_MAJOR_BYTES = 2
+_MAJOR_TEXT = 3
+_MAJOR_ARRAY = 4
+_MAJOR_MAP = 5
+_MAJOR_TAG = 6
+
+_TAG_DATETIME = 0
+_TAG_POSITIVE_BIGNUM = 2
+_TAG_NEGATIVE_BIGNUM = 3
+_TAG_DECIMAL_FRACTION = 4
+_TAG_UUID = 37
+_TAG_DATE = 1004
+
+_FALSE = b'\xf4'
+_TRUE = b'\xf5'
+_NULL = b'\xf6'
+_FLOAT32 = 0xfa
+_FLOAT64 = 0xfb
+
+_pack_float32 = struct.Struct('>Bf').pack
+_pack_float64 = struct.Struct('>Bd').pack
+_unpack_float32 = struct.Struct('>f').unpack_from
+_unpack_float64 = struct.Struct('>d').unpack_from
+_unpack_uint16 = struct.Struct('>H').unpack_from
+_unpack_uint32 = struct.Struct('>I').unpack_from
+_unpack_uint64 = struct.Struct('>Q').unpack_from
+_pack_heads = [
+    (0x100, 24, struct.Struct('>BB').pack),
+    (0x10000, 25, struct.Struct('>BH').pack),
+    (0x100000000, 26, struct.Struct('>BI').pack),
+    (0x10000000000000000, 27, struct.Struct('>BQ').pack),
+]
+_utf8_decode = codecs.utf_8_decode
+_DIGITS = '0123456789'
+
+
+_small_heads = [
+    [struct.pack('>B', major << 5 | argument) for argument in range(24)]
+    for major in range(8)
+]
+
+
+def _head(major, argument):
+    if argument < 24:
+        return _small_heads[major][argument]
+    for limit, info, pack in _pack_heads:
+        if argument < limit:
+            return pack(major << 5 | info, argument)
+    raise OverflowError('{0!r} is too large'.format(argument))
+
+
+def _encode_text(data, out):
+    encoded = data.encode('utf-8')
+    out += _head(_MAJOR_TEXT, len(encoded))
+    out += encoded
+
+
+def _encode_bytes_text(data, out):
+    # str on Python 2 is serialized as a text string as the JSON serializer
+    # does.
+    _encode_text(data.decode('utf-8'), out)
+
+
+def _encode_int(data, out):
+    if data >= 0:
+        major, argument = _MAJOR_UNSIGNED, data
+    else:
+        major, argument = _MAJOR_NEGATIVE, -1 - data
+    if argument < 0x10000000000000000:
+        out += _head(major, argument)
+        return
+    tag = _TAG_POSITIVE_BIGNUM if data >= 0 else _TAG_NEGATIVE_BIGNUM
+    digits = bytearray()
+    while argument:
+        digits.append(argument & 0xff)
+        argument >>= 8
+    digits.reverse()
+    out += _head(_MAJOR_TAG, tag)
+    out += _head(_MAJOR_BYTES, len(digits))
+    out += digits
+
+
+def _encode_bool(data, out):
+    out += _TRUE if data else _FALSE
+
+
+def _encode_none(data, out):
+    out += _NULL
+
+
+def _encode_float(data, out):
+    # Floats which single precision represents exactly take 4 bytes less.
+    single = _pack_float32(_FLOAT32, data) if -3.4e38 < data < 3.4e38 else b''
+    if single and _unpack_float32(single, 1)[0] == data:
+        out += single
+    else:
+        out += _pack_float64(_FLOAT64, data)
+
+
+def _encode_array(data, out):
+    out += _head(_MAJOR_ARRAY, len(data))
+    for elem in data:
+        _encode(elem, out)
+
+
+def _encode_object(data, out):
+    out += _head(_MAJOR_MAP, len(data))
+    for key, value in data.items():
+        _encode(key, out)
+        _encode(value, out)
+
+
+_MAP_ITEM_HEAD = _head(_MAJOR_MAP, 2)
+_MAP_KEY = _head(_MAJOR_TEXT, 3) + b'key'
+_MAP_VALUE = _head(_MAJOR_TEXT, 5) + b'value'
+
+
+def _encode_map(data, out):
+    out += _head(_MAJOR_ARRAY, len(data))
+    for key, value in data.items():
+        out += _MAP_ITEM_HEAD
+        out += _MAP_KEY
+        _encode(key, out)
+        out += _MAP_VALUE
+        _encode(value, out)
+
+
+def _encode_uuid(data, out):
+    out += _head(_MAJOR_TAG, _TAG_UUID)
+    out += _head(_MAJOR_BYTES, 16)
+    out += data.bytes
+
+
+def _encode_datetime(data, out):
+    if data.utcoffset() is not None:
+        out += _head(_MAJOR_TAG, _TAG_DATETIME)
+    _encode_text(serialize_meta(data), out)
+
+
+def _encode_date(data, out):
+    out += _head(_MAJOR_TAG, _TAG_DATE)
+    _encode_text(serialize_meta(data), out)
+
+
+def _encode_decimal(data, out):
+    sign, digits, exponent = data.as_tuple()
+    if data.is_finite():
+        mantissa = int(''.join([_DIGITS[digit] for digit in digits]))
+    else:
+        mantissa = 0
+    if not mantissa:
+        # Neither special values nor signed zeros can be decimal fractions.
+        _encode_text(text_type(data), out)
+        return
+    out += _head(_MAJOR_TAG, _TAG_DECIMAL_FRACTION)
+    out += _head(_MAJOR_ARRAY, 2)
+    _encode_int(exponent, out)
+    _encode_int(-mantissa if sign else mantissa, out)
+
+
+def _encode_unboxed_type(data, out):
+    _encode(data.value, out)
+
+
+def _encode_serialized(data, out):
+    # Types serializing themselves in their own ways (e.g., enums, lazy
+    # records) are encoded from what they serialize into.
+    _encode(serialize_meta(data), out)
+
+
+def _compile_fields_encoder(cls):
+    if hasattr(cls, '__nirum_tag__'):
+        header = [
+            ('_type', cls.__nirum_union_behind_name__),
+            ('_tag', cls.__nirum_tag__.value),
+        ]
+        names = cls.__nirum_tag_names__
+    else:
+        header = [('_type', cls.__nirum_record_behind_name__)]
+        names = cls.__nirum_field_names__
+    slots = tuple(cls.__slots__)
+    prefix = bytearray(_head(_MAJOR_MAP, len(header) + len(slots)))
+    for key, value in header:
+        _encode_text(text_type(key), prefix)
+        _encode_text(text_type(value), prefix)
+    prefix = bytes(prefix)
+    keys = []
+    for slot in slots:
+        key = bytearray()
+        _encode_text(text_type(names[slot] if slot in names else slot), key)
+        keys.append(bytes(key))
+    if len(slots) > 1:
+        get_values = operator.attrgetter(*slots)
+    elif slots:
+        get_value = operator.attrgetter(slots[0])
+
+        def get_values(data):
+            return get_value(data),
+    else:
+        def get_values(data):
+            return ()
+
+    def encode(data, out):
+        out += prefix
+        for key, value in zip(keys, get_values(data)):
+            out += key
+            _encode(value, out)
+    return encode
+
+
+_exact_encoders = {
+    text_type: _encode_text,
+    bool: _encode_bool,
+    float: _encode_float,
+    type(None): _encode_none,
+    # Plain dicts are JSON objects, e.g., of payloads, or of what custom
+    # serializers serialize into.
+    dict: _encode_object,
+    list: _encode_array,
+    tuple: _encode_array,
+}
+_exact_encoders.update((t, _encode_int) for t in integer_types)
+if not PY3:
+    _exact_encoders[binary_type] = _encode_bytes_text
+
+
+def _compile_encoder(cls):
+    if cls in _exact_encoders:
+        return _exact_encoders[cls]
+    elif hasattr(cls, '__nirum_lazy_header__'):
+        return _encode_serialized
+    elif (hasattr(cls, '__nirum_tag__') or
+          hasattr(cls, '__nirum_record_behind_name__')):
+        return _compile_fields_encoder(cls)
+    elif (hasattr(cls, '__nirum_inner_type__') or
+          hasattr(cls, '__nirum_get_inner_type__')):
+        return _encode_unboxed_type
+    elif hasattr(cls, '__nirum_serialize__'):
+        return _encode_serialized
+    elif issubclass(cls, uuid.UUID):
+        return _encode_uuid
+    elif issubclass(cls, datetime.datetime):
+        return _encode_datetime
+    elif issubclass(cls, datetime.date):
+        return _encode_date
+    elif issubclass(cls, decimal.Decimal):
+        return _encode_decimal
+    serialize = compile_serializer(cls)
+    if serialize is _serialize_collection:
+        return _encode_array
+    elif serialize is _serialize_mapping:
+        return _encode_map
+    for base, encode in _exact_encoders.items():
+        if issubclass(cls, base):
+            return encode
+    raise TypeError('{0!r} is not serializable into CBOR.'.format(cls))
+
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of encoder functions.
+#: Keys are the exact types of values.
+_encoders = weakref.WeakKeyDictionary()
+
+
+def _encode(data, out):
+    cls = type(data)
+    try:
+        encode = _encoders[cls]
+    except KeyError:
+        encode = _get_cached(_encoders, cls, _compile_encoder)
+    encode(data, out)
+
+
+def serialize_cbor(data):
+    """Serialize a value into CBOR.  Values are encoded into the same
+    structure as :func:`nirum.serialize.serialize_meta()` makes, so that
+    JSON-compatible values (e.g., request payloads) can be encoded as well.
+
+    :param data: A value to serialize.
+    :return: An encoded CBOR item.
+    :rtype: :class:`bytes`
+    :raise TypeError: When the value cannot be serialized.
+
+    """
+    out = bytearray()
+    _encode(data, out)
+    return bytes(out)
+
+
+def _decode_half(bits):
+    exponent = (bits >> 10) & 0x1f
+    fraction = bits & 0x3ff
+    if exponent == 0:
+        value = fraction * 2.0 ** -24
+    elif exponent == 0x1f:
+        value = float('nan') if fraction else float('inf')
+    else:
+        value = (fraction + 1024) * 2.0 ** (exponent - 25)
+    return -value if bits & 0x8000 else value
+
+
+def _decode_tagged(tag, value):
+    if tag in (_TAG_DATETIME, _TAG_DATE):
+        if not isinstance(value, text_type):
+            raise ValueError('tag {0} must be a text string.'.format(tag))
+        return value
+    elif tag in (_TAG_POSITIVE_BIGNUM, _TAG_NEGATIVE_BIGNUM):
+        if not isinstance(value, binary_type):
+            raise ValueError('tag {0} must be a byte string.'.format(tag))
+        number = 0
+        for byte in bytearray(value):
+            number = number << 8 | byte
+        return number if tag == _TAG_POSITIVE_BIGNUM else -1 - number
+    elif tag == _TAG_DECIMAL_FRACTION:
+        if not (isinstance(value, list) and len(value) == 2 and
+                all(isinstance(v, integer_types) for v in value)):
+            raise ValueError('tag 4 must be an array of two integers.')
+        exponent, mantissa = value
+        return text_type(decimal.Decimal((
+            1 if mantissa < 0 else 0,
+            tuple(int(d) for d in str(abs(mantissa))),
+            exponent,
+        )))
+    elif tag == _TAG_UUID:
+        if not (isinstance(value, binary_type) and len(value) == 16):
+            raise ValueError('tag 37 must be a byte string of 16 bytes.')
+        return text_type(uuid.UUID(bytes=value))
+    # Unknown tags are ignored as RFC 8949 permits.
+    return value
+
+
+def _decode(buf, view, index):
+    initial = buf[index]
+    index += 1
+    major = initial >> 5
+    info = initial & 0x1f
+    if info < 24:
+        argument = info
+    elif info == 24:
+        argument = buf[index]
+        index += 1
+    elif info == 25:
+        argument, = _unpack_uint16(buf, index)
+        index += 2
+    elif info == 26:
+        argument, = _unpack_uint32(buf, index)
+        index += 4
+    elif info == 27:
+        argument, = _unpack_uint64(buf, index)
+        index += 8
+    elif info == 31:
+        raise ValueError('indefinite-length items are not supported.')
+    else:
+        raise ValueError('invalid additional information: {0}.'.format(info))
+    if major == _MAJOR_UNSIGNED:
+        return argument, index
+    elif major == _MAJOR_NEGATIVE:
+        return -1 - argument, index
+    elif major == _MAJOR_BYTES or major == _MAJOR_TEXT:
+        end = index + argument
+        if end > len(buf):
+            raise ValueError('truncated CBOR data.')
+        if major == _MAJOR_TEXT:
+            return _utf8_decode(view[index:end], None, True)[0], end
+        return view[index:end].tobytes(), end
+    elif major == _MAJOR_ARRAY:
+        # Every item takes a byte at least, so that lengths longer than
+        # the rest of the data are rejected before allocating anything.
+        if argument > len(buf) - index:
+            raise ValueError('truncated CBOR data.')
+        items = []
+        append = items.append
+        for _ in range(argument):
+            item, index = _decode(buf, view, index)
+            append(item)
+        return items, index
+    elif major == _MAJOR_MAP:
+        if argument * 2 > len(buf) - index:
+            raise ValueError('truncated CBOR data.')
+        items = {}
+        for _ in range(argument):
+            key, index = _decode(buf, view, index)
+            value, index = _decode(buf, view, index)
+            try:
+                items[key] = value
+            except TypeError:
+                raise ValueError('map keys must be hashable.')
+        return items, index
+    elif major == _MAJOR_TAG:
+        value, index = _decode(buf, view, index)
+        return _decode_tagged(argument, value), index
+    elif info == 20:
+        return False, index
+    elif info == 21:
+        return True, index
+    elif info == 22 or info == 23:
+        return None, index
+    elif info == 25:
+        return _decode_half(argument), index
+    elif info == 26:
+        return _unpack_float32(buf, index - 4)[0], index
+    elif info == 27:
+        return _unpack_float64(buf, index - 8)[0], index
+    raise ValueError('unsupported simple value: {0}.'.format(argument))
+
+
+def loads(data):
+    """Parse a CBOR item into a JSON-compatible value.  Tagged UUIDs,
+    decimals, datetimes, and dates are turned into the strings the JSON
+    serializer would make.
+
+    Note that byte strings, which JSON has no counterpart of, are parsed
+    into :class:`bytes` as they are, and so are byte strings of unknown
+    tags (unknown tags are ignored).
+
+    :param data: An encoded CBOR item.
+    :type data: :class:`bytes`
+    :return: A JSON-compatible value, unless it has byte strings.
+    :raise ValueError: When the data is not a valid CBOR item, or it has
+                       unsupported items.
+
+    """
+    # Indexing bytes gives integers only on Python 3.
+    buf = data if PY3 and isinstance(data, bytes) else bytearray(data)
+    try:
+        value, index = _decode(buf, memoryview(buf), 0)
+    except (IndexError, struct.error):
+        raise ValueError('truncated CBOR data.')
+    except UnicodeDecodeError as e:
+        raise ValueError('invalid UTF-8 text string: {0}'.format(e))
+    if index != len(buf):
+        raise ValueError('extra data after a CBOR item at {0}.'.format(index))
+    return value
+
+
+def deserialize_cbor(cls, data, budget=None):
+    """Parse a CBOR item and deserialize it into the given type.
+
+    :param cls: A type to deserialize the item into.
+    :param data: An encoded CBOR item.
+    :type data: :class:`bytes`
+    :param budget: Limits to check the item against before it's
+                   deserialized.  No limits by default.
+    :type budget: :class:`~nirum.deserialize.DeserializationBudget`
+    :return: A deserialized value.
+    :raise ValueError: When the data is not a valid CBOR item, or it's not
+                       deserializable into the type.
+    :raise nirum.exc.DeserializationBudgetError: When the item exceeds
+                                                 the ``budget``.
+
+    """
+    if budget is not None:
+        budget.check_bytes(data)
+    return deserialize_meta(cls, loads(data), budget)
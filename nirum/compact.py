@@ -0,0 +1,367 @@
+""":mod:`nirum.compact` --- Positional compact JSON encoding
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+The regular JSON representation of records and unions is self-describing:
+every object repeats its field names and its ``"_type"`` (and ``"_tag"``)
+names.  The compact encoding leaves them all out, and relies on the schema
+instead, since both ends know the declared type of every value:
+
+- A record is an array of its field values in the declared order of its
+  fields (i.e., its ``__slots__``).
+- A union is an array of its behind tag name followed by the field values
+  of the tag.  A tag type which is declared as itself has no tag name.
+- An unboxed type is the compact encoding of its inner value.
+- A map is an array of ``[key, value]`` pairs.
+- Sequences, sets, and optional types follow their element types.
+
+Other values (e.g., numbers, texts, enums, and values of undeclared types)
+are encoded in the same way as :func:`~nirum.serialize.serialize_meta()`.
+
+.. versionadded:: 0.6.4
+
+"""
+import typing
+import weakref
+
+from six.moves import zip
+
+from ._compat import get_union_types, is_optional_type
+from .datastructures import Map
+from .deserialize import (_ITERABLE_PRIMITIVE_TYPES, _NONE_TYPE,
+                          get_deserializer, is_support_abstract_type,
+                          _compiled_caches, _find_union_tag, _get_cached,
+                          _get_collection_element_type)
+from .serialize import (_get_field_types, _get_typed_serializer,
+                        _get_unboxed_inner_type)
+from .validate import construct_trusted
+
+__all__ = (
+    'CONTENT_TYPE',
+    'compile_compact_decoder',
+    'compile_compact_encoder',
+    'deserialize_compact',
+    'get_compact_decoder',
+    'get_compact_encoder',
+    'serialize_compact',
+)
+
+#: (:class:`str`) The media type of compact JSON payloads.
+CONTENT_TYPE = 'application/vnd.nirum.compact+json'
+
+_encoders = weakref.WeakKeyDictionary()
+_decoders = weakref.WeakKeyDictionary()
+_field_encoders = weakref.WeakKeyDictionary()
+_field_decoders = weakref.WeakKeyDictionary()
+_compiled_caches.extend([_encoders, _decoders,
+                         _field_encoders, _field_decoders])
+
+
+def _get_fields_encoder(cls):
+    slots = tuple(cls.__slots__)
+    field_types = _get_field_types(cls)
+    fields = [(slot, get_compact_encoder(field_types[slot]))
+              for slot in slots]
+
+    def encode(data, header):
+        encoded = list(header)
+        append = encoded.append
+        for slot, encode_field in fields:
+            append(encode_field(getattr(data, slot)))
+        return encoded
+    return encode
+
+
+def _get_fields_decoder(cls):
+    slots = tuple(cls.__slots__)
+    field_types = _get_field_types(cls)
+    return [(slot, get_compact_decoder(field_types[slot])) for slot in slots]
+
+
+def _check_array(cls, value, arity):
+    if not isinstance(value, list):
+        raise ValueError('{0} must be encoded as an array, not {1!r}.'.format(
+            typing._type_repr(cls), value
+        ))
+    elif len(value) != arity:
+        raise ValueError(
+            '{0} must be encoded as an array of {1} elements, not {2}.'.format(
+                typing._type_repr(cls), arity, len(value)
+            )
+        )
+
+
+def _compile_record_encoder(cls):
+    cls_ref = weakref.ref(cls)
+
+    def encode(data):
+        fields = _get_cached(_field_encoders, cls_ref(), _get_fields_encoder)
+        return fields(data, ())
+    return encode
+
+
+def _compile_record_decoder(cls):
+    cls_ref = weakref.ref(cls)
+
+    def decode(value):
+        cls = cls_ref()
+        fields = _get_cached(_field_decoders, cls, _get_fields_decoder)
+        _check_array(cls, value, len(fields))
+        return construct_trusted(cls, {
+            slot: decode_field(item)
+            for (slot, decode_field), item in zip(fields, value)
+        })
+    return decode
+
+
+def _compile_union_encoder(cls):
+    def encode(data):
+        # Values can be of any tag of the union (or their lazy proxies),
+        # so the fields are looked up by their concrete types.
+        fields = _get_cached(_field_encoders, type(data), _get_fields_encoder)
+        return fields(data, (data.__nirum_tag__.value,))
+    return encode
+
+
+def _compile_union_decoder(cls):
+    cls_ref = weakref.ref(cls)
+
+    def decode(value):
+        cls = cls_ref()
+        if not (isinstance(value, list) and value):
+            raise ValueError(
+                '{0} must be encoded as an array which begins with its tag '
+                'name, not {1!r}.'.format(typing._type_repr(cls), value)
+            )
+        found = _find_union_tag(cls, value[0])
+        if found is None:
+            raise ValueError('{0} has no tag "{1}".'.format(
+                typing._type_repr(cls), value[0]
+            ))
+        tag_cls = found[0]()
+        fields = _get_cached(_field_decoders, tag_cls, _get_fields_decoder)
+        _check_array(tag_cls, value, len(fields) + 1)
+        return construct_trusted(tag_cls, {
+            slot: decode_field(item)
+            for (slot, decode_field), item in zip(fields, value[1:])
+        })
+    return decode
+
+
+def _compile_unboxed_encoder(inner_type):
+    encode_inner = get_compact_encoder(inner_type)
+
+    def encode(data):
+        return encode_inner(data.value)
+    return encode
+
+
+def _compile_unboxed_decoder(cls):
+    cls_ref = weakref.ref(cls)
+    decode_inner = get_compact_decoder(_get_unboxed_inner_type(cls))
+
+    def decode(value):
+        return cls_ref()(value=decode_inner(value))
+    return decode
+
+
+def _compile_collection_encoder(elem_type):
+    encode_elem = get_compact_encoder(elem_type)
+
+    def encode(data):
+        return [encode_elem(elem) for elem in data]
+    return encode
+
+
+def _compile_collection_decoder(cls, primitive_type, elem_type):
+    decode_elem = get_compact_decoder(elem_type)
+
+    def decode(value):
+        if not isinstance(value, list):
+            raise ValueError(
+                '{0} must be encoded as an array, not {1!r}.'.format(
+                    typing._type_repr(cls), value
+                )
+            )
+        elements = [decode_elem(elem) for elem in value]
+        if primitive_type is list:
+            return elements
+        return primitive_type(elements)
+    return decode
+
+
+def _compile_map_encoder(key_type, value_type):
+    encode_key = get_compact_encoder(key_type)
+    encode_value = get_compact_encoder(value_type)
+
+    def encode(data):
+        return [[encode_key(k), encode_value(v)] for k, v in data.items()]
+    return encode
+
+
+def _compile_map_decoder(cls, key_type, value_type):
+    decode_key = get_compact_decoder(key_type)
+    decode_value = get_compact_decoder(value_type)
+
+    def decode(value):
+        if not isinstance(value, list):
+            raise ValueError(
+                '{0} must be encoded as an array, not {1!r}.'.format(
+                    typing._type_repr(cls), value
+                )
+            )
+        items = {}
+        for item in value:
+            if not (isinstance(item, list) and len(item) == 2):
+                raise ValueError(
+                    'map item must be encoded as a pair array '
+                    'e.g. [key, value], not {0!r}.'.format(item)
+                )
+            items[decode_key(item[0])] = decode_value(item[1])
+        return Map._from_owned_dict(items)
+    return decode
+
+
+def _compile_optional_encoder(inner_type):
+    encode_inner = get_compact_encoder(inner_type)
+
+    def encode(data):
+        return None if data is None else encode_inner(data)
+    return encode
+
+
+def _compile_optional_decoder(inner_type):
+    decode_inner = get_compact_decoder(inner_type)
+
+    def decode(value):
+        return None if value is None else decode_inner(value)
+    return decode
+
+
+def _get_abstract_params(cls):
+    origin = getattr(cls, '__origin__', None) or cls
+    params = [t for t in getattr(cls, '__args__', None) or ()
+              if not isinstance(t, typing.TypeVar)]
+    return origin, params
+
+
+def _get_optional_inner_type(cls):
+    inner_types = [t for t in get_union_types(cls) if t is not _NONE_TYPE]
+    return inner_types[0] if len(inner_types) == 1 else None
+
+
+def compile_compact_encoder(cls):
+    """Turn the given type into a function specialized to encode values of
+    the type into the compact encoding.
+
+    :param cls: A declared type of values to encode.
+    :return: A function that takes a value of the type and returns
+             a JSON-compatible value.
+
+    """
+    if hasattr(cls, '__nirum_tag__'):
+        return _compile_record_encoder(cls)
+    elif hasattr(cls, 'Tag'):
+        return _compile_union_encoder(cls)
+    elif hasattr(cls, '__nirum_record_behind_name__'):
+        return _compile_record_encoder(cls)
+    elif (hasattr(cls, '__nirum_get_inner_type__') or
+          hasattr(cls, '__nirum_inner_type__')):
+        return _compile_unboxed_encoder(_get_unboxed_inner_type(cls))
+    elif is_support_abstract_type(cls):
+        origin, params = _get_abstract_params(cls)
+        if origin is typing.Mapping and len(params) == 2:
+            return _compile_map_encoder(*params)
+        elif origin in _ITERABLE_PRIMITIVE_TYPES and len(params) == 1:
+            return _compile_collection_encoder(params[0])
+    elif is_optional_type(cls):
+        inner_type = _get_optional_inner_type(cls)
+        if inner_type is not None:
+            return _compile_optional_encoder(inner_type)
+    return _get_typed_serializer(cls)
+
+
+def compile_compact_decoder(cls):
+    """Turn the given type into a function specialized to decode values of
+    the type from the compact encoding.
+
+    :param cls: A type to decode values into.
+    :return: A function that takes a JSON-compatible value and returns
+             a value of the type.  It raises :exc:`ValueError` when the
+             value is not a valid compact encoding of the type, e.g.,
+             an array of a record has too many or too few elements.
+
+    """
+    if hasattr(cls, '__nirum_tag__'):
+        return _compile_record_decoder(cls)
+    elif hasattr(cls, 'Tag'):
+        return _compile_union_decoder(cls)
+    elif hasattr(cls, '__nirum_record_behind_name__'):
+        return _compile_record_decoder(cls)
+    elif (hasattr(cls, '__nirum_get_inner_type__') or
+          hasattr(cls, '__nirum_inner_type__')):
+        return _compile_unboxed_decoder(cls)
+    elif is_support_abstract_type(cls):
+        origin, params = _get_abstract_params(cls)
+        if origin is typing.Mapping and len(params) == 2:
+            return _compile_map_decoder(cls, *params)
+        elif origin in _ITERABLE_PRIMITIVE_TYPES:
+            primitive_type, elem_type = _get_collection_element_type(cls)
+            if elem_type is not None:
+                return _compile_collection_decoder(cls, primitive_type,
+                                                   elem_type)
+    elif is_optional_type(cls):
+        inner_type = _get_optional_inner_type(cls)
+        if inner_type is not None:
+            return _compile_optional_decoder(inner_type)
+    return get_deserializer(cls)
+
+
+def get_compact_encoder(cls):
+    """Get the compact encoder function of the given type.  Encoders are
+    compiled through :func:`compile_compact_encoder()` once per type,
+    and then cached.
+
+    :param cls: A declared type of values to encode.
+    :return: An encoder function.
+
+    """
+    return _get_cached(_encoders, cls, compile_compact_encoder)
+
+
+def get_compact_decoder(cls):
+    """Get the compact decoder function of the given type.  Decoders are
+    compiled through :func:`compile_compact_decoder()` once per type,
+    and then cached.
+
+    :param cls: A type to decode values into.
+    :return: A decoder function.
+
+    """
+    return _get_cached(_decoders, cls, compile_compact_decoder)
+
+
+def serialize_compact(data, type_hint):
+    """Encode the given value of the declared type into the compact
+    encoding.
+
+    :param data: A value to encode.
+    :param type_hint: The declared type of ``data``.  The compact encoding
+                      can be decoded only into the same type.
+    :return: A JSON-compatible value.
+
+    """
+    return get_compact_encoder(type_hint)(data)
+
+
+def deserialize_compact(cls, data):
+    """Decode the given compact encoding into a value of the given type.
+
+    :param cls: A type to decode the value into.
+    :param data: A JSON-compatible value encoded by
+                 :func:`serialize_compact()`.
+    :return: A value of ``cls``.
+    :raise ValueError: When the value is not a valid compact encoding of
+                       the type.
+
+    """
+    return get_compact_decoder(cls)(data)
@@ -21,6 +21,24 @@ class Map(collections.Mapping):
         # TODO: type check on elements
         self.value = dict(*args, **kwargs)
 
+    @classmethod
+    def _from_owned_dict(cls, value):
+        """Make a map which adopts the given :class:`dict` as it is,
+        without copying it.  It's only for trusted callers (e.g.,
+        deserializers) which have just built the dictionary and never
+        touch it afterward.
+
+        :param value: A dictionary to adopt.
+        :type value: :class:`dict`
+        :return: A map which shares the ``value``.
+
+        .. versionadded:: 0.6.4
+
+        """
+        map_ = cls.__new__(cls)
+        map_.value = value
+        return map_
+
     def __eq__(self, other):
         if not (isinstance(other, collections.Mapping) and
                 len(self.value) == len(other)):
@@ -47,7 +65,7 @@ class Map(collections.Mapping):
         return key in self.value
 
     def __reduce__(self):
-        return type(self), (self.value,)
+        return _reconstruct_map, (type(self), self.value)
 
     def __bool__(self):
         return bool(self.value)
@@ -67,6 +85,11 @@ class Map(collections.Mapping):
         return '{0.__module__}.{0.__name__}({1})'.format(type(self), args)
 
 
+def _reconstruct_map(cls, value):
+    # An unpickled dict is owned by no one else, so that it needs no copy.
+    return cls._from_owned_dict(value)
+
+
 class List(collections.Sequence):
 
     def __init__(self, items):
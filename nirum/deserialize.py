@@ -2,37 +2,171 @@
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 """
+import codecs
 import collections
 import datetime
 import decimal
 import enum
+import functools
+import itertools
+import json
+import multiprocessing
 import numbers
+import operator
+import re
+import sys
+import types
 import typing
 import uuid
+import weakref
 
 from iso8601 import iso8601, parse_date
-from six import text_type
+from six import integer_types, string_types, text_type
 
-from ._compat import get_tuple_param_types, get_union_types, is_optional_type
+from ._compat import (get_tuple_param_types, get_union_types,
+                      is_optional_type, lru_cache)
 from .datastructures import Map
+from .exc import DeserializationBudgetError
+from .jsonlib import loads_bytes
+from .registry import lookup_type, register_type, _iter_module_types
+from .serialize import (serialize_meta, _cache_lock, _get_cached,
+                        _get_field_types, _get_unboxed_inner_type)
+from .validate import construct_trusted
 
 __all__ = (
+    'DeserializationBudget',
+    'compile_deserializer',
     'deserialize_abstract_type',
+    'deserialize_any',
     'deserialize_boxed_type',
+    'deserialize_iter',
     'deserialize_iterable_abstract_type',
+    'deserialize_json',
+    'deserialize_many',
     'deserialize_meta',
     'deserialize_optional',
+    'deserialize_parallel',
     'deserialize_primitive',
     'deserialize_record_type',
     'deserialize_tuple_type',
     'deserialize_unboxed_type',
     'deserialize_union_type',
+    'get_deserializer',
+    'intern_fields',
+    'is_field_loaded',
     'is_support_abstract_type',
+    'precompile',
+    'set_primitive_cache_size',
+    'set_text_interning',
 )
 _NIRUM_PRIMITIVE_TYPE = {
     float, decimal.Decimal, uuid.UUID, datetime.datetime,
     datetime.date, bool, int, text_type, numbers.Integral
 }
+_NONE_TYPE = type(None)
+_ABSTRACT_TYPES = frozenset([
+    typing.Sequence,
+    typing.List,
+    typing.Set,
+    typing.AbstractSet,
+    typing.Mapping,
+    typing.Dict,
+])
+_ITERABLE_TYPES = frozenset([
+    typing.Sequence, typing.List, typing.Tuple, typing.Set,
+    typing.AbstractSet, typing.Mapping,
+])
+_ITERABLE_PRIMITIVE_TYPES = {
+    typing.Sequence: list,
+    typing.List: list,
+    typing.Set: set,
+    typing.AbstractSet: set,
+    typing.Mapping: Map,
+}
+#: (:class:`typing.Mapping`\ [:class:`type`, :class:`frozenset`]) Element
+#: types of which JSON-native values need no conversion, and the exact
+#: Python types of such values.
+_NATIVE_ELEMENT_TYPES = {
+    int: frozenset(integer_types),
+    float: frozenset([float]),
+    bool: frozenset([bool]),
+    text_type: frozenset([text_type]),
+}
+_get_key_value = operator.itemgetter('key', 'value')
+_ABSTRACT_PRIMITIVE_TYPES = {
+    typing.Sequence: list,
+    typing.List: list,
+    typing.Dict: dict,
+    typing.Set: set,
+    typing.AbstractSet: set,
+}
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of compiled deserializers.
+#: Keys are types and values are their deserializer functions.
+_deserializers = weakref.WeakKeyDictionary()
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of record field plans.
+#: Keys are record types and values are mappings of field names (both
+#: behind names and facial names) to pairs of a facial name and
+#: a deserializer function.
+_record_fields = weakref.WeakKeyDictionary()
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of inner deserializers of
+#: unboxed types.
+_unboxed_inner_deserializers = weakref.WeakKeyDictionary()
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of union tag indices.
+#: Keys are union types (or their tag types) and values are made by
+#: :func:`_index_union_tags()`.
+_union_tags = weakref.WeakKeyDictionary()
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of lazy proxy classes.
+#: Keys are record types or tag types of unions, and values are weak
+#: references to their lazy proxy classes made by :func:`_make_lazy_class()`.
+#: See also :func:`_get_lazy_class()`.
+_lazy_classes = weakref.WeakKeyDictionary()
+
+
+class _DeserializationError(ValueError):
+    """A :exc:`ValueError` which formats its message only when it's shown.
+    Most errors raised while probing members of an optional type are
+    discarded, so that formatting their messages up front is a waste.
+
+    :param format_message: A function to format the message.
+    :param \\*args: Arguments to pass to ``format_message``.
+
+    """
+
+    def __init__(self, format_message, *args):
+        super(_DeserializationError, self).__init__()
+        self.format_message = format_message
+        self.format_args = args
+
+    def __str__(self):
+        return self.format_message(*self.format_args)
+
+    def __reduce__(self):
+        # Its arguments might not be picklable, e.g., when it's sent back
+        # from a worker process of deserialize_parallel().
+        return ValueError, (str(self),)
+
+
+def _format_unexpected_value(cls, field, expected, found):
+    return '{0} expect "{1}" equal to "{2}", but found {3}.'.format(
+        typing._type_repr(cls), field, expected, found
+    )
+
+
+def _format_unknown_tag(cls, value):
+    return '{0!r} is not deserialzable tag of `{1}`.'.format(
+        value, typing._type_repr(cls)
+    )
+
+
+def _format_not_deserializable(cls, data):
+    return '{0!r} is not deserializable as {1}.'.format(
+        data, typing._type_repr(cls)
+    )
 
 
 def is_support_abstract_type(t):
@@ -41,27 +175,11 @@ def is_support_abstract_type(t):
         data_type = t.__origin__
     else:
         data_type = t
-    abstract_types = {
-        typing.Sequence,
-        typing.List,
-        typing.Set,
-        typing.AbstractSet,
-        typing.Mapping,
-        typing.Dict,
-    }
-    return any(type_ is data_type for type_ in abstract_types)
+    return any(type_ is data_type for type_ in _ABSTRACT_TYPES)
 
 
-def deserialize_iterable_abstract_type(cls, cls_origin_type, data):
-    abstract_type_map = {
-        typing.Sequence: list,
-        typing.List: list,
-        typing.Set: set,
-        typing.AbstractSet: set,
-        typing.Mapping: Map,
-    }
-    deserialized_data = data
-    cls_primitive_type = abstract_type_map[cls_origin_type]
+def _compile_iterable_deserializer(cls, cls_origin_type):
+    cls_primitive_type = _ITERABLE_PRIMITIVE_TYPES[cls_origin_type]
     # Whereas on Python/typing < 3.5.2 type parameters are stored in
     # __parameters__ attribute, on Python/typing >= 3.5.2 __parameters__
     # attribute is gone and __args__ comes instead.
@@ -71,19 +189,28 @@ def deserialize_iterable_abstract_type(cls, cls_origin_type, data):
     if len(type_params) == 1:
         elem_type, = type_params
         if isinstance(elem_type, typing.TypeVar):
-            deserialized_data = cls_primitive_type(data)
-        else:
-            deserialized_data = cls_primitive_type(
-                deserialize_meta(elem_type, d) for d in data
-            )
+            return cls_primitive_type
+        deserialize_elem = get_deserializer(elem_type)
+        native_types = _NATIVE_ELEMENT_TYPES.get(elem_type)
+        if native_types is None:
+            def deserialize(data):
+                return cls_primitive_type(deserialize_elem(d) for d in data)
+            return deserialize
+
+        def deserialize_native(data):
+            # A homogeneous array of JSON-native values needs no conversion,
+            # so that it's type-checked and copied at once.
+            if type(data) is list and native_types.issuperset(map(type, data)):
+                return cls_primitive_type(data)
+            return cls_primitive_type(deserialize_elem(d) for d in data)
+        return deserialize_native
     elif len(type_params) == 2:
         # Key-value
         key_type, value_type = type_params
         assert not (isinstance(key_type, typing.TypeVar) or
                     isinstance(value_type, typing.TypeVar))
-        if not isinstance(data, collections.Sequence):
-            raise ValueError('map must be an array of item objects e.g. '
-                             '[{"key": ..., "value": ...}, ...]')
+        deserialize_key = get_deserializer(key_type)
+        deserialize_value = get_deserializer(value_type)
 
         def parse_pair(pair):
             if not isinstance(pair, collections.Mapping):
@@ -94,33 +221,74 @@ def deserialize_iterable_abstract_type(cls, cls_origin_type, data):
             except KeyError:
                 raise ValueError('map item must consist of "key" and "value" '
                                  'fields e.g. {"key": ..., "value": ...}')
-            return (
-                deserialize_meta(key_type, key),
-                deserialize_meta(value_type, value),
-            )
-        deserialized_data = cls_primitive_type(map(parse_pair, data))
-    return deserialized_data
+            return deserialize_key(key), deserialize_value(value)
 
+        native_key_types = _NATIVE_ELEMENT_TYPES.get(key_type)
+        native_value_types = _NATIVE_ELEMENT_TYPES.get(value_type)
+        native = not (native_key_types is None or native_value_types is None)
 
-def deserialize_abstract_type(cls, data):
-    abstract_type_map = {
-        typing.Sequence: list,
-        typing.List: list,
-        typing.Dict: dict,
-        typing.Set: set,
-        typing.AbstractSet: set,
-    }
+        def deserialize(data):
+            if not isinstance(data, collections.Sequence):
+                raise ValueError('map must be an array of item objects e.g. '
+                                 '[{"key": ..., "value": ...}, ...]')
+            if native and type(data) is list:
+                try:
+                    items = dict(map(_get_key_value, data))
+                except (KeyError, TypeError):
+                    pass  # Let parse_pair() report the error.
+                else:
+                    if (native_key_types.issuperset(map(type, items)) and
+                            native_value_types.issuperset(
+                                map(type, items.values()))):
+                        return Map._from_owned_dict(items)
+            return Map._from_owned_dict(dict(map(parse_pair, data)))
+        return deserialize
+    return _identity
+
+
+def _identity(data):
+    return data
+
+
+def deserialize_iterable_abstract_type(cls, cls_origin_type, data):
+    return _compile_iterable_deserializer(cls, cls_origin_type)(data)
+
+
+def _compile_abstract_deserializer(cls):
     cls_origin_type = cls.__origin__
     if cls_origin_type is None:
         cls_origin_type = cls
-    iterable_types = {
-        typing.Sequence, typing.List, typing.Tuple, typing.Set,
-        typing.AbstractSet, typing.Mapping,
-    }
-    if cls_origin_type in iterable_types:
-        return deserialize_iterable_abstract_type(cls, cls_origin_type, data)
+    if cls_origin_type in _ITERABLE_TYPES:
+        return _compile_iterable_deserializer(cls, cls_origin_type)
     else:
-        return abstract_type_map[cls_origin_type](data)
+        return _ABSTRACT_PRIMITIVE_TYPES[cls_origin_type]
+
+
+def deserialize_abstract_type(cls, data):
+    return _compile_abstract_deserializer(cls)(data)
+
+
+def _compile_tuple_deserializer(cls):
+    tuple_types = get_tuple_param_types(cls)
+    if tuple_types is None:
+        return functools.partial(deserialize_tuple_type, cls)
+    elif not tuple_types:
+        return tuple
+    tuple_type_length = len(tuple_types)
+    deserializers = [get_deserializer(t) for t in tuple_types]
+
+    def deserialize(data):
+        data_length = len(data)
+        if tuple_type_length != data_length:
+            raise _DeserializationError(
+                'Expected {}-tuple, not {}-tuple'.format,
+                tuple_type_length, data_length
+            )
+        return tuple(
+            deserialize_elem(d)
+            for deserialize_elem, d in zip(deserializers, data)
+        )
+    return deserialize
 
 
 def deserialize_tuple_type(cls, data):
@@ -143,95 +311,894 @@ def deserialize_tuple_type(cls, data):
     )
 
 
-def deserialize_primitive(cls, data):
-    if cls is datetime.datetime:
-        try:
-            d = parse_date(data)
-        except iso8601.ParseError:
-            raise ValueError("'{}' is not a datetime.".format(data))
-    elif cls is datetime.date:
+#: Matches the canonical form of datetimes which :meth:`datetime.isoformat()
+#: <datetime.datetime.isoformat>` makes, e.g., ``2016-08-04T01:42:43.123Z``.
+#: Values in other forms are left to :mod:`iso8601`.
+_match_datetime = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?'
+    r'(Z|[+-]\d\d:\d\d)?\Z'
+).match
+_match_date = re.compile(r'(\d{4})-(\d\d)-(\d\d)\Z').match
+
+#: (:class:`dict`) The cache of time zones parsed by :mod:`iso8601`,
+#: keyed by their designators (e.g., ``Z``, ``+09:00``).  The empty
+#: designator is for datetimes without time zones, which are in UTC.
+_iso8601_timezones = {}
+
+
+def _get_iso8601_timezone(designator):
+    try:
+        return _iso8601_timezones[designator]
+    except KeyError:
+        # Time zones are taken from iso8601 itself, so that the fast path
+        # makes the same tzinfo objects as iso8601 does.
+        tz = parse_date('2000-01-01T00:00:00' + designator).tzinfo
+        return _iso8601_timezones.setdefault(designator, tz)
+
+
+def _deserialize_datetime(data):
+    # Parsing the canonical form with a precompiled regular expression is
+    # several times faster than iso8601, so try it first.
+    match = _match_datetime(data) if isinstance(data, string_types) else None
+    if match is not None:
+        (year, month, day, hour, minute, second,
+         fraction, designator) = match.groups()
         try:
-            d = parse_date(data).date()
-        except iso8601.ParseError:
-            raise ValueError("'{}' is not a date.".format(data))
-    elif cls in {int, float, uuid.UUID, bool}:
-        d = cls(data)
-    elif cls is numbers.Integral:
-        d = data
-    elif cls is decimal.Decimal:
+            return datetime.datetime(
+                int(year), int(month), int(day),
+                int(hour), int(minute), int(second),
+                int(fraction.ljust(6, '0')) if fraction else 0,
+                _get_iso8601_timezone(designator or '')
+            )
+        except ValueError:
+            pass  # Let iso8601 report the error.
+    try:
+        return parse_date(data)
+    except iso8601.ParseError:
+        raise _DeserializationError("'{}' is not a datetime.".format, data)
+
+
+def _deserialize_date(data):
+    match = _match_date(data) if isinstance(data, string_types) else None
+    if match is not None:
+        year, month, day = match.groups()
         try:
-            d = cls(data)
-        except decimal.InvalidOperation:
-            raise ValueError("'{}' is not a decimal.".format(data))
-    elif cls is text_type:
-        if not isinstance(data, text_type):
-            raise ValueError("'{}' is not a string.".format(data))
-        d = cls(data)
-    else:
+            return datetime.date(int(year), int(month), int(day))
+        except ValueError:
+            pass
+    try:
+        return parse_date(data).date()
+    except iso8601.ParseError:
+        raise _DeserializationError("'{}' is not a date.".format, data)
+
+
+def _deserialize_decimal(data):
+    try:
+        return decimal.Decimal(data)
+    except decimal.InvalidOperation:
+        raise _DeserializationError("'{}' is not a decimal.".format, data)
+
+
+def _deserialize_text(data):
+    if not isinstance(data, text_type):
+        raise _DeserializationError("'{}' is not a string.".format, data)
+    return text_type(data)
+
+
+# Decoded records and unions are constructed without being validated again
+# (see construct_trusted()), so deserializers of primitive types have to
+# check the types of values by themselves instead of passing them through.
+def _deserialize_integral(data):
+    # bool is a subclass of int, but true and false are not integers in JSON.
+    if isinstance(data, bool) or not isinstance(data, numbers.Integral):
+        raise _DeserializationError("'{}' is not an integer.".format, data)
+    return data
+
+
+def _deserialize_bool(data):
+    if not isinstance(data, bool):
+        raise _DeserializationError("'{}' is not a boolean.".format, data)
+    return data
+
+
+_primitive_deserializers = {
+    datetime.datetime: _deserialize_datetime,
+    datetime.date: _deserialize_date,
+    int: int,
+    float: float,
+    uuid.UUID: uuid.UUID,
+    bool: _deserialize_bool,
+    numbers.Integral: _deserialize_integral,
+    decimal.Decimal: _deserialize_decimal,
+    text_type: _deserialize_text,
+}
+_uncached_primitive_deserializers = dict(_primitive_deserializers)
+_CACHEABLE_PRIMITIVE_TYPES = (
+    datetime.datetime, datetime.date, uuid.UUID, decimal.Decimal,
+)
+
+
+def _cache_primitive_deserializer(deserialize, maxsize):
+    deserialize_cached = lru_cache(maxsize)(deserialize)
+
+    def deserialize_primitive(data):
+        if isinstance(data, string_types):
+            return deserialize_cached(data)
+        return deserialize(data)
+    return deserialize_primitive
+
+
+def set_primitive_cache_size(maxsize):
+    """Set the size of LRU caches of deserialized :class:`datetime.datetime`,
+    :class:`datetime.date`, :class:`uuid.UUID`, and :class:`decimal.Decimal`
+    values.  They are worth caching when the same values (e.g., dates)
+    repeat frequently.  The caches are disabled by default.
+
+    Since deserializers compiled so far are discarded, it's meant to be
+    called only once at startup.
+
+    :param maxsize: The maximum number of values to cache per type.
+                    Zero disables caches.
+    :type maxsize: :class:`int`
+
+    .. versionadded:: 0.6.4
+
+    """
+    with _cache_lock:
+        for cls in _CACHEABLE_PRIMITIVE_TYPES:
+            deserialize = _uncached_primitive_deserializers[cls]
+            if maxsize:
+                deserialize = _cache_primitive_deserializer(deserialize,
+                                                            maxsize)
+            _primitive_deserializers[cls] = deserialize
+        _clear_compiled_caches()
+
+
+_intern_table = {}
+_intern_maxsize = 0
+_intern_max_length = 64
+_interned_fields = weakref.WeakKeyDictionary()
+
+
+def _intern_text(data):
+    if len(data) > _intern_max_length:
+        return data
+    try:
+        return _intern_table[data]
+    except KeyError:
+        if len(_intern_table) < _intern_maxsize:
+            return _intern_table.setdefault(data, data)
+    return data
+
+
+def _deserialize_interned_text(data):
+    return _intern_text(_deserialize_text(data))
+
+
+def _intern_deserializer(deserialize):
+    def deserialize_interned(data):
+        value = deserialize(data)
+        if type(value) is text_type:
+            return _intern_text(value)
+        return value
+    return deserialize_interned
+
+
+#: (:class:`list`) Caches of compiled functions to discard when
+#: primitive deserializers are replaced.
+_compiled_caches = [
+    _deserializers, _record_fields, _unboxed_inner_deserializers,
+    _union_tags, _lazy_classes,
+]
+
+
+def _clear_compiled_caches():
+    for cache in _compiled_caches:
+        cache.clear()
+
+
+def set_text_interning(maxsize, max_length=64, all_fields=False):
+    """Set the size of the intern table of deserialized text values.
+    When the same short strings (e.g., country codes, status names) repeat
+    over and over, interned values share a single string object instead of
+    holding their own copies.
+
+    Text values are interned only in fields opted in through
+    :func:`intern_fields()`, unless ``all_fields`` is :const:`True`.
+    Once the table is full, values not in the table are not interned
+    anymore.  Interning is disabled by default.
+
+    Since deserializers compiled so far are discarded, it's meant to be
+    called only once at startup.
+
+    :param maxsize: The maximum number of distinct values to intern.
+                    Zero disables interning and empties the table.
+    :type maxsize: :class:`int`
+    :param max_length: Longer values than this are never interned.
+                       64 by default.
+    :type max_length: :class:`int`
+    :param all_fields: Intern all text values including ones deserialized
+                       by :func:`deserialize_primitive()`, not only opted
+                       in fields.  :const:`False` by default.
+    :type all_fields: :class:`bool`
+
+    .. versionadded:: 0.6.4
+
+    """
+    global _intern_maxsize, _intern_max_length
+    with _cache_lock:
+        _intern_maxsize = maxsize
+        _intern_max_length = max_length
+        if not maxsize:
+            _intern_table.clear()
+        if maxsize and all_fields:
+            deserialize = _deserialize_interned_text
+        else:
+            deserialize = _deserialize_text
+        _primitive_deserializers[text_type] = deserialize
+        _clear_compiled_caches()
+
+
+def intern_fields(cls, *field_names):
+    """Opt text values of the given fields of a record or union tag type
+    in interning.  See also :func:`set_text_interning()`, which has to be
+    called as well to enable interning.
+
+    :param cls: A record type or a union tag type.
+    :param \\*field_names: Facial names of fields to intern.  All fields
+                          of the type if omitted.
+
+    .. versionadded:: 0.6.4
+
+    """
+    with _cache_lock:
+        _interned_fields[cls] = frozenset(field_names)
+        _clear_compiled_caches()
+
+
+def _get_field_deserializer(cls, name, field_type):
+    deserialize = get_deserializer(field_type)
+    try:
+        field_names = _interned_fields[cls]
+    except (KeyError, TypeError):
+        return deserialize
+    if field_names and name not in field_names:
+        return deserialize
+    return _intern_deserializer(deserialize)
+
+
+def deserialize_primitive(cls, data):
+    try:
+        deserialize = _primitive_deserializers[cls]
+    except KeyError:
         raise TypeError(
             "'{0}' is not a primitive type.".format(typing._type_repr(cls))
         )
-    return d
+    return deserialize(data)
+
+
+_JSON_NUMBER_KINDS = integer_types + (float, decimal.Decimal)
+_JSON_NUMERIC_KINDS = _JSON_NUMBER_KINDS + string_types
+_primitive_json_kinds = {
+    datetime.datetime: string_types,
+    datetime.date: string_types,
+    int: _JSON_NUMERIC_KINDS,
+    float: _JSON_NUMERIC_KINDS,
+    uuid.UUID: string_types,
+    bool: (bool,),
+    numbers.Integral: (numbers.Integral,),
+    decimal.Decimal: _JSON_NUMERIC_KINDS,
+    text_type: (text_type,),
+}
+
+
+def _get_json_kinds(cls):
+    """Get the Python types of JSON values that can be deserialized
+    into ``cls``.  It's used to skip members of an optional type which
+    are impossible to deserialize the given value into.
+
+    :param cls: A type to deserialize values into.
+    :return: A tuple of Python types of JSON values, or :const:`None`
+             if any values could be deserialized.
+
+    """
+    if (hasattr(cls, '__nirum_tag__') or hasattr(cls, 'Tag') or
+            hasattr(cls, '__nirum_record_behind_name__')):
+        return dict,
+    elif (hasattr(cls, '__nirum_get_inner_type__') or
+          hasattr(cls, '__nirum_inner_type__')):
+        return _get_json_kinds(_get_unboxed_inner_type(cls))
+    elif type(cls) is typing.TupleMeta:
+        return list, tuple
+    elif is_support_abstract_type(cls):
+        if (cls.__origin__ or cls) is typing.Dict:
+            return dict, list, tuple
+        return list, tuple
+    elif is_optional_type(cls):
+        kinds = [_NONE_TYPE]
+        for union_type in get_union_types(cls):
+            if union_type is not _NONE_TYPE:
+                member_kinds = _get_json_kinds(union_type)
+                if member_kinds is None:
+                    return None
+                kinds.extend(member_kinds)
+        return tuple(kinds)
+    elif callable(cls) and cls in _NIRUM_PRIMITIVE_TYPE:
+        return _primitive_json_kinds[cls]
+    elif isinstance(cls, enum.EnumMeta):
+        return tuple(set(type(member.value) for member in cls))
+    return None
+
+
+_FAILURE = object()
+
+
+def _compile_try_deserializer(cls):
+    """Compile a function to try deserializing a value into ``cls``.
+    Unlike deserializers, it returns :data:`_FAILURE` instead of raising
+    :exc:`ValueError` if the value cannot be deserialized.  Values of
+    impossible JSON types are rejected without even trying.
+
+    """
+    deserialize = get_deserializer(cls)
+    kinds = _get_json_kinds(cls)
+
+    def try_deserialize(data):
+        if kinds is not None and not isinstance(data, kinds):
+            return _FAILURE
+        try:
+            return deserialize(data)
+        except ValueError:
+            return _FAILURE
+    return try_deserialize
+
+
+def _compile_optional_deserializer(cls):
+    try_deserializers = [
+        _compile_try_deserializer(union_type)
+        for union_type in get_union_types(cls)
+        if union_type is not _NONE_TYPE
+    ]
+
+    def deserialize(data):
+        if data is None:
+            return data
+        for try_deserialize in try_deserializers:
+            result = try_deserialize(data)
+            if result is not _FAILURE:
+                return result
+        raise _DeserializationError(_format_not_deserializable, cls, data)
+    return deserialize
 
 
 def deserialize_optional(cls, data):
     if not is_optional_type(cls):
         raise ValueError('{!r} is not optional type'.format(cls))
-    union_types = get_union_types(cls)
-    if data is None:
-        return data
-    for union_type in union_types:
-        if isinstance(None, union_type):
-            continue
-        else:
-            try:
-                return deserialize_meta(union_type, data)
-            except ValueError:
-                continue
-    else:
-        raise ValueError()
+    return get_deserializer(cls)(data)
+
+
+def _compile_nominal_deserializer(deserialize_nominal_type, cls):
+    # The compiled deserializer refers to the type only weakly so that
+    # the cache entry does not keep its own key alive.
+    cls_ref = weakref.ref(cls)
+
+    def deserialize(data):
+        return deserialize_nominal_type(cls_ref(), data)
+    return deserialize
+
 
+def _compile_planned_deserializer(deserialize_with_plan, cls,
+                                  plans, build_plan):
+    # Similar to _compile_nominal_deserializer() except that the plan of
+    # the type is looked up only once, and then kept by the deserializer.
+    cls_ref = weakref.ref(cls)
+    plan = []
 
-def deserialize_meta(cls, data):
+    def deserialize(data):
+        cls = cls_ref()
+        if not plan:
+            plan.append(_get_cached(plans, cls, build_plan))
+        return deserialize_with_plan(cls, plan[0], data)
+    return deserialize
+
+
+def _compile_enum_deserializer(cls):
+    # Calling an enum type is slow, so that members are looked up through
+    # a precomputed dict first.  Leave anything else to the enum type,
+    # e.g., raising an error.
+    members = dict(
+        (member.value, member) for member in cls.__members__.values()
+    )
+
+    def deserialize(data):
+        try:
+            return members[data]
+        except (KeyError, TypeError):
+            return cls(data)
+    return deserialize
+
+
+def compile_deserializer(cls):
+    """Turn the given type into a function specialized to deserialize
+    values of the type.
+
+    Unlike :func:`deserialize_meta()`, it doesn't cache the result.
+    Use :func:`get_deserializer()` instead unless you need a fresh one.
+
+    :param cls: A type to deserialize values into.  It can be a Nirum record,
+                union, unboxed, or enum type, a generic collection type
+                from :mod:`typing`, an optional type, or a primitive type.
+    :return: A function that takes a JSON-compatible value and returns
+             a deserialized value.
+
+    .. versionadded:: 0.6.4
+
+    """
     if hasattr(cls, '__nirum_tag__') or hasattr(cls, 'Tag'):
-        d = deserialize_union_type(cls, data)
+        register_type(cls)
+        return _compile_nominal_deserializer(deserialize_union_type, cls)
     elif hasattr(cls, '__nirum_record_behind_name__'):
-        d = deserialize_record_type(cls, data)
+        register_type(cls)
+        return _compile_planned_deserializer(
+            _deserialize_record_type, cls,
+            _record_fields, _get_record_fields
+        )
     elif (hasattr(cls, '__nirum_get_inner_type__') or
           hasattr(cls, '__nirum_inner_type__')):
-        d = deserialize_unboxed_type(cls, data)
+        return _compile_planned_deserializer(
+            _deserialize_unboxed_type, cls,
+            _unboxed_inner_deserializers, _get_unboxed_inner_deserializer
+        )
     elif type(cls) is typing.TupleMeta:
         # typing.Tuple doesn't have either `__origin__` and `__args__`
         # so it have to be handled special case.
-        d = deserialize_tuple_type(cls, data)
+        return _compile_tuple_deserializer(cls)
     elif is_support_abstract_type(cls):
-        d = deserialize_abstract_type(cls, data)
+        return _compile_abstract_deserializer(cls)
     elif is_optional_type(cls):
-        d = deserialize_optional(cls, data)
+        return _compile_optional_deserializer(cls)
     elif callable(cls) and cls in _NIRUM_PRIMITIVE_TYPE:
-        d = deserialize_primitive(cls, data)
+        return _primitive_deserializers[cls]
     elif isinstance(cls, enum.EnumMeta):
-        d = cls(data)
-    else:
+        return _compile_enum_deserializer(cls)
+
+    def deserialize(data):
         raise TypeError('data is not deserializable: {!r} as {!r}'.format(
             data, cls
         ))
-    return d
+    return deserialize
 
 
-def deserialize_unboxed_type(cls, value):
+def get_deserializer(cls):
+    """Get the deserializer function of the given type.  Deserializers are
+    compiled by :func:`compile_deserializer()` only once per type, and
+    then cached.  The cache is thread-safe and refers to types only weakly.
+
+    :param cls: A type to deserialize values into.
+    :return: A function that takes a JSON-compatible value and returns
+             a deserialized value.
+
+    .. versionadded:: 0.6.4
+
+    """
+    return _get_cached(_deserializers, cls, compile_deserializer)
+
+
+class DeserializationBudget(object):
+    """Limits of a JSON value to deserialize, to prevent a hostile or buggy
+    peer from making a deserializer allocate or loop without any bound.
+    Every limit is unbounded if it's :const:`None`.
+
+    :param max_depth: The maximum nesting depth of arrays and objects.
+    :param max_elements: The maximum total number of array elements and
+                         object members in the whole value.
+    :param max_string_length: The maximum length of each string, including
+                              object keys.
+    :param max_bytes: The maximum size of an encoded JSON payload, which is
+                      checked by :meth:`check_bytes()` before it's parsed.
+
+    .. versionadded:: 0.6.4
+
+    """
+
+    __slots__ = 'max_depth', 'max_elements', 'max_string_length', 'max_bytes'
+
+    def __init__(self, max_depth=None, max_elements=None,
+                 max_string_length=None, max_bytes=None):
+        self.max_depth = max_depth
+        self.max_elements = max_elements
+        self.max_string_length = max_string_length
+        self.max_bytes = max_bytes
+
+    def __repr__(self):
+        return '{0}.{1}({2})'.format(
+            type(self).__module__, type(self).__name__,
+            ', '.join('{0}={1!r}'.format(name, getattr(self, name))
+                      for name in self.__slots__)
+        )
+
+    def check_bytes(self, payload):
+        """Check the size of an encoded JSON payload.
+
+        :param payload: An encoded JSON payload.
+        :type payload: :class:`bytes`
+        :raise nirum.exc.DeserializationBudgetError: When the payload is
+                                                     too large.
+
+        """
+        self.check_size(len(payload))
+
+    def check_size(self, size):
+        """Check the size of an encoded JSON payload before it's read, e.g.,
+        the ``Content-Length`` of a request.
+
+        :param size: The number of bytes of an encoded JSON payload.
+        :type size: :class:`numbers.Integral`
+        :raise nirum.exc.DeserializationBudgetError: When the payload is
+                                                     too large.
+
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            raise DeserializationBudgetError(
+                'The payload is too large; it exceeds {0} bytes.'.format(
+                    self.max_bytes
+                )
+            )
+
+    def check(self, data):
+        """Check a parsed JSON value.  It walks the value without recursion,
+        and aborts as soon as any limit is exceeded.
+
+        :param data: A parsed JSON value.
+        :raise nirum.exc.DeserializationBudgetError: When the value exceeds
+                                                     any limit.
+
+        """
+        max_depth = self.max_depth
+        max_elements = self.max_elements
+        max_string_length = self.max_string_length
+        elements = 0
+        stack = [(data, 1)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            value, depth = pop()
+            if isinstance(value, string_types):
+                if (max_string_length is not None and
+                        len(value) > max_string_length):
+                    raise DeserializationBudgetError(
+                        'A string is too long; it exceeds {0} '
+                        'characters.'.format(max_string_length)
+                    )
+                continue
+            elif isinstance(value, collections.Mapping):
+                members = value.items()
+            elif isinstance(value, (list, tuple)):
+                members = value
+            else:
+                continue
+            if max_depth is not None and depth > max_depth:
+                raise DeserializationBudgetError(
+                    'The value is nested too deeply; it exceeds '
+                    '{0} levels.'.format(max_depth)
+                )
+            elements += len(value)
+            if max_elements is not None and elements > max_elements:
+                raise DeserializationBudgetError(
+                    'The value has too many elements; it exceeds '
+                    '{0} elements.'.format(max_elements)
+                )
+            depth += 1
+            if members is value:
+                for member in members:
+                    push((member, depth))
+            else:
+                for key, member in members:
+                    push((key, depth))
+                    push((member, depth))
+
+
+def deserialize_meta(cls, data, budget=None, fields=None):
+    """Deserialize a JSON-compatible value into the given type.
+
+    :param cls: A type to deserialize the value into.
+    :param data: A JSON-compatible value.
+    :param budget: Limits to check the value against before it's
+                   deserialized.  No limits by default.
+    :type budget: :class:`DeserializationBudget`
+    :param fields: A field mask to decode only some fields of records and
+                   unions, e.g., ``{'upper_left': {'left'}}``.  It's a set
+                   of facial field names to decode, or a mapping of them to
+                   nested masks of their values (:const:`None` to decode
+                   the whole value).  Masks of sequences, sets, and optional
+                   types apply to their elements.  Fields left out are kept
+                   as they were given, and decoded when they are accessed
+                   first time; see also :func:`is_field_loaded()`.
+                   Names absent from the type are ignored, so that a mask
+                   can list fields of several tags of a union.
+                   All fields are decoded by default.
+    :return: A deserialized value.
+    :raise nirum.exc.DeserializationBudgetError: When the value exceeds
+                                                 the ``budget``.
+
+    .. versionchanged:: 0.6.4
+       Added ``budget`` and ``fields`` options.
+
+    """
+    if budget is not None:
+        budget.check(data)
+    if fields is not None:
+        return _deserialize_projected(cls, data, fields)
+    return get_deserializer(cls)(data)
+
+
+def deserialize_json(cls, data, budget=None):
+    """Parse a JSON document and deserialize it into the given type.
+    The document is parsed through the current backend of
+    :mod:`nirum.jsonlib`.
+
+    :param cls: A type to deserialize the document into.
+    :param data: A JSON document encoded in UTF-8.
+    :type data: :class:`bytes`
+    :param budget: Limits to check the document against before it's
+                   deserialized.  No limits by default.
+    :type budget: :class:`DeserializationBudget`
+    :return: A deserialized value.
+    :raise ValueError: When the document is not a valid JSON, or it's not
+                       deserializable into the type.
+    :raise nirum.exc.DeserializationBudgetError: When the document exceeds
+                                                 the ``budget``.
+
+    .. versionadded:: 0.6.4
+
+    """
+    if budget is not None:
+        budget.check_bytes(data)
+    return deserialize_meta(cls, loads_bytes(data), budget)
+
+
+def deserialize_any(data, lazy=False):
+    """Deserialize a record or union value without knowing its type up
+    front.  Its type is looked up by its ``"_type"`` (and ``"_tag"``)
+    through :mod:`nirum.registry`.
+
+    :param data: A JSON-compatible mapping of a record or union value.
+    :param lazy: If :const:`True`, fields are not decoded until they are
+                 accessed first time.  See also
+                 :func:`deserialize_record_type()`.  :const:`False`
+                 by default.
+    :return: A record or union value.
+    :raise ValueError: When the type of the value is not registered.
+
+    .. versionadded:: 0.6.4
+
+    """
+    if not isinstance(data, collections.Mapping):
+        raise ValueError('Expected an object, not {0!r}.'.format(data))
+    type_name = data.get('_type')
+    tag_name = data.get('_tag')
+    cls = lookup_type(type_name, tag_name)
+    if cls is None:
+        if tag_name is None:
+            message = 'No registered record type "{0}".'.format(type_name)
+        else:
+            message = 'No registered union type "{0}" with tag "{1}".'.format(
+                type_name, tag_name
+            )
+        raise ValueError(message)
+    if lazy:
+        if tag_name is None:
+            return deserialize_record_type(cls, data, lazy=True)
+        return deserialize_union_type(cls, data, lazy=True)
+    return get_deserializer(cls)(data)
+
+
+def deserialize_many(cls, values, return_exceptions=False):
+    """Deserialize many values of the same type at once.  The type is
+    resolved only once for the whole batch.
+
+    :param cls: A type to deserialize values into.
+    :param values: An iterable of JSON-compatible values.
+    :param return_exceptions: If :const:`True`, an error from a value
+                              doesn't abort the batch, but is put in place
+                              of the value in the result list instead.
+                              :const:`False` by default.
+    :return: A list of deserialized values in the same order.
+    :rtype: :class:`~typing.Sequence`
+
+    .. versionadded:: 0.6.4
+
+    """
+    deserialize = get_deserializer(cls)
+    if not return_exceptions:
+        return [deserialize(value) for value in values]
+    result = []
+    append = result.append
+    for value in values:
+        try:
+            append(deserialize(value))
+        except (ValueError, TypeError, KeyError) as e:
+            append(e)
+    return result
+
+
+def _get_nested_types(cls):
+    if hasattr(cls, '__nirum_service_methods__'):
+        nested = []
+        for type_hints in cls.__nirum_service_methods__.values():
+            version = type_hints.get('_v', 1)
+            for name, type_ in type_hints.items():
+                if name == '_return' or not name.startswith('_'):
+                    nested.append(type_() if version >= 2 else type_)
+        return nested
+    elif hasattr(cls, '__nirum_tag__'):
+        _get_cached(_union_tags, cls, _index_union_tags)
+        tag_types = cls.__nirum_tag_types__
+        if callable(tag_types):
+            tag_types = dict(tag_types())
+        return tag_types.values()
+    elif hasattr(cls, 'Tag'):
+        _get_cached(_union_tags, cls, _index_union_tags)
+        return cls.__subclasses__()
+    elif hasattr(cls, '__nirum_record_behind_name__'):
+        _get_cached(_record_fields, cls, _get_record_fields)
+        field_types = cls.__nirum_field_types__
+        if callable(field_types):
+            field_types = field_types()
+        return field_types.values()
+    elif (hasattr(cls, '__nirum_get_inner_type__') or
+          hasattr(cls, '__nirum_inner_type__')):
+        _get_cached(_unboxed_inner_deserializers, cls,
+                    _get_unboxed_inner_deserializer)
+        return [_get_unboxed_inner_type(cls)]
+    return getattr(cls, '__args__', None) or ()
+
+
+def precompile(*targets):
+    """Compile deserializers of the given types, and of all types they
+    refer to, up front.  Deserializers are otherwise compiled when values of
+    the types are deserialized first time, which slows down first requests
+    a worker serves.
+
+    It's recommended to call this for generated modules at startup, before
+    a preforking server (e.g., ``gunicorn --preload``) forks its workers, so
+    that workers share compiled deserializers instead of compiling their own.
+
+    :param \\*targets: Types to compile deserializers of, modules to compile
+                      deserializers of all types defined in, or services
+                      to compile deserializers of all method parameter and
+                      return types of.
+    :return: The number of types compiled.
+    :rtype: :class:`int`
+
+    .. versionadded:: 0.6.4
+
+    """
+    stack = []
+    for target in targets:
+        if isinstance(target, types.ModuleType):
+            stack.extend(_iter_module_types(target))
+        else:
+            stack.append(target)
+    seen = set()
+    while stack:
+        cls = stack.pop()
+        if cls is None or isinstance(cls, typing.TypeVar) or cls in seen:
+            continue
+        seen.add(cls)
+        if not hasattr(cls, '__nirum_service_methods__'):
+            get_deserializer(cls)
+        stack.extend(_get_nested_types(cls))
+    return len(seen)
+
+
+def _get_collection_element_type(cls):
+    origin = getattr(cls, '__origin__', None) or cls
+    if origin not in _ITERABLE_PRIMITIVE_TYPES or origin is typing.Mapping:
+        raise TypeError('{0} is not a sequence or set type.'.format(
+            typing._type_repr(cls)
+        ))
+    type_params = (cls.__args__
+                   if hasattr(cls, '__args__')
+                   else cls.__parameters__)
+    elem_type, = type_params
+    if isinstance(elem_type, typing.TypeVar):
+        elem_type = None
+    return _ITERABLE_PRIMITIVE_TYPES[origin], elem_type
+
+
+def _is_free_threaded():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _deserialize_chunk(elem_type, chunk):
+    # It has to be a module-level function so that it can be pickled and
+    # sent to worker processes along with the element type.
+    if elem_type is None:
+        return list(chunk)
+    return deserialize_many(elem_type, chunk)
+
+
+def deserialize_parallel(cls, data, threshold=10000, chunk_size=None,
+                         executor=None, max_workers=None):
+    """Deserialize a large array by splitting it into chunks and decoding
+    them in parallel.  The result is the same as :func:`deserialize_meta()`,
+    in the same order.
+
+    Values decoded by worker processes are sent back by pickling, so that
+    it pays off only for arrays of complex values that are large enough;
+    run :file:`benchmarks/deserialize_parallel.py` to find where it does
+    on your machine.
+
+    :param cls: A collection type of the array, e.g.,
+                ``typing.Sequence[Point]``.
+    :param data: A JSON-compatible array.
+    :param threshold: Arrays shorter than this are decoded in the current
+                      thread without any workers.  10,000 by default.
+    :param chunk_size: The number of elements to send to a worker at a time.
+                       By default the array is split into four times as
+                       many chunks as workers.
+    :param executor: A :class:`concurrent.futures.Executor` to decode chunks
+                     on.  If omitted, a new
+                     :class:`~concurrent.futures.ProcessPoolExecutor`
+                     (or :class:`~concurrent.futures.ThreadPoolExecutor`
+                     on free-threaded builds of Python) is made and shut
+                     down on every call, so passing a long-lived one is
+                     recommended.  On Python 2 the ``futures`` backport
+                     is required to omit it.
+    :param max_workers: The number of workers to split the array for.
+                        The number of CPUs by default.
+    :return: A deserialized collection.
+
+    .. versionadded:: 0.6.4
+
+    """
+    primitive_type, elem_type = _get_collection_element_type(cls)
+    if not isinstance(data, collections.Sequence):
+        data = list(data)
+    length = len(data)
+    if length < threshold:
+        return deserialize_meta(cls, data)
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    if chunk_size is None:
+        chunk_size = max(1, -(-length // (max_workers * 4)))
+    chunks = [data[i:i + chunk_size] for i in range(0, length, chunk_size)]
+    own_executor = executor is None
+    if own_executor:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if _is_free_threaded():
+            executor = ThreadPoolExecutor(max_workers)
+        else:
+            executor = ProcessPoolExecutor(max_workers)
     try:
-        inner_type = cls.__nirum_get_inner_type__()
-    except AttributeError:
-        # FIXME: __nirum_inner_type__ is for backward compatibility;
-        #        remove __nirum_inner_type__ in the near future.
-        inner_type = cls.__nirum_inner_type__
+        results = executor.map(
+            functools.partial(_deserialize_chunk, elem_type),
+            chunks
+        )
+        return primitive_type(itertools.chain.from_iterable(results))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def _get_unboxed_inner_deserializer(cls):
+    inner_type = _get_unboxed_inner_type(cls)
     deserializer = getattr(inner_type, '__nirum_deserialize__', None)
     if deserializer:
-        value = deserializer(value)
-    else:
-        value = deserialize_meta(inner_type, value)
-    return cls(value=value)
+        return deserializer
+    return get_deserializer(inner_type)
+
+
+def _deserialize_unboxed_type(cls, deserialize_inner, value):
+    return cls(value=deserialize_inner(value))
+
+
+def deserialize_unboxed_type(cls, value):
+    deserialize_inner = _get_cached(_unboxed_inner_deserializers, cls,
+                                    _get_unboxed_inner_deserializer)
+    return _deserialize_unboxed_type(cls, deserialize_inner, value)
 
 
 deserialize_boxed_type = deserialize_unboxed_type
@@ -239,71 +1206,521 @@ deserialize_boxed_type = deserialize_unboxed_type
 #        remove it in the near future
 
 
-def deserialize_record_type(cls, value):
-    if '_type' not in value:
-        raise ValueError('"_type" field is missing.')
-    if not cls.__nirum_record_behind_name__ == value['_type']:
-        raise ValueError(
-            '{0} expect "_type" equal to "{1.__nirum_record_behind_name__}"'
-            ', but found {2}.'.format(
-                typing._type_repr(cls),
-                cls, value['_type']
-            )
-        )
-    args = {}
-    behind_names = cls.__nirum_field_names__.behind_names
+def _compile_fields(cls, field_types, behind_names):
+    facial_fields = {
+        name: (name, _get_field_deserializer(cls, name, field_type))
+        for name, field_type in field_types.items()
+    }
+    fields = dict(facial_fields)
+    for behind_name, name in behind_names.items():
+        if name in facial_fields:
+            fields[behind_name] = facial_fields[name]
+    return fields
+
+
+def _get_record_fields(cls):
     field_types = cls.__nirum_field_types__
     if callable(field_types):
         field_types = field_types()
         # old compiler could generate non-callable dictionary
+    return _compile_fields(cls, field_types,
+                           cls.__nirum_field_names__.behind_names)
+
+
+_RECORD_META_FIELDS = frozenset(['_type'])
+_UNION_META_FIELDS = frozenset(['_type', '_tag'])
+_MISSING = object()
+
+
+def _construct(cls, fields, value, meta_fields):
+    args = {}
     for attribute_name, item in value.items():
-        if attribute_name == '_type':
+        if attribute_name in meta_fields:
             continue
-        if attribute_name in behind_names:
-            name = behind_names[attribute_name]
-        else:
-            name = attribute_name
-        args[name] = deserialize_meta(field_types[name], item)
-    return cls(**args)
+        name, deserialize = fields[attribute_name]
+        args[name] = deserialize(item)
+    return construct_trusted(cls, args)
+
+
+def _lazy_getattr(self, name):
+    raw = self.__dict__['__nirum_raw__']
+    try:
+        item = raw[name]
+    except KeyError:
+        raise AttributeError(name)
+    value = type(self).__nirum_lazy_fields__[name](item)
+    object.__setattr__(self, name, value)
+    raw.pop(name, None)
+    return value
 
 
-def deserialize_union_type(cls, value):
+def _serialize_lazily(self):
+    cls = type(self)
+    raw = self.__dict__['__nirum_raw__']
+    serialized = dict(cls.__nirum_lazy_header__)
+    for name, behind_name in cls.__nirum_lazy_names__:
+        # Fields never accessed are passed through without being decoded,
+        # and thus without being validated either.
+        item = raw.get(name, _MISSING)
+        if item is _MISSING:
+            item = serialize_meta(getattr(self, name))
+        serialized[behind_name] = item
+    return serialized
+
+
+def _construct_eagerly(cls, args):
+    return construct_trusted(cls, args)
+
+
+def _reduce_lazily(self):
+    cls = type(self)
+    return _construct_eagerly, (
+        cls.__bases__[0],
+        {name: getattr(self, name) for name, _ in cls.__nirum_lazy_names__},
+    )
+
+
+def _make_lazy_class(cls):
+    """Make a lazy proxy class of the given record type or tag type.
+    Its instances hold raw field values, and decode each field when it's
+    accessed first time.
+
+    """
+    if hasattr(cls, '__nirum_tag__'):
+        header = {
+            '_type': cls.__nirum_union_behind_name__,
+            '_tag': cls.__nirum_tag__.value,
+        }
+        names = cls.__nirum_tag_names__
+    else:
+        header = {'_type': cls.__nirum_record_behind_name__}
+        names = cls.__nirum_field_names__
+    field_types = _get_field_types(cls)
+    return type(cls)(cls.__name__, (cls,), {
+        '__module__': cls.__module__,
+        '__qualname__': getattr(cls, '__qualname__', cls.__name__),
+        '__doc__': cls.__doc__,
+        '__nirum_lazy_fields__': {
+            name: _get_field_deserializer(cls, name, field_type)
+            for name, field_type in field_types.items()
+        },
+        '__nirum_lazy_header__': header,
+        '__nirum_lazy_names__': [
+            (slot, names[slot] if slot in names else slot)
+            for slot in cls.__slots__
+        ],
+        '__getattr__': _lazy_getattr,
+        '__nirum_serialize__': _serialize_lazily,
+        '__reduce__': _reduce_lazily,
+    })
+
+
+def _get_lazy_class(cls):
+    # A proxy class refers to its base class, so that the cache cannot hold
+    # it strongly; otherwise the key would never be freed.  The base class
+    # holds its proxy class instead, which makes just a collectable cycle.
+    ref = _lazy_classes.get(cls)
+    lazy_cls = None if ref is None else ref()
+    if lazy_cls is None:
+        lazy_cls = _make_lazy_class(cls)
+        with _cache_lock:
+            ref = _lazy_classes.get(cls)
+            cached = None if ref is None else ref()
+            if cached is not None:
+                return cached
+            cls.__nirum_lazy_class__ = lazy_cls
+            _lazy_classes[cls] = weakref.ref(lazy_cls)
+    return lazy_cls
+
+
+def _construct_lazily(cls, fields, value, meta_fields):
+    lazy_cls = _get_lazy_class(cls)
+    raw = {}
+    for attribute_name, item in value.items():
+        if attribute_name in meta_fields:
+            continue
+        try:
+            name, _ = fields[attribute_name]
+        except KeyError:
+            break
+        raw[name] = item
+    else:
+        if len(raw) == len(lazy_cls.__nirum_lazy_fields__):
+            instance = lazy_cls.__new__(lazy_cls)
+            instance.__dict__['__nirum_raw__'] = raw
+            return instance
+    # Let the eager path report unknown or missing fields.
+    return _construct(cls, fields, value, meta_fields)
+
+
+def _deserialize_record_type(cls, fields, value, lazy=False):
+    if '_type' not in value:
+        raise ValueError('"_type" field is missing.')
+    if not cls.__nirum_record_behind_name__ == value['_type']:
+        raise _DeserializationError(
+            _format_unexpected_value,
+            cls, '_type', cls.__nirum_record_behind_name__, value['_type']
+        )
+    if lazy:
+        return _construct_lazily(cls, fields, value, _RECORD_META_FIELDS)
+    return _construct(cls, fields, value, _RECORD_META_FIELDS)
+
+
+def deserialize_record_type(cls, value, lazy=False):
+    """Deserialize a record value.
+
+    :param cls: A record type.
+    :param value: A JSON-compatible mapping.
+    :param lazy: If :const:`True`, fields are not decoded until they are
+                 accessed first time.  The returned lazy record still
+                 compares equal to and has the same hash as the eager one,
+                 and fields never accessed are serialized as they were
+                 given without being decoded.  :const:`False` by default.
+                 Note that field values are not validated up front either:
+                 an invalid field value raises :exc:`ValueError` when it's
+                 accessed (or compared, hashed, or pickled) rather than
+                 when the record is deserialized, and it's serialized back
+                 as it was given if it's never accessed.
+    :return: A record value.
+
+    .. versionchanged:: 0.6.4
+       Added ``lazy`` option.
+
+    """
+    fields = _get_cached(_record_fields, cls, _get_record_fields)
+    return _deserialize_record_type(cls, fields, value, lazy)
+
+
+def _index_union_tags(cls):
+    """Build the index of the given union type's tags.
+
+    :param cls: A union type, or a tag type of a union.
+    :return: A pair of the number of subclasses the index is built from
+             (:const:`None` if ``cls`` is a tag type) and the mapping of
+             behind tag names to pairs of a weak reference to the tag type
+             and its field plan.
+
+    """
+    if hasattr(cls, '__nirum_tag__'):
+        subclass_count = None
+        tag_classes = [cls]
+    else:
+        tag_classes = cls.__subclasses__()
+        subclass_count = len(tag_classes)
+    tags = {}
+    for tag_cls in tag_classes:
+        tag = getattr(tag_cls, '__nirum_tag__', None)
+        if tag is None:
+            continue
+        tag_types = tag_cls.__nirum_tag_types__
+        if callable(tag_types):  # old compiler could generate non-callable map
+            tag_types = dict(tag_types())
+        fields = _compile_fields(tag_cls, tag_types,
+                                 tag_cls.__nirum_tag_names__.behind_names)
+        tags[tag.value] = weakref.ref(tag_cls), fields
+    return subclass_count, tags
+
+
+def _find_union_tag(cls, tag):
+    subclass_count, tags = _get_cached(_union_tags, cls, _index_union_tags)
+    try:
+        return tags[tag]
+    except (KeyError, TypeError):
+        pass
+    if subclass_count is None or \
+       subclass_count == len(cls.__subclasses__()):
+        return None
+    # New tag types have been defined since the index was built.
+    index = _index_union_tags(cls)
+    with _cache_lock:
+        _union_tags[cls] = index
+    try:
+        return index[1][tag]
+    except (KeyError, TypeError):
+        return None
+
+
+def deserialize_union_type(cls, value, lazy=False):
+    """Deserialize a union value.
+
+    :param cls: A union type, or one of its tag types.
+    :param value: A JSON-compatible mapping.
+    :param lazy: If :const:`True`, fields are not decoded until they are
+                 accessed first time.  See also
+                 :func:`deserialize_record_type()`.  :const:`False`
+                 by default.
+    :return: A union value.
+
+    .. versionchanged:: 0.6.4
+       Added ``lazy`` option.
+
+    """
     if '_type' not in value:
         raise ValueError('"_type" field is missing.')
     if '_tag' not in value:
         raise ValueError('"_tag" field is missing.')
-    if not hasattr(cls, '__nirum_tag__'):
-        for sub_cls in cls.__subclasses__():
-            if sub_cls.__nirum_tag__.value == value['_tag']:
-                cls = sub_cls
-                break
+    found = _find_union_tag(cls, value['_tag'])
+    if found is not None:
+        cls = found[0]()
+    elif not hasattr(cls, '__nirum_tag__'):
+        raise _DeserializationError(_format_unknown_tag, cls, value)
+    if not cls.__nirum_union_behind_name__ == value['_type']:
+        raise _DeserializationError(
+            _format_unexpected_value,
+            cls, '_type', cls.__nirum_union_behind_name__, value['_type']
+        )
+    if found is None:
+        raise _DeserializationError(
+            _format_unexpected_value,
+            cls, '_tag', cls.__nirum_tag__.value, value['_tag']
+        )
+    if lazy:
+        return _construct_lazily(cls, found[1], value, _UNION_META_FIELDS)
+    return _construct(cls, found[1], value, _UNION_META_FIELDS)
+
+
+def _normalize_field_mask(fields):
+    if isinstance(fields, collections.Mapping):
+        return dict(fields)
+    elif isinstance(fields, string_types):
+        raise TypeError('fields must be a set or a mapping of field names, '
+                        'not a string: ' + repr(fields))
+    return dict.fromkeys(fields)
+
+
+def _deserialize_projected(cls, data, fields):
+    if (hasattr(cls, '__nirum_tag__') or hasattr(cls, 'Tag') or
+            hasattr(cls, '__nirum_record_behind_name__')):
+        if not isinstance(data, collections.Mapping):
+            return get_deserializer(cls)(data)
+        if hasattr(cls, '__nirum_record_behind_name__'):
+            instance = deserialize_record_type(cls, data, lazy=True)
         else:
-            raise ValueError(
-                '{0!r} is not deserialzable tag of `{1}`.'.format(
-                    value, typing._type_repr(cls)
+            instance = deserialize_union_type(cls, data, lazy=True)
+        raw = getattr(instance, '__dict__', {}).get('__nirum_raw__')
+        if raw is None:
+            return instance  # Decoded eagerly to report an error.
+        field_types = None
+        for name, subfields in _normalize_field_mask(fields).items():
+            if name not in raw:
+                continue
+            elif subfields is None:
+                getattr(instance, name)
+                continue
+            if field_types is None:
+                field_types = _get_field_types(type(instance).__bases__[0])
+            value = _deserialize_projected(field_types[name], raw[name],
+                                           subfields)
+            object.__setattr__(instance, name, value)
+            del raw[name]
+        return instance
+    elif is_optional_type(cls):
+        if data is None:
+            return None
+        inner_types = [t for t in get_union_types(cls) if t is not _NONE_TYPE]
+        if len(inner_types) == 1:
+            return _deserialize_projected(inner_types[0], data, fields)
+    elif is_support_abstract_type(cls):
+        try:
+            primitive_type, elem_type = _get_collection_element_type(cls)
+        except TypeError:
+            pass  # Masks don't apply to maps.
+        else:
+            if elem_type is not None and isinstance(data, list):
+                return primitive_type(
+                    _deserialize_projected(elem_type, elem, fields)
+                    for elem in data
                 )
-            )
-    if not cls.__nirum_union_behind_name__ == value['_type']:
-        raise ValueError('{0} expect "_type" equal to'
-                         ' "{1.__nirum_union_behind_name__}"'
-                         ', but found {2}.'.format(typing._type_repr(cls), cls,
-                                                   value['_type']))
-    if not cls.__nirum_tag__.value == value['_tag']:
-        raise ValueError('{0} expect "_tag" equal to'
-                         ' "{1.__nirum_tag__.value}"'
-                         ', but found {1}.'.format(typing._type_repr(cls),
-                                                   cls, value['_tag']))
-    args = {}
-    behind_names = cls.__nirum_tag_names__.behind_names
-    for attribute_name, item in value.items():
-        if attribute_name in {'_type', '_tag'}:
-            continue
-        if attribute_name in behind_names:
-            name = behind_names[attribute_name]
+    return get_deserializer(cls)(data)
+
+
+def is_field_loaded(value, name):
+    """Check whether the given field of a record or union value has been
+    decoded.  Fields of lazy values (see also
+    :func:`deserialize_record_type()`) and fields left out of a field mask
+    (see also :func:`deserialize_meta()`) are not decoded until they are
+    accessed first time.
+
+    :param value: A record or union value.
+    :param name: The facial name of a field.
+    :type name: :class:`str`
+    :return: :const:`True` if the field has been decoded.
+    :rtype: :class:`bool`
+
+    .. versionadded:: 0.6.4
+
+    """
+    raw = getattr(value, '__dict__', {}).get('__nirum_raw__')
+    return raw is None or name not in raw
+
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_match_number_tail = re.compile(r'[0-9.eE+-]+\Z').match
+_json_decoder = json.JSONDecoder()
+_JSON_LITERALS = 'true', 'false', 'null', 'NaN', 'Infinity', '-Infinity'
+
+
+def _is_json_cut(error, buffer):
+    """Tell whether the given JSON decoding error can be due to the end
+    of the buffer, i.e., the value may be decoded once more is read.
+
+    """
+    pos = getattr(error, 'pos', None)
+    if pos is None:
+        # Python 2's json doesn't tell where the error is.
+        return True
+    elif pos >= len(buffer) or error.msg.startswith('Unterminated string'):
+        return True
+    elif error.msg.startswith('Invalid \\uXXXX escape'):
+        return len(buffer) - pos < 6
+    # A literal or a number cut in the middle, e.g., "tr" or "1.".
+    tail = buffer[pos:]
+    return (any(literal.startswith(tail) for literal in _JSON_LITERALS) or
+            _match_number_tail(tail) is not None)
+
+
+def _iter_text_chunks(fileobj, chunk_size):
+    if isinstance(fileobj, (bytes, text_type)):
+        chunks = [fileobj]
+    elif hasattr(fileobj, 'read'):
+        def read_chunks():
+            while True:
+                chunk = fileobj.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        chunks = read_chunks()
+    else:
+        chunks = fileobj
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    chunk = decoder.decode(b'', True)
+    if chunk:
+        yield chunk
+
+
+class _JSONArrayReader(object):
+    """Parse a JSON array from text chunks incrementally, and iterate over
+    its elements.  It holds only the unconsumed part of the input at a time.
+
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = u''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=1):
+        """Read at least ``size`` more characters (unless the input ends),
+        and drop the consumed part of the buffer.
+
+        :return: :const:`False` if there's nothing more to read.
+
+        """
+        if self.eof:
+            return False
+        pending = [self.buffer[self.pos:]]
+        read = 0
+        for chunk in self.chunks:
+            pending.append(chunk)
+            read += len(chunk)
+            if read >= size:
+                break
         else:
-            name = attribute_name
-        tag_types = cls.__nirum_tag_types__
-        if callable(tag_types):  # old compiler could generate non-callable map
-            tag_types = dict(tag_types())
-        args[name] = deserialize_meta(tag_types[name], item)
-    return cls(**args)
+            self.eof = True
+        self.buffer = u''.join(pending)
+        self.pos = 0
+        return read > 0
+
+    def peek(self):
+        """Skip whitespaces, and then return the next character.
+        Return an empty string if the input ends.
+
+        """
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            elif not self.fill():
+                return u''
+
+    def decode_value(self):
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buffer, self.pos)
+            except ValueError as e:
+                # The value may be incomplete yet; read the doubled size
+                # so that the total cost of retrying remains linear.
+                # Syntax errors in the middle are raised right away instead
+                # of reading the rest of the input into the buffer.
+                if not (_is_json_cut(e, self.buffer) and
+                        self.fill(len(self.buffer) - self.pos)):
+                    raise
+                continue
+            # A number or literal at the end of the buffer could be cut in
+            # the middle, e.g., "12" of "123", or "1" of "1.5" where only
+            # "1." or "1e" has been read yet.
+            if end == len(self.buffer):
+                cut = True
+            elif (type(value) is not bool and
+                    isinstance(value, _JSON_NUMBER_KINDS)):
+                cut = _match_number_tail(self.buffer, end) is not None
+            else:
+                cut = False
+            if not (cut and self.fill()):
+                self.pos = end
+                return value
+
+    def __iter__(self):
+        if self.peek() != u'[':
+            raise ValueError('expected a JSON array')
+        self.pos += 1
+        if self.peek() == u']':
+            self.pos += 1
+        else:
+            while True:
+                if not self.peek():
+                    raise ValueError('unexpected end of a JSON array')
+                yield self.decode_value()
+                delimiter = self.peek()
+                self.pos += 1
+                if delimiter == u']':
+                    break
+                elif delimiter != u',':
+                    raise ValueError(
+                        'expected "," or "]", but found {!r}'.format(delimiter)
+                    )
+        if self.peek():
+            raise ValueError('extra data after a JSON array')
+
+
+def deserialize_iter(cls, fileobj, chunk_size=65536):
+    """Deserialize a JSON array incrementally, and yield its elements one by
+    one.  Unlike :func:`deserialize_meta()`, it doesn't need the whole JSON
+    document to be loaded in memory at a time; only a single element is.
+
+    :param cls: A collection type of the array, e.g.,
+                ``typing.Sequence[Point]``.
+    :param fileobj: A file-like object to read a JSON array from,
+                    an iterable of chunks of the JSON array, or
+                    a JSON array string.  Chunks can be either
+                    :class:`bytes` encoded in UTF-8 or Unicode strings.
+    :param chunk_size: The size to read from ``fileobj`` at a time.
+    :return: An iterator of deserialized elements.
+
+    .. versionadded:: 0.6.4
+
+    """
+    _, elem_type = _get_collection_element_type(cls)
+    if elem_type is None:
+        deserialize = _identity
+    else:
+        deserialize = get_deserializer(elem_type)
+    reader = _JSONArrayReader(_iter_text_chunks(fileobj, chunk_size))
+    for elem in reader:
+        yield deserialize(elem)
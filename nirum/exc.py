@@ -3,6 +3,7 @@
 
 """
 __all__ = (
+    'DeserializationBudgetError',
     'InvalidNirumServiceMethodNameError',
     'InvalidNirumServiceMethodTypeError',
     'NirumProcedureArgumentError',
@@ -37,5 +38,14 @@ class NirumProcedureArgumentValueError(NirumProcedureArgumentError):
     """WIP"""
 
 
+class DeserializationBudgetError(ValueError):
+    """Raised when a value to deserialize exceeds limits of
+    a :class:`~nirum.deserialize.DeserializationBudget`.
+
+    .. versionadded:: 0.6.4
+
+    """
+
+
 class UnexpectedNirumResponseError(IOError):
     """TODO"""
@@ -0,0 +1,174 @@
+""":mod:`nirum.jsonlib` --- Pluggable JSON backends
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+The runtime parses and encodes JSON payloads through this module, so that
+a faster JSON library can be used instead of the standard :mod:`json`
+when it's installed.  The standard :mod:`json` is used by default; call
+:func:`set_backend()` to switch::
+
+    from nirum.jsonlib import set_backend
+    set_backend('auto')  # the fastest installed one
+
+Supported backends are ``'json'`` (the standard library), ``'orjson'``,
+``'rapidjson'``, ``'ujson'``, and ``'simplejson'``.
+
+Some backends cannot encode every value the standard :mod:`json` can:
+orjson rejects integers wider than 64 bits and object keys other than
+strings, python-rapidjson rejects keys other than strings, and ujson
+rejects integers wider than 64 bits.  Values these backends reject are
+encoded through the standard :mod:`json` instead, which is slower.
+Note that parsing such integers differs as well: orjson parses them into
+:class:`float` losing precision, and ujson raises :exc:`ValueError`.
+Prefer the standard :mod:`json` (the default) if payloads can have them.
+
+.. versionadded:: 0.6.4
+
+"""
+import importlib
+import json
+import threading
+
+__all__ = (
+    'BACKEND_NAMES', 'dumps_bytes', 'get_backend', 'load_backend',
+    'loads_bytes', 'set_backend',
+)
+
+#: (:class:`typing.Sequence`\ [:class:`str`]) Names of supported backends,
+#: fastest first.
+BACKEND_NAMES = 'orjson', 'rapidjson', 'ujson', 'simplejson', 'json'
+
+
+def _make_json_backend(module):
+    # Python 3.6 or higher can load bytes, but older versions can't.
+    loads = module.loads
+    dumps = module.dumps
+
+    def loads_bytes(data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return loads(data)
+
+    def dumps_bytes(obj):
+        return dumps(obj).encode('utf-8')
+    return loads_bytes, dumps_bytes
+
+
+def _fall_back_to_json(dumps_bytes):
+    json_dumps_bytes = _make_json_backend(json)[1]
+
+    def dumps_bytes_or_fall_back(obj):
+        try:
+            return dumps_bytes(obj)
+        except (TypeError, OverflowError):
+            # Too large integers or keys other than strings; the standard
+            # json can encode them (or raises TypeError for good).
+            return json_dumps_bytes(obj)
+    return dumps_bytes_or_fall_back
+
+
+def _make_orjson_backend(module):
+    # orjson takes and returns bytes as they are.
+    return module.loads, _fall_back_to_json(module.dumps)
+
+
+def _make_bytes_loading_backend(module):
+    # These take bytes as they are, but return str.
+    dumps = module.dumps
+
+    def dumps_bytes(obj):
+        return dumps(obj).encode('utf-8')
+    return module.loads, _fall_back_to_json(dumps_bytes)
+
+
+_backend_factories = {
+    'orjson': _make_orjson_backend,
+    'rapidjson': _make_bytes_loading_backend,
+    'ujson': _make_bytes_loading_backend,
+    'simplejson': _make_json_backend,
+    'json': _make_json_backend,
+}
+_lock = threading.Lock()
+_backend_name = 'json'
+_loads, _dumps = _make_json_backend(json)
+
+
+def loads_bytes(data):
+    """Parse a JSON document through the current backend.
+
+    :param data: A JSON document encoded in UTF-8.
+    :type data: :class:`bytes`
+    :return: A parsed value.
+    :raise ValueError: When the document is not a valid JSON.
+
+    """
+    return _loads(data)
+
+
+def dumps_bytes(obj):
+    """Encode a JSON-compatible value through the current backend.
+
+    :param obj: A JSON-compatible value.
+    :return: An encoded JSON document in UTF-8.
+    :rtype: :class:`bytes`
+
+    """
+    return _dumps(obj)
+
+
+def load_backend(name):
+    """Load a JSON backend.
+
+    :param name: The name of a backend.  ``'auto'`` means the fastest one
+                 of installed backends.
+    :type name: :class:`str`
+    :return: A triple of the loaded backend's name, and its
+             ``loads_bytes()`` and ``dumps_bytes()`` functions.
+    :rtype: :class:`tuple`
+    :raise ImportError: When the backend is not installed.
+    :raise ValueError: When the name is not a supported backend.
+
+    """
+    if name == 'auto':
+        for name in BACKEND_NAMES:
+            try:
+                return load_backend(name)
+            except ImportError:
+                continue
+    try:
+        factory = _backend_factories[name]
+    except KeyError:
+        raise ValueError(
+            '{0!r} is not a supported JSON backend; available backends: '
+            '{1}'.format(name, ', '.join(BACKEND_NAMES))
+        )
+    module = importlib.import_module(name)
+    return (name,) + factory(module)
+
+
+def set_backend(name):
+    """Switch the JSON backend the runtime uses.
+
+    :param name: The name of a backend.  ``'auto'`` means the fastest one
+                 of installed backends.
+    :type name: :class:`str`
+    :return: The name of the backend switched to.
+    :rtype: :class:`str`
+    :raise ImportError: When the backend is not installed.
+    :raise ValueError: When the name is not a supported backend.
+
+    """
+    global _backend_name, _loads, _dumps
+    name, loads, dumps = load_backend(name)
+    with _lock:
+        _backend_name, _loads, _dumps = name, loads, dumps
+    return name
+
+
+def get_backend():
+    """Get the name of the JSON backend the runtime currently uses.
+
+    :return: The name of the current backend.
+    :rtype: :class:`str`
+
+    """
+    return _backend_name
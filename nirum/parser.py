@@ -0,0 +1,379 @@
+""":mod:`nirum.parser` --- Schema-aware single-pass JSON parser
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:func:`nirum.deserialize.deserialize_json()` parses a whole JSON document
+into a tree of dicts and lists first, and then walks the tree to build
+values.  :func:`parse_json()` instead tokenizes a JSON document driven by
+the type to deserialize it into, and builds records, unions, unboxed
+values, collections, and maps directly, without building intermediate
+objects (e.g., ``{"key": ..., "value": ...}`` items of maps) which would be
+garbage right away.  Scalars and subtrees of types it doesn't drive are
+still scanned by the C scanner of the standard :mod:`json`.
+
+.. versionadded:: 0.6.4
+
+"""
+import json
+import re
+import typing
+import weakref
+
+from six import binary_type
+
+from ._compat import get_union_types, is_optional_type
+from .datastructures import Map
+from .deserialize import (_ITERABLE_PRIMITIVE_TYPES, _MISSING, _NONE_TYPE,
+                          _DeserializationError, get_deserializer,
+                          is_support_abstract_type, _compiled_caches,
+                          _find_union_tag, _format_unexpected_value,
+                          _format_unknown_tag, _get_cached,
+                          _get_collection_element_type,
+                          _get_field_deserializer, _get_field_types,
+                          _get_unboxed_inner_type)
+from .validate import construct_trusted
+
+__all__ = 'compile_parser', 'get_parser', 'parse_json'
+
+_match_whitespace = re.compile(r'[ \t\n\r]*').match
+_scan_once = json.JSONDecoder().scan_once
+_scanstring = json.decoder.scanstring
+_parsers = weakref.WeakKeyDictionary()
+_field_parsers = weakref.WeakKeyDictionary()
+_compiled_caches.extend([_parsers, _field_parsers])
+
+
+def _skip_whitespace(document, index):
+    # Most documents have either no whitespace or a single space between
+    # tokens, which are checked without the regular expression.
+    char = document[index:index + 1]
+    if char == ' ':
+        index += 1
+        char = document[index:index + 1]
+    if char and char not in ' \t\n\r':
+        return index
+    return _match_whitespace(document, index).end()
+
+
+def _syntax_error(message, document, index):
+    line = document.count('\n', 0, index) + 1
+    column = index - document.rfind('\n', 0, index)
+    return ValueError('{0}: line {1} column {2} (char {3})'.format(
+        message, line, column, index
+    ))
+
+
+def _scan_value(document, index):
+    try:
+        return _scan_once(document, index)
+    except StopIteration as e:
+        raise _syntax_error('Expecting value', document, e.args[0])
+
+
+def _start_container(document, index, opening, closing, name):
+    """Consume the opening bracket of an array or object.
+
+    :return: A pair of whether the container is empty, and the index of
+             its first item (or the index after it if it's empty).
+
+    """
+    if document[index:index + 1] != opening:
+        raise _syntax_error('Expecting ' + name, document, index)
+    index = _skip_whitespace(document, index + 1)
+    if document[index:index + 1] == closing:
+        return True, index + 1
+    return False, index
+
+
+def _next_item(document, index, closing):
+    """Consume a delimiter after an item of an array or object.
+
+    :return: A pair of whether the container is closed, and the index of
+             the next item (or the index after the container).
+
+    """
+    index = _skip_whitespace(document, index)
+    char = document[index:index + 1]
+    if char == ',':
+        return False, _skip_whitespace(document, index + 1)
+    elif char == closing:
+        return True, index + 1
+    raise _syntax_error("Expecting ',' delimiter", document, index)
+
+
+def _read_key(document, index):
+    if document[index:index + 1] != '"':
+        raise _syntax_error(
+            'Expecting property name enclosed in double quotes',
+            document, index
+        )
+    key, index = _scanstring(document, index + 1)
+    index = _skip_whitespace(document, index)
+    if document[index:index + 1] != ':':
+        raise _syntax_error("Expecting ':' delimiter", document, index)
+    return key, _skip_whitespace(document, index + 1)
+
+
+def _make_generic_parser(deserialize):
+    def parse(document, index):
+        value, index = _scan_value(document, index)
+        return deserialize(value), index
+    return parse
+
+
+def _compile_generic_parser(cls):
+    return _make_generic_parser(get_deserializer(cls))
+
+
+def _get_field_parsers(cls):
+    if hasattr(cls, '__nirum_tag__'):
+        behind_names = cls.__nirum_tag_names__.behind_names
+    else:
+        behind_names = cls.__nirum_field_names__.behind_names
+    facial_fields = {}
+    for name, field_type in _get_field_types(cls).items():
+        deserialize = _get_field_deserializer(cls, name, field_type)
+        if deserialize is get_deserializer(field_type):
+            parse = get_parser(field_type)
+        else:  # e.g., fields opted in interning through intern_fields()
+            parse = _make_generic_parser(deserialize)
+        facial_fields[name] = name, parse, deserialize
+    fields = dict(facial_fields)
+    for behind_name, name in behind_names.items():
+        if name in facial_fields:
+            fields[behind_name] = facial_fields[name]
+    return fields
+
+
+def _compile_record_parser(cls):
+    cls_ref = weakref.ref(cls)
+    behind_name = cls.__nirum_record_behind_name__
+
+    def parse(document, index):
+        cls = cls_ref()
+        fields = _get_cached(_field_parsers, cls, _get_field_parsers)
+        closed, index = _start_container(document, index, '{', '}', 'object')
+        type_name = _MISSING
+        args = {}
+        while not closed:
+            key, index = _read_key(document, index)
+            if key == '_type':
+                type_name, index = _scan_value(document, index)
+            else:
+                try:
+                    name, parse_field, _ = fields[key]
+                except KeyError:
+                    raise KeyError(key)
+                args[name], index = parse_field(document, index)
+            closed, index = _next_item(document, index, '}')
+        if type_name is _MISSING:
+            raise ValueError('"_type" field is missing.')
+        elif type_name != behind_name:
+            raise _DeserializationError(
+                _format_unexpected_value,
+                cls, '_type', behind_name, type_name
+            )
+        return construct_trusted(cls, args), index
+    return parse
+
+
+def _compile_union_parser(cls):
+    cls_ref = weakref.ref(cls)
+
+    def parse(document, index):
+        cls = cls_ref()
+        closed, index = _start_container(document, index, '{', '}', 'object')
+        type_name = tag_name = _MISSING
+        tag_cls = fields = None
+        args = {}
+        pending = []  # fields preceding "_tag"
+        while not closed:
+            key, index = _read_key(document, index)
+            if key == '_type':
+                type_name, index = _scan_value(document, index)
+            elif key == '_tag':
+                tag_name, index = _scan_value(document, index)
+                found = _find_union_tag(cls, tag_name)
+                if found is not None:
+                    tag_cls = found[0]()
+                    fields = _get_cached(_field_parsers, tag_cls,
+                                         _get_field_parsers)
+            elif fields is None:
+                value, index = _scan_value(document, index)
+                pending.append((key, value))
+            else:
+                try:
+                    name, parse_field, _ = fields[key]
+                except KeyError:
+                    raise KeyError(key)
+                args[name], index = parse_field(document, index)
+            closed, index = _next_item(document, index, '}')
+        if type_name is _MISSING:
+            raise ValueError('"_type" field is missing.')
+        elif tag_name is _MISSING:
+            raise ValueError('"_tag" field is missing.')
+        elif tag_cls is None:
+            if hasattr(cls, '__nirum_tag__'):
+                raise _DeserializationError(
+                    _format_unexpected_value,
+                    cls, '_tag', cls.__nirum_tag__.value, tag_name
+                )
+            raise _DeserializationError(
+                _format_unknown_tag,
+                cls, {'_type': type_name, '_tag': tag_name}
+            )
+        elif type_name != tag_cls.__nirum_union_behind_name__:
+            raise _DeserializationError(
+                _format_unexpected_value,
+                tag_cls, '_type', tag_cls.__nirum_union_behind_name__,
+                type_name
+            )
+        for key, value in pending:
+            try:
+                name, _, deserialize = fields[key]
+            except KeyError:
+                raise KeyError(key)
+            args[name] = deserialize(value)
+        return construct_trusted(tag_cls, args), index
+    return parse
+
+
+def _compile_unboxed_parser(cls):
+    cls_ref = weakref.ref(cls)
+    parse_inner = get_parser(_get_unboxed_inner_type(cls))
+
+    def parse(document, index):
+        value, index = parse_inner(document, index)
+        return cls_ref()(value=value), index
+    return parse
+
+
+def _compile_collection_parser(primitive_type, elem_type):
+    parse_elem = get_parser(elem_type)
+
+    def parse(document, index):
+        closed, index = _start_container(document, index, '[', ']', 'array')
+        elements = []
+        append = elements.append
+        while not closed:
+            elem, index = parse_elem(document, index)
+            append(elem)
+            closed, index = _next_item(document, index, ']')
+        if primitive_type is list:
+            return elements, index
+        return primitive_type(elements), index
+    return parse
+
+
+def _compile_map_parser(key_type, value_type):
+    parse_key = get_parser(key_type)
+    parse_value = get_parser(value_type)
+
+    def parse(document, index):
+        closed, index = _start_container(document, index, '[', ']', 'array')
+        items = {}
+        while not closed:
+            start = index
+            closed, index = _start_container(document, index, '{', '}',
+                                             'map item object')
+            key = value = _MISSING
+            while not closed:
+                name, index = _read_key(document, index)
+                if name == 'key':
+                    key, index = parse_key(document, index)
+                elif name == 'value':
+                    value, index = parse_value(document, index)
+                else:
+                    _, index = _scan_value(document, index)
+                closed, index = _next_item(document, index, '}')
+            if key is _MISSING or value is _MISSING:
+                raise _syntax_error(
+                    'map item must consist of "key" and "value" fields '
+                    'e.g. {"key": ..., "value": ...}',
+                    document, start
+                )
+            items[key] = value
+            closed, index = _next_item(document, index, ']')
+        return Map._from_owned_dict(items), index
+    return parse
+
+
+def _compile_optional_parser(inner_type):
+    parse_inner = get_parser(inner_type)
+
+    def parse(document, index):
+        if document.startswith('null', index):
+            return None, index + 4
+        return parse_inner(document, index)
+    return parse
+
+
+def compile_parser(cls):
+    """Turn the given type into a function specialized to parse JSON
+    documents of the type.
+
+    :param cls: A type to parse values of.
+    :return: A function that takes a JSON document string and the index of
+             a value in it, and returns a pair of the parsed value and the
+             index right after the value.
+
+    """
+    if hasattr(cls, '__nirum_tag__') or hasattr(cls, 'Tag'):
+        return _compile_union_parser(cls)
+    elif hasattr(cls, '__nirum_record_behind_name__'):
+        return _compile_record_parser(cls)
+    elif (hasattr(cls, '__nirum_get_inner_type__') or
+          hasattr(cls, '__nirum_inner_type__')):
+        inner_type = _get_unboxed_inner_type(cls)
+        if not hasattr(inner_type, '__nirum_deserialize__'):
+            return _compile_unboxed_parser(cls)
+    elif is_support_abstract_type(cls):
+        origin = getattr(cls, '__origin__', None) or cls
+        params = getattr(cls, '__args__', None) or ()
+        if origin is typing.Mapping and len(params) == 2:
+            return _compile_map_parser(*params)
+        elif origin in _ITERABLE_PRIMITIVE_TYPES:
+            primitive_type, elem_type = _get_collection_element_type(cls)
+            if elem_type is not None:
+                return _compile_collection_parser(primitive_type, elem_type)
+    elif is_optional_type(cls):
+        inner_types = [t for t in get_union_types(cls) if t is not _NONE_TYPE]
+        if len(inner_types) == 1:
+            return _compile_optional_parser(inner_types[0])
+    return _compile_generic_parser(cls)
+
+
+def get_parser(cls):
+    """Get the parser function of the given type.  Parsers are compiled
+    through :func:`compile_parser()` once per type, and then cached.
+
+    :param cls: A type to parse values of.
+    :return: A parser function.
+
+    """
+    return _get_cached(_parsers, cls, compile_parser)
+
+
+def parse_json(cls, data):
+    """Parse a JSON document into a value of the given type in a single
+    pass.  The result is the same as
+    :func:`nirum.deserialize.deserialize_json()`, and so are errors, e.g.,
+    :exc:`KeyError` for an unknown field and :exc:`TypeError` for
+    a missing field.  Text interning (see
+    :func:`nirum.deserialize.set_text_interning()`) applies as well.
+
+    :param cls: A type to deserialize the document into.
+    :param data: A JSON document.  It's decoded as UTF-8 if it's
+                 :class:`bytes`.
+    :return: A deserialized value.
+    :raise ValueError: When the document is not a valid JSON, or it's not
+                       deserializable into the type.
+
+    """
+    if isinstance(data, binary_type):
+        data = data.decode('utf-8')
+    index = _skip_whitespace(data, 0)
+    value, index = get_parser(cls)(data, index)
+    index = _skip_whitespace(data, index)
+    if index != len(data):
+        raise _syntax_error('Extra data', data, index)
+    return value
@@ -0,0 +1,135 @@
+""":mod:`nirum.registry` --- Registry of types by their behind names
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Serialized records and unions carry their behind names (``"_type"``, and
+``"_tag"`` as well for unions), so that a value can be deserialized without
+knowing its type up front, as long as its type is registered here.
+See also :func:`nirum.deserialize.deserialize_any()`.
+
+Types are registered when their deserializers are compiled, or explicitly
+through :func:`register_type()` and :func:`register_module()`.  Generated
+modules which aren't imported yet can be registered through
+:func:`register_lazy_module()`; they are imported when a behind name is
+looked up and not found.
+
+Behind names are unique only in a Nirum module, so that when types of
+the same behind names are registered from several modules, the one
+registered last wins.
+
+.. versionadded:: 0.6.4
+
+"""
+import collections
+import importlib
+import threading
+import types
+import weakref
+
+__all__ = (
+    'lookup_type', 'register_lazy_module', 'register_module',
+    'register_type',
+)
+
+#: (:class:`weakref.WeakValueDictionary`) The mapping of pairs of
+#: a ``"_type"`` and a ``"_tag"`` (:const:`None` for records) to types.
+_types = weakref.WeakValueDictionary()
+_lazy_modules = collections.deque()
+_lock = threading.RLock()
+
+
+def _iter_module_types(module):
+    for value in vars(module).values():
+        if isinstance(value, type) and value.__module__ == module.__name__:
+            yield value
+
+
+def _get_type_keys(cls):
+    if hasattr(cls, '__nirum_tag__'):
+        return [((cls.__nirum_union_behind_name__, cls.__nirum_tag__.value),
+                 cls)]
+    elif hasattr(cls, 'Tag') and hasattr(cls, '__nirum_union_behind_name__'):
+        keys = []
+        for tag_cls in cls.__subclasses__():
+            keys.extend(_get_type_keys(tag_cls))
+        return keys
+    elif hasattr(cls, '__nirum_record_behind_name__'):
+        return [((cls.__nirum_record_behind_name__, None), cls)]
+    return []
+
+
+def register_type(cls):
+    """Register a record type, a union type with all its tag types, or
+    a tag type of a union.
+
+    :param cls: A record type, a union type, or a tag type.
+    :return: Whether ``cls`` is a type which can be registered.
+    :rtype: :class:`bool`
+
+    """
+    keys = _get_type_keys(cls)
+    with _lock:
+        for key, type_ in keys:
+            _types[key] = type_
+    return bool(keys)
+
+
+def register_module(module):
+    """Register all record and union types defined in a generated module.
+
+    :param module: A generated module, or its import name.
+    :type module: :class:`types.ModuleType`, :class:`str`
+    :return: The number of types registered.
+    :rtype: :class:`int`
+
+    """
+    if not isinstance(module, types.ModuleType):
+        module = importlib.import_module(module)
+    return sum(1 for cls in _iter_module_types(module) if register_type(cls))
+
+
+def register_lazy_module(name):
+    """Register a generated module which will be imported and registered
+    only when a behind name is looked up and not found, e.g., to avoid
+    importing a large number of generated modules at startup.
+
+    :param name: The import name of a generated module.
+    :type name: :class:`str`
+
+    """
+    with _lock:
+        _lazy_modules.append(name)
+
+
+def lookup_type(type_name, tag_name=None):
+    """Look up a registered type by its behind name.
+
+    :param type_name: The behind name of a record or union type,
+                      i.e., ``"_type"``.
+    :type type_name: :class:`str`
+    :param tag_name: The behind name of a tag, i.e., ``"_tag"``.
+                     :const:`None` for records.
+    :type tag_name: :class:`str`
+    :return: A record type or a tag type, or :const:`None` if there's no
+             such type even after all lazy modules are imported.
+    :rtype: :class:`type`
+    :raise ImportError: When a lazy module fails to be imported.  It's
+                        tried again on the next lookup.
+
+    """
+    key = type_name, tag_name
+    try:
+        return _types[key]
+    except KeyError:
+        pass
+    except TypeError:  # unhashable names can't be registered anyway
+        return None
+    with _lock:
+        while _lazy_modules:
+            # Dequeued only after it's registered, so that a module failing
+            # to be imported (e.g., transiently) is not dropped.
+            register_module(_lazy_modules[0])
+            _lazy_modules.popleft()
+            cls = _types.get(key)
+            if cls is not None:
+                return cls
+    return None
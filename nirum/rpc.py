@@ -10,7 +10,6 @@
 
 """
 import collections
-import json
 import typing
 import warnings
 
@@ -21,12 +20,19 @@ from werkzeug.http import HTTP_STATUS_CODES
 from werkzeug.routing import Map, Rule
 from werkzeug.wrappers import Request as WsgiRequest, Response as WsgiResponse
 
-from .deserialize import deserialize_meta
-from .exc import (NirumProcedureArgumentRequiredError,
+from .cbor import (CONTENT_TYPE as CBOR_CONTENT_TYPE, loads as loads_cbor,
+                   serialize_cbor)
+from .compact import (CONTENT_TYPE as COMPACT_CONTENT_TYPE,
+                      deserialize_compact, serialize_compact)
+from .deserialize import (DeserializationBudget, deserialize_meta,
+                          _get_collection_element_type)
+from .exc import (DeserializationBudgetError,
+                  NirumProcedureArgumentRequiredError,
                   NirumProcedureArgumentValueError,
                   UnexpectedNirumResponseError)
 from .func import url_endswith_slash
-from .serialize import serialize_meta
+from .jsonlib import dumps_bytes, loads_bytes
+from .serialize import iter_serialize, serialize_json, serialize_meta
 from .service import Service as BaseService
 
 __all__ = 'Client', 'WsgiApp', 'Service', 'client_type', 'service_type'
@@ -57,6 +63,25 @@ class WsgiApp:
     """Create WSGI application adapt Nirum service.
 
     :param service: A nirum service.
+    :param budget: Limits of request payloads.  :attr:`default_budget`
+                   by default.
+    :type budget: :class:`~nirum.deserialize.DeserializationBudget`
+    :param streaming: Whether to serialize successful results chunk by chunk
+                      while the response is being sent, instead of encoding
+                      the whole payload first.  See also
+                      :func:`~nirum.serialize.iter_serialize()`.
+    :type streaming: :class:`bool`
+
+    Request payloads of :mimetype:`application/cbor` are parsed as CBOR
+    (see also :mod:`nirum.cbor`), and responses are encoded in CBOR as
+    well when the client prefers it through :mailheader:`Accept`.
+    Likewise, arguments and results are in the positional compact encoding
+    (see also :mod:`nirum.compact`) for
+    :mimetype:`application/vnd.nirum.compact+json`.  JSON is used otherwise.
+
+    .. versionchanged:: 0.6.4
+       Added ``budget`` and ``streaming`` options, and became to negotiate
+       CBOR and compact JSON payloads.
 
     .. deprecated:: 0.6.0
        Use ``nirum_wsgi.WsgiApp`` (provided by `nirum-wsgi
@@ -72,7 +97,17 @@ class WsgiApp:
         Rule('/ping/', endpoint='ping'),
     ])
 
-    def __init__(self, service):
+    #: (:class:`~nirum.deserialize.DeserializationBudget`) The default limits
+    #: of request payloads.
+    #:
+    #: .. versionadded:: 0.6.4
+    default_budget = DeserializationBudget(
+        max_depth=64,
+        max_elements=1000000,
+        max_bytes=16 * 1024 * 1024,
+    )
+
+    def __init__(self, service, budget=None, streaming=False):
         warnings.warn(
             'nirum.rpc.WsgiApp is deprecated; use nirum_wsgi.WsgiApp '
             '(provided by nirum-wsgi package).  It will be completely '
@@ -80,6 +115,9 @@ class WsgiApp:
             DeprecationWarning
         )
         self.service = service
+        self.budget = self.default_budget if budget is None else budget
+        self.streaming = streaming
+        self._method_types = {}
 
     def __call__(self, environ, start_response):
         """
@@ -124,7 +162,10 @@ class WsgiApp:
         """
         if request.method != 'POST':
             return self.error(405, request)
-        payload = request.get_data(as_text=True) or '{}'
+        try:
+            payload = self._read_payload(request)
+        except DeserializationBudgetError as e:
+            return self.error(413, request, message=str(e))
         request_method = request.args.get('method')
         if not request_method:
             return self.error(
@@ -160,18 +201,44 @@ class WsgiApp:
                 )
             )
         try:
-            request_json = json.loads(payload)
+            if request.mimetype == CBOR_CONTENT_TYPE:
+                request_json = loads_cbor(payload) if payload else {}
+            else:
+                request_json = loads_bytes(payload or b'{}')
         except ValueError:
+            if request.mimetype == CBOR_CONTENT_TYPE:
+                return self.error(400, request,
+                                  message='Invalid CBOR payload.')
             return self.error(
                 400,
                 request,
-                message="Invalid JSON payload: '{}'.".format(payload)
+                message="Invalid JSON payload: '{}'.".format(
+                    payload.decode(request.charset, request.encoding_errors)
+                )
+            )
+        except RuntimeError:
+            # Too deeply nested arrays or objects exceed the recursion limit
+            # of the JSON or CBOR parser.
+            return self.error(
+                400, request,
+                message='The payload is nested too deeply.'
             )
-        type_hints = self.service.__nirum_service_methods__[method_facial_name]
+        try:
+            self.budget.check(request_json)
+        except DeserializationBudgetError as e:
+            return self.error(400, request, message=str(e))
+        argument_types, return_type = self._get_method_types(
+            method_facial_name
+        )
+        if request.mimetype == COMPACT_CONTENT_TYPE:
+            deserialize = deserialize_compact
+        else:
+            deserialize = deserialize_meta
         try:
             arguments = self._parse_procedure_arguments(
-                type_hints,
-                request_json
+                argument_types,
+                request_json,
+                deserialize
             )
         except (NirumProcedureArgumentValueError,
                 NirumProcedureArgumentRequiredError) as e:
@@ -180,13 +247,22 @@ class WsgiApp:
         if not callable(method_error_types):  # generated by older compiler
             method_error_types = method_error_types.get
         method_error = method_error_types(method_facial_name, ())
+        response_type = request.accept_mimetypes.best_match(
+            ['application/json', CBOR_CONTENT_TYPE, COMPACT_CONTENT_TYPE],
+            'application/json'
+        )
+        binary = response_type == CBOR_CONTENT_TYPE
         try:
             result = service_method(**arguments)
         except method_error as e:
+            # Errors are left self-describing even for compact responses,
+            # since they can be of any of the method's error types.
+            if binary:
+                return self._make_wsgi_response(
+                    400, serialize_cbor(serialize_meta(e)),
+                    content_type=CBOR_CONTENT_TYPE
+                )
             return self._raw_response(400, serialize_meta(e))
-        return_type = type_hints['_return']
-        if type_hints.get('_v', 1) >= 2:
-            return_type = return_type()
         if not self._check_return_type(return_type, result):
             return self.error(
                 400,
@@ -198,19 +274,73 @@ class WsgiApp:
                             typing._type_repr(return_type)
                         )
             )
+        elif binary:
+            return self._make_wsgi_response(
+                200, serialize_cbor(result), content_type=CBOR_CONTENT_TYPE
+            )
+        elif response_type == COMPACT_CONTENT_TYPE:
+            return self._raw_response(
+                200, serialize_compact(result, return_type),
+                content_type=COMPACT_CONTENT_TYPE
+            )
+        elif self.streaming:
+            return self._stream_response(200, result)
         else:
-            return self._raw_response(200, serialize_meta(result))
+            return self._make_wsgi_response(
+                200, serialize_json(result, return_type)
+            )
 
-    def _parse_procedure_arguments(self, type_hints, request_json):
-        arguments = {}
+    def _read_payload(self, request):
+        max_bytes = self.budget.max_bytes
+        if max_bytes is None:
+            return request.get_data()
+        # Reject too large payloads before they are read into memory,
+        # and never read more than one byte past the limit even if
+        # the Content-Length is unknown (e.g., chunked requests).
+        if request.content_length is not None:
+            self.budget.check_size(request.content_length)
+        stream = request.stream
+        chunks = []
+        remaining = max_bytes + 1
+        while remaining > 0:
+            chunk = stream.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        payload = b''.join(chunks)
+        self.budget.check_bytes(payload)
+        return payload
+
+    def _get_method_types(self, method_facial_name):
+        # Type thunks of methods are resolved only once per method.
+        try:
+            return self._method_types[method_facial_name]
+        except KeyError:
+            pass
+        type_hints = self.service.__nirum_service_methods__[method_facial_name]
         version = type_hints.get('_v', 1)
         name_map = type_hints['_names']
+        argument_types = []
         for argument_name, type_ in type_hints.items():
             if argument_name.startswith('_'):
                 continue
             if version >= 2:
                 type_ = type_()
-            behind_name = name_map[argument_name]
+            argument_types.append(
+                (argument_name, name_map[argument_name], type_)
+            )
+        return_type = type_hints['_return']
+        if version >= 2:
+            return_type = return_type()
+        method_types = argument_types, return_type
+        self._method_types[method_facial_name] = method_types
+        return method_types
+
+    def _parse_procedure_arguments(self, argument_types, request_json,
+                                   deserialize=deserialize_meta):
+        arguments = {}
+        for argument_name, behind_name, type_ in argument_types:
             try:
                 data = request_json[behind_name]
             except KeyError:
@@ -220,7 +350,7 @@ class WsgiApp:
                     )
                 )
             try:
-                arguments[argument_name] = deserialize_meta(type_, data)
+                arguments[argument_name] = deserialize(type_, data)
             except ValueError:
                 raise NirumProcedureArgumentValueError(
                     "Incorrect type '{0}' for '{1}'. "
@@ -232,6 +362,19 @@ class WsgiApp:
         return arguments
 
     def _check_return_type(self, type_hint, procedure_result):
+        if self.streaming:
+            # Elements of a large result are checked one by one, so that
+            # the whole result isn't serialized twice while it's streamed.
+            try:
+                _, elem_type = _get_collection_element_type(type_hint)
+            except TypeError:
+                elem_type = None
+            if (elem_type is not None and
+                    isinstance(procedure_result, (collections.Sequence,
+                                                  collections.Set)) and
+                    not isinstance(procedure_result, string_types)):
+                return all(self._check_return_type(elem_type, elem)
+                           for elem in procedure_result)
         try:
             deserialize_meta(type_hint, serialize_meta(procedure_result))
         except ValueError:
@@ -296,9 +439,20 @@ class WsgiApp:
         return status_code, headers, content
 
     def _raw_response(self, status_code, response_json, **kwargs):
+        return self._make_wsgi_response(
+            status_code, dumps_bytes(response_json), **kwargs
+        )
+
+    def _stream_response(self, status_code, value):
+        return self._make_wsgi_response(
+            status_code, iter_serialize(value), streaming=True
+        )
+
+    def _make_wsgi_response(self, status_code, content, streaming=False,
+                            content_type='application/json', **kwargs):
         response_tuple = self.make_response(
-            status_code, headers=[('Content-type', 'application/json')],
-            content=json.dumps(response_json).encode('utf-8')
+            status_code, headers=[('Content-type', content_type)],
+            content=content
         )
         if not (isinstance(response_tuple, collections.Sequence) and
                 len(response_tuple) == 3):
@@ -319,7 +473,8 @@ class WsgiApp:
                     typing._type_repr(type(headers))
                 )
             )
-        if not isinstance(content, bytes):
+        if not (isinstance(content, bytes) or
+                streaming and isinstance(content, collections.Iterable)):
             raise TypeError(
                 '`content` have to be instance of bytes. not {}'.format(
                     typing._type_repr(type(content))
@@ -331,6 +486,17 @@ class WsgiApp:
 class Client(object):
     """HTTP service client base class.
 
+    :param url: The endpoint URL of the service.
+    :param opener: An opener to send requests through.
+    :param binary: Whether to send payloads in CBOR and prefer CBOR
+                   responses (see also :mod:`nirum.cbor`).  Servers which
+                   don't support CBOR may answer in JSON, which is decoded
+                   as well.  :const:`False` by default.
+    :type binary: :class:`bool`
+
+    .. versionchanged:: 0.6.4
+       Added ``binary`` option, and :meth:`remote_call_data()` method.
+
     .. deprecated:: 0.6.0
        Use :class:`nirum.transport.Transport` and
        :mod:`nirum_http.HttpTransport` (provided by `nirum-http
@@ -339,7 +505,8 @@ class Client(object):
 
     """
 
-    def __init__(self, url, opener=urllib.request.build_opener()):
+    def __init__(self, url, opener=urllib.request.build_opener(),
+                 binary=False):
         warnings.warn(
             'nirum.rpc.Client is deprecated; use nirum.transport.Transport '
             'and nirum_http.HttpTransport (provided by nirum-http package) '
@@ -348,6 +515,7 @@ class Client(object):
         )
         self.url = url_endswith_slash(url)
         self.opener = opener
+        self.binary = binary
 
     def ping(self):
         status, _, __ = self.do_request(
@@ -356,7 +524,7 @@ class Client(object):
         )
         return 200 <= status < 300
 
-    def remote_call(self, method_name, payload={}):
+    def _call(self, method_name, payload):
         qs = urllib.parse.urlencode({'method': method_name})
         scheme, netloc, path, _, _ = urllib.parse.urlsplit(self.url)
         request_url = urllib.parse.urlunsplit((
@@ -365,32 +533,72 @@ class Client(object):
         status, headers, content = self.do_request(request_url, payload)
         content_type = headers.get('Content-Type', '').split(';', 1)[0].strip()
         if content_type == 'application/json':
-            text = content.decode('utf-8')
             if 200 <= status < 300:
-                return text
+                return content_type, content
             elif 400 <= status < 500:
-                error_types = getattr(type(self),
-                                      '__nirum_method_error_types__',
-                                      {}.get)
-                if not callable(error_types):
-                    error_types = error_types.get
-                error_type = error_types(method_name)
-                if error_type is not None:
-                    error_data = json.loads(text)
-                    raise deserialize_meta(error_type, error_data)
-            raise UnexpectedNirumResponseError(text)
-        raise UnexpectedNirumResponseError(repr(text))
+                self._raise_method_error(method_name, loads_bytes, content)
+            raise UnexpectedNirumResponseError(content.decode('utf-8'))
+        elif content_type == CBOR_CONTENT_TYPE:
+            if 200 <= status < 300:
+                return content_type, content
+            elif 400 <= status < 500:
+                self._raise_method_error(method_name, loads_cbor, content)
+        raise UnexpectedNirumResponseError(repr(content))
+
+    def _raise_method_error(self, method_name, load, content):
+        error_types = getattr(type(self),
+                              '__nirum_method_error_types__',
+                              {}.get)
+        if not callable(error_types):
+            error_types = error_types.get
+        error_type = error_types(method_name)
+        if error_type is not None:
+            error_data = load(content)
+            raise deserialize_meta(error_type, error_data)
+
+    def remote_call(self, method_name, payload={}):
+        content_type, content = self._call(method_name, payload)
+        if content_type == CBOR_CONTENT_TYPE:
+            # Callers of this method expect a JSON document.
+            try:
+                return dumps_bytes(loads_cbor(content)).decode('utf-8')
+            except (TypeError, ValueError) as e:
+                # E.g., invalid CBOR, or byte strings JSON cannot represent.
+                raise UnexpectedNirumResponseError(
+                    'The CBOR response cannot be converted to JSON: '
+                    '{0}'.format(e)
+                )
+        return content.decode('utf-8')
+
+    def remote_call_data(self, method_name, payload={}):
+        """Call a remote method, and decode its result into
+        a JSON-compatible value, whichever format the server answered in.
+
+        :param method_name: The behind name of the method.
+        :param payload: A JSON-compatible mapping of arguments.
+        :return: A JSON-compatible value of the result.
+
+        .. versionadded:: 0.6.4
+
+        """
+        content_type, content = self._call(method_name, payload)
+        if content_type == CBOR_CONTENT_TYPE:
+            return loads_cbor(content)
+        return loads_bytes(content)
 
     def make_request(self, method, request_url, headers, payload):
-        return (
-            method, request_url, headers, json.dumps(payload).encode('utf-8')
-        )
+        if self.binary:
+            return method, request_url, headers, serialize_cbor(payload)
+        return method, request_url, headers, dumps_bytes(payload)
 
     def do_request(self, request_url, payload):
         request_tuple = self.make_request(
             u'POST',
             request_url,
             [
+                ('Content-type', CBOR_CONTENT_TYPE),
+                ('Accept', CBOR_CONTENT_TYPE + ', application/json;q=0.5'),
+            ] if self.binary else [
                 ('Content-type', 'application/json;charset=utf-8'),
                 ('Accept', 'application/json'),
             ],
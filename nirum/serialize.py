@@ -5,24 +5,160 @@
 import collections
 import datetime
 import decimal
+import itertools
+import json
+import operator
+import threading
+import typing
 import uuid
+import weakref
 
-from six import string_types
+from six import integer_types, string_types, text_type
+from six.moves import map, zip
+
+from ._compat import get_union_types, is_optional_type, lru_cache
+from .datastructures import List, Map
+from .jsonlib import dumps_bytes
 
 __all__ = (
-    'serialize_boxed_type', 'serialize_meta',
-    'serialize_record_type', 'serialize_unboxed_type',
-    'serialize_union_type',
+    'FragmentCacheInfo', 'compile_serializer', 'fragment_cache_info',
+    'get_serializer', 'iter_serialize', 'serialize_boxed_type',
+    'serialize_json', 'serialize_meta', 'serialize_record_type',
+    'serialize_to_stream', 'serialize_unboxed_type', 'serialize_union_type',
+    'set_fragment_cache_size', 'set_primitive_cache_size',
 )
 
 
-def serialize_unboxed_type(data):
-    value = data.value
-    serialize = getattr(value, '__nirum_serialize__', None)
-    if callable(serialize):
-        return serialize()
+#: (:class:`frozenset`) The exact Python types of JSON-native values,
+#: which are serialized as they are.
+_JSON_NATIVE_TYPES = frozenset(
+    [text_type, str, bool, float, type(None)] + list(integer_types)
+)
+
+_NONE_TYPE = type(None)
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of serializer functions.
+#: Keys are the exact types of values, so that dispatching a value to its
+#: serializer is a single dictionary lookup.
+_serializers = weakref.WeakKeyDictionary()
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of functions which
+#: serialize fields of records or union tags.  Keys are record types or
+#: tag types.
+_field_serializers = weakref.WeakKeyDictionary()
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of serializer functions
+#: directed by declared types (e.g., ``typing.Sequence[int]``) rather than
+#: types of values.  See also :func:`_compile_typed_serializer()`.
+_typed_serializers = weakref.WeakKeyDictionary()
+
+#: (:class:`frozenset`) Origins of collection type hints which are
+#: serialized into JSON arrays.
+_COLLECTION_ORIGINS = frozenset([
+    typing.Sequence, typing.List, typing.AbstractSet, typing.Set,
+    typing.FrozenSet,
+])
+
+#: (:class:`frozenset`) Declared types of which values are JSON-native,
+#: and serialized as they are.
+_JSON_NATIVE_HINTS = frozenset(
+    [text_type, bool, float] + list(integer_types)
+)
+
+#: (:class:`tuple`) Declared types of which values are serialized into
+#: strings.
+_SCALAR_HINTS = datetime.date, uuid.UUID, decimal.Decimal
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of functions which encode
+#: values into JSON fragments for :func:`iter_serialize()`.  Keys are
+#: the exact types of values.  See also :func:`_compile_fragment_encoder()`.
+_fragment_encoders = weakref.WeakKeyDictionary()
+
+#: (:class:`weakref.WeakKeyDictionary`) The cache of fragment encoders
+#: directed by declared types, for :func:`serialize_json()` with a type
+#: hint.  See also :func:`_compile_typed_fragment_encoder()`.
+_typed_fragment_encoders = weakref.WeakKeyDictionary()
+
+_cache_lock = threading.Lock()
+
+
+def _get_cached(cache, key, build):
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Some type objects (e.g., None) cannot be weakly referenced, and
+        # some type hints cannot be hashed; they are just built every time
+        # without being cached.
+        return build(key)
+    value = build(key)
+    with _cache_lock:
+        return cache.setdefault(key, value)
+
+
+_encode_text = json.encoder.encode_basestring_ascii
+_encode_json = json.JSONEncoder().encode
+
+
+def _serialize_isoformat(data):
+    return data.isoformat()
+
+
+def _cache_datetime_serializer(maxsize):
+    # Equal datetimes can be in different timezones, so that the offset
+    # has to be a part of the key as well.
+    isoformat_cached = lru_cache(maxsize)(lambda key: key[0].isoformat())
+
+    def serialize_datetime(data):
+        return isoformat_cached((data, data.utcoffset()))
+    return serialize_datetime
+
+
+def _cache_date_serializer(maxsize):
+    isoformat_cached = lru_cache(maxsize)(_serialize_isoformat)
+
+    def serialize_date(data):
+        # Values declared as dates can be datetimes as well, which would
+        # collide with equal datetimes in other timezones; only exact dates
+        # are cached.
+        if type(data) is datetime.date:
+            return isoformat_cached(data)
+        return data.isoformat()
+    return serialize_date
+
+
+_serialize_datetime = _serialize_isoformat
+_serialize_date = _serialize_isoformat
+_serialize_uuid = str
+
+
+def set_primitive_cache_size(maxsize):
+    """Set the size of LRU caches of serialized :class:`datetime.datetime`,
+    :class:`datetime.date`, and :class:`uuid.UUID` values.  They are worth
+    caching when the same values (e.g., dates) repeat frequently.
+    The caches are disabled by default.
+
+    :param maxsize: The maximum number of values to cache per type.
+                    Zero disables caches.
+    :type maxsize: :class:`int`
+
+    .. versionadded:: 0.6.4
+
+    """
+    global _serialize_datetime, _serialize_date, _serialize_uuid
+    if maxsize:
+        _serialize_datetime = _cache_datetime_serializer(maxsize)
+        _serialize_date = _cache_date_serializer(maxsize)
+        _serialize_uuid = lru_cache(maxsize)(str)
     else:
-        return serialize_meta(value)
+        _serialize_datetime = _serialize_isoformat
+        _serialize_date = _serialize_isoformat
+        _serialize_uuid = str
+
+
+def serialize_unboxed_type(data):
+    return serialize_meta(data.value)
 
 
 serialize_boxed_type = serialize_unboxed_type
@@ -43,42 +179,724 @@ def serialize_type_with_names(data, names):
     return s
 
 
+def _get_field_types(cls):
+    if hasattr(cls, '__nirum_tag__'):
+        field_types = cls.__nirum_tag_types__
+        if callable(field_types):  # old compiler could generate non-callable
+            field_types = dict(field_types())
+    else:
+        field_types = cls.__nirum_field_types__
+        if callable(field_types):  # old compiler could generate non-callable
+            field_types = field_types()
+    return field_types
+
+
+def _get_unboxed_inner_type(cls):
+    try:
+        return cls.__nirum_get_inner_type__()
+    except AttributeError:
+        # FIXME: __nirum_inner_type__ is for backward compatibility;
+        #        remove __nirum_inner_type__ in the near future.
+        return cls.__nirum_inner_type__
+
+
+def _compile_fields_serializer(cls):
+    if hasattr(cls, '__nirum_tag__'):
+        header = [
+            ('_type', cls.__nirum_union_behind_name__),
+            ('_tag', cls.__nirum_tag__.value),
+        ]
+        names = cls.__nirum_tag_names__
+    else:
+        header = [('_type', cls.__nirum_record_behind_name__)]
+        names = cls.__nirum_field_names__
+    slots = tuple(cls.__slots__)
+    keys = [names[slot] if slot in names else slot for slot in slots]
+    # Fields are serialized as their declared types direct, e.g., a field of
+    # typing.Sequence[int] is passed through without checking elements.
+    field_types = _get_field_types(cls)
+    serializers = [
+        _get_typed_serializer(field_types[slot])
+        if slot in field_types else serialize_meta
+        for slot in slots
+    ]
+    if len(slots) > 1:
+        get_values = operator.attrgetter(*slots)
+    elif slots:
+        get_value = operator.attrgetter(slots[0])
+
+        def get_values(data):
+            return get_value(data),
+    else:
+        def get_values(data):
+            return ()
+
+    def serialize(data):
+        s = dict(header)
+        for key, serialize_field, value in zip(keys, serializers,
+                                               get_values(data)):
+            s[key] = serialize_field(value)
+        return s
+    return serialize
+
+
+def _get_fields_serializer(cls):
+    return _get_cached(_field_serializers, cls, _compile_fields_serializer)
+
+
 def serialize_record_type(data):
-    s = {'_type': data.__nirum_record_behind_name__}
-    s.update(serialize_type_with_names(data, data.__nirum_field_names__))
-    return s
+    return _get_fields_serializer(type(data))(data)
 
 
 def serialize_union_type(data):
-    s = {
-        '_type': data.__nirum_union_behind_name__,
-        '_tag': data.__nirum_tag__.value,
-    }
-    s.update(serialize_type_with_names(data, data.__nirum_tag_names__))
-    return s
+    return _get_fields_serializer(type(data))(data)
+
+
+def _serialize_identity(data):
+    return data
+
+
+def _serialize_nirum_type(data):
+    return data.__nirum_serialize__()
+
+
+def _serialize_datetime_type(data):
+    # Looked up every time, since set_primitive_cache_size() replaces it.
+    return _serialize_datetime(data)
+
+
+def _serialize_date_type(data):
+    return _serialize_date(data)
+
+
+def _serialize_uuid_type(data):
+    return _serialize_uuid(data)
+
+
+def _serialize_collection(data):
+    if _JSON_NATIVE_TYPES.issuperset(map(type, data)):
+        return list(data)
+    return [serialize_meta(e) for e in data]
 
 
-def serialize_meta(data):
-    if hasattr(data, '__nirum_serialize__'):
-        d = data.__nirum_serialize__()
-    elif isinstance(data, (string_types, bool, int, float)):
+def _serialize_mapping(data):
+    if (_JSON_NATIVE_TYPES.issuperset(map(type, data)) and
+            _JSON_NATIVE_TYPES.issuperset(map(type, data.values()))):
+        return [{'key': k, 'value': v} for k, v in data.items()]
+    return [
+        {'key': serialize_meta(k), 'value': serialize_meta(v)}
+        for k, v in data.items()
+    ]
+
+
+def compile_serializer(cls):
+    """Choose a function specialized to serialize values of the given
+    concrete type.  It's decided only by the type, so that the checks
+    :func:`serialize_meta()` has to do (e.g., :func:`isinstance()` against
+    abstract base classes) are done only once per type.
+
+    :param cls: The exact type of values to serialize, i.e., ``type(data)``.
+    :return: A function that takes a value of the type and returns
+             a JSON-compatible value.
+
+    .. versionadded:: 0.6.4
+
+    """
+    if hasattr(cls, '__nirum_serialize__'):
+        return _serialize_nirum_type
+    elif issubclass(cls, (string_types, bool, int, float)):
         # FIXME: str in py2 represents binary string as well as text string.
         # It should be refactored so that the function explicitly takes
         # an expected type as like deserialize_meta() does.
-        d = data
-    elif (isinstance(data, datetime.datetime) or
-            isinstance(data, datetime.date)):
-        d = data.isoformat()
-    elif isinstance(data, decimal.Decimal) or isinstance(data, uuid.UUID):
-        d = str(data)
-    elif (isinstance(data, collections.Set) or
-          isinstance(data, collections.Sequence)):
-        d = [serialize_meta(e) for e in data]
-    elif isinstance(data, collections.Mapping):
-        d = [
-            {'key': serialize_meta(k), 'value': serialize_meta(v)}
+        return _serialize_identity
+    elif issubclass(cls, datetime.datetime):
+        return _serialize_datetime_type
+    elif issubclass(cls, datetime.date):
+        return _serialize_date_type
+    elif issubclass(cls, uuid.UUID):
+        return _serialize_uuid_type
+    elif issubclass(cls, decimal.Decimal):
+        return str
+    elif issubclass(cls, (collections.Set, collections.Sequence)):
+        return _serialize_collection
+    elif issubclass(cls, collections.Mapping):
+        return _serialize_mapping
+    return _serialize_identity
+
+
+def get_serializer(cls):
+    """Get the serializer function of the given concrete type.
+    Serializers are chosen by :func:`compile_serializer()` only once per
+    type, and then cached.
+
+    :param cls: The exact type of values to serialize, i.e., ``type(data)``.
+    :return: A function that takes a value of the type and returns
+             a JSON-compatible value.
+
+    .. versionadded:: 0.6.4
+
+    """
+    return _get_cached(_serializers, cls, compile_serializer)
+
+
+def _serialize_native_collection(data):
+    return list(data)
+
+
+def _serialize_native_mapping(data):
+    return [{'key': k, 'value': v} for k, v in data.items()]
+
+
+def _compile_typed_collection_serializer(elem_type):
+    serialize_elem = _get_typed_serializer(elem_type)
+
+    def serialize(data):
+        return [serialize_elem(e) for e in data]
+    return serialize
+
+
+def _compile_typed_mapping_serializer(key_type, value_type):
+    serialize_key = _get_typed_serializer(key_type)
+    serialize_value = _get_typed_serializer(value_type)
+
+    def serialize(data):
+        return [
+            {'key': serialize_key(k), 'value': serialize_value(v)}
             for k, v in data.items()
         ]
+    return serialize
+
+
+def _compile_typed_unboxed_serializer(inner_type):
+    serialize_inner = _get_typed_serializer(inner_type)
+
+    def serialize(data):
+        return serialize_inner(data.value)
+    return serialize
+
+
+def _compile_typed_optional_serializer(inner_type):
+    serialize_inner = _get_typed_serializer(inner_type)
+
+    def serialize(data):
+        return None if data is None else serialize_inner(data)
+    return serialize
+
+
+def _compile_typed_serializer(type_hint):
+    """Choose a function specialized to serialize values of the given
+    declared type.  Unlike :func:`compile_serializer()`, it walks only what
+    the declared type needs, e.g., a value of ``typing.Sequence[int]``
+    is turned into a list without checking its elements.
+
+    Values of records and unions (which can be of their subclasses, e.g.,
+    tags or lazy proxies) are still dispatched by their concrete types.
+
+    """
+    try:
+        native = type_hint in _JSON_NATIVE_HINTS
+    except TypeError:  # unhashable type hints
+        native = False
+    if native:
+        return _serialize_identity
+    elif (hasattr(type_hint, '__nirum_tag__') or
+          hasattr(type_hint, 'Tag') or
+          hasattr(type_hint, '__nirum_record_behind_name__')):
+        return serialize_meta
+    elif (hasattr(type_hint, '__nirum_get_inner_type__') or
+          hasattr(type_hint, '__nirum_inner_type__')):
+        return _compile_typed_unboxed_serializer(
+            _get_unboxed_inner_type(type_hint)
+        )
+    elif (isinstance(type_hint, type) and
+          (hasattr(type_hint, '__nirum_serialize__') or
+           issubclass(type_hint, _SCALAR_HINTS))):
+        return compile_serializer(type_hint)
+    elif is_optional_type(type_hint):
+        inner_types = [t for t in get_union_types(type_hint)
+                       if t is not _NONE_TYPE]
+        if len(inner_types) == 1:
+            return _compile_typed_optional_serializer(inner_types[0])
+        return serialize_meta
+    origin = getattr(type_hint, '__origin__', None)
+    params = [t for t in getattr(type_hint, '__args__', None) or ()
+              if not isinstance(t, typing.TypeVar)]
+    if origin in _COLLECTION_ORIGINS and len(params) == 1:
+        if params[0] in _JSON_NATIVE_HINTS:
+            return _serialize_native_collection
+        return _compile_typed_collection_serializer(params[0])
+    elif origin is typing.Mapping and len(params) == 2:
+        if _JSON_NATIVE_HINTS.issuperset(params):
+            return _serialize_native_mapping
+        return _compile_typed_mapping_serializer(*params)
+    return serialize_meta
+
+
+def _get_typed_serializer(type_hint):
+    return _get_cached(_typed_serializers, type_hint,
+                       _compile_typed_serializer)
+
+
+def serialize_meta(data, type_hint=None):
+    """Serialize a value into a JSON-compatible value.
+
+    :param data: A value to serialize.
+    :param type_hint: The declared type of the value, e.g., the return type
+                      of a service method, or ``typing.Sequence[int]``.
+                      If given, the value is serialized as the type directs
+                      without inspecting what the type already tells, and
+                      it has to be a value of the type.
+    :return: A JSON-compatible value.
+
+    .. versionchanged:: 0.6.4
+       Added ``type_hint`` option.
+
+    """
+    if type_hint is not None:
+        return _get_typed_serializer(type_hint)(data)
+    try:
+        serialize = _serializers[type(data)]
+    except KeyError:
+        serialize = get_serializer(type(data))
+    return serialize(data)
+
+
+def serialize_json(data, type_hint=None):
+    """Serialize a value and encode it into a JSON document.
+    The document is encoded through the current backend of
+    :mod:`nirum.jsonlib`.
+
+    :param data: A value to serialize.
+    :param type_hint: The declared type of the value.
+                      See also :func:`serialize_meta()`.
+    :return: A JSON document encoded in UTF-8.
+    :rtype: :class:`bytes`
+
+    .. versionadded:: 0.6.4
+
+    .. versionchanged:: 0.6.4
+       When the fragment cache is enabled through
+       :func:`set_fragment_cache_size()`, the document is encoded by
+       the runtime itself instead of the backend, so that cached fragments
+       are spliced into it.
+
+    """
+    if _fragment_cache is not None:
+        if type_hint is None:
+            encoded = _encode_fragment(data)
+        else:
+            encoded = _get_typed_fragment_encoder(type_hint)(data)
+        return ''.join(_iter_fragments(encoded)).encode('utf-8')
+    return dumps_bytes(serialize_meta(data, type_hint))
+
+
+class _MapItem(tuple):
+    """A pair of a key and a value of a map, which is encoded as
+    a ``{"key": ..., "value": ...}`` object.
+
+    """
+
+    __slots__ = ()
+
+
+_MAP_ITEM_PREFIXES = '"key": ', '"value": '
+
+
+class _TypedValue(tuple):
+    """A pair of a value and its declared type, which is encoded as
+    :func:`serialize_meta()` serializes the value with the type hint.
+
+    """
+
+    __slots__ = ()
+
+
+def _encode_float(data):
+    # The same as what the standard json module does.
+    if data != data:
+        return 'NaN'
+    elif data == float('inf'):
+        return 'Infinity'
+    elif data == -float('inf'):
+        return '-Infinity'
+    return float.__repr__(data)
+
+
+def _encode_int(data):
+    return '%d' % data
+
+
+def _encode_bool(data):
+    return 'true' if data else 'false'
+
+
+def _encode_none(data):
+    return 'null'
+
+
+def _encode_array(data):
+    return '[', zip(itertools.repeat(''), data), ']'
+
+
+def _encode_map(data):
+    return '[', zip(itertools.repeat(''), map(_MapItem, data.items())), ']'
+
+
+def _encode_map_item(data):
+    return '{', zip(_MAP_ITEM_PREFIXES, data), '}'
+
+
+def _encode_nirum_type(data):
+    # Types which serialize themselves in their own ways (e.g., enums) are
+    # encoded from what they serialize into.
+    return _encode_json(data.__nirum_serialize__())
+
+
+def _encode_unboxed_type(data):
+    return _encode_fragment(data.value)
+
+
+def _compile_fields_encoder(cls):
+    if hasattr(cls, '__nirum_tag__'):
+        header = [
+            ('_type', cls.__nirum_union_behind_name__),
+            ('_tag', cls.__nirum_tag__.value),
+        ]
+        names = cls.__nirum_tag_names__
     else:
-        d = data
-    return d
+        header = [('_type', cls.__nirum_record_behind_name__)]
+        names = cls.__nirum_field_names__
+    slots = tuple(cls.__slots__)
+    prefixes = [_encode_text(key) + ': ' for key, _ in header]
+    prefixes.extend(
+        _encode_text(names[slot] if slot in names else slot) + ': '
+        for slot in slots
+    )
+    header_values = [value for _, value in header]
+    get_values = operator.attrgetter(*slots) if slots else None
+
+    def encode(data):
+        if len(slots) > 1:
+            values = header_values + list(get_values(data))
+        elif slots:
+            values = header_values + [get_values(data)]
+        else:
+            values = header_values
+        return '{', zip(prefixes, values), '}'
+    return encode
+
+
+def _encode_with_serializer(serialize):
+    def encode(data):
+        return _encode_json(serialize(data))
+    return encode
+
+
+def _encode_typed_value(data):
+    value, type_hint = data
+    return _get_typed_fragment_encoder(type_hint)(value)
+
+
+def _compile_typed_fragment_encoder(type_hint):
+    """Choose a function which encodes values of the given declared type
+    into JSON fragments, in the same way as :func:`serialize_meta()` with
+    the type hint.  Where the declared type dispatches values by their
+    concrete types anyway (e.g., records and unions), it falls back to
+    :func:`_encode_fragment()`, so that the fragment cache still works.
+
+    """
+    serialize = _get_typed_serializer(type_hint)
+    if serialize is serialize_meta:
+        return _encode_fragment
+    elif is_optional_type(type_hint):
+        inner_types = [t for t in get_union_types(type_hint)
+                       if t is not _NONE_TYPE]
+        encode_inner = _get_typed_fragment_encoder(inner_types[0])
+
+        def encode(data):
+            return _encode_none(data) if data is None else encode_inner(data)
+        return encode
+    origin = getattr(type_hint, '__origin__', None)
+    params = [t for t in getattr(type_hint, '__args__', None) or ()
+              if not isinstance(t, typing.TypeVar)]
+    if origin in _COLLECTION_ORIGINS and len(params) == 1:
+        elem_type = params[0]
+        if _get_typed_serializer(elem_type) is serialize_meta:
+            return _encode_array
+
+        def encode(data):
+            return '[', zip(itertools.repeat(''),
+                            (_TypedValue((e, elem_type)) for e in data)), ']'
+        return encode
+    return _encode_with_serializer(serialize)
+
+
+def _get_typed_fragment_encoder(type_hint):
+    return _get_cached(_typed_fragment_encoders, type_hint,
+                       _compile_typed_fragment_encoder)
+
+
+def _compile_fragment_encoder(cls):
+    """Choose a function which encodes values of the given concrete type
+    into JSON.  The function returns either a complete JSON fragment as
+    a string, or a triple of an opening bracket, an iterable of pairs of
+    a prefix (e.g., a key) and a value to encode, and a closing bracket,
+    so that containers are walked lazily.
+
+    """
+    if cls is text_type:
+        return _encode_text
+    elif cls is bool:
+        return _encode_bool
+    elif cls in integer_types:
+        return _encode_int
+    elif cls is float:
+        return _encode_float
+    elif cls is _NONE_TYPE:
+        return _encode_none
+    elif cls is _MapItem:
+        return _encode_map_item
+    elif cls is _TypedValue:
+        return _encode_typed_value
+    elif hasattr(cls, '__nirum_lazy_header__'):
+        # Lazy records and unions pass fields never accessed through.
+        return _encode_nirum_type
+    elif (hasattr(cls, '__nirum_tag__') or
+          hasattr(cls, '__nirum_record_behind_name__')):
+        return _compile_fields_encoder(cls)
+    elif (hasattr(cls, '__nirum_inner_type__') or
+          hasattr(cls, '__nirum_get_inner_type__')):
+        return _encode_unboxed_type
+    serialize = compile_serializer(cls)
+    if serialize is _serialize_collection:
+        return _encode_array
+    elif serialize is _serialize_mapping:
+        return _encode_map
+    elif serialize is _serialize_nirum_type:
+        return _encode_nirum_type
+    return _encode_with_serializer(serialize)
+
+
+#: (:class:`collections.namedtuple`) Statistics of the fragment cache,
+#: returned by :func:`fragment_cache_info()`.
+#:
+#: .. versionadded:: 0.6.4
+FragmentCacheInfo = collections.namedtuple(
+    'FragmentCacheInfo',
+    ['hits', 'misses', 'maxsize', 'max_bytes', 'currsize', 'currbytes']
+)
+
+
+class _FragmentCache(object):
+    """A bounded LRU cache of encoded JSON fragments of immutable values.
+
+    Records and maps have ``__slots__`` without ``__weakref__``, so that
+    values are keyed by their :func:`id()` instead of weak references.
+    Each entry refers to its value as well, so that the identity of
+    a cached value can't be reused by another object until it's evicted.
+
+    """
+
+    def __init__(self, maxsize, max_bytes):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.currbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, value):
+        key = id(value)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def put(self, value, fragment):
+        size = len(fragment)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        key = id(value)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.currbytes -= len(old[1])
+            self.entries[key] = value, fragment
+            self.currbytes += size
+            while (len(self.entries) > self.maxsize or
+                   self.max_bytes is not None and
+                   self.currbytes > self.max_bytes):
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.currbytes -= len(evicted)
+
+    def info(self):
+        with self.lock:
+            return FragmentCacheInfo(
+                self.hits, self.misses, self.maxsize, self.max_bytes,
+                len(self.entries), self.currbytes
+            )
+
+
+_fragment_cache = None
+
+
+def set_fragment_cache_size(maxsize, max_bytes=None):
+    """Set the size of the cache of encoded JSON fragments of immutable
+    values, i.e., records, unions, :class:`~nirum.datastructures.Map`, and
+    :class:`~nirum.datastructures.List`.  When the same objects are
+    serialized over and over (e.g., reference data embedded in many
+    responses, or cached domain objects returned by hot endpoints),
+    :func:`iter_serialize()` and :func:`serialize_json()` splice their
+    cached fragments verbatim instead of encoding them again.
+
+    Values are cached by their identity, and the cache keeps them alive
+    until they are evicted.  Since values never serialized twice only
+    occupy the cache, it's meant for workloads sharing the same objects.
+    The cache is disabled by default.
+
+    :param maxsize: The maximum number of values to cache.  Zero disables
+                    the cache and discards it.
+    :type maxsize: :class:`int`
+    :param max_bytes: The maximum total length of cached fragments.
+                      No limit by default.
+    :type max_bytes: :class:`int`
+
+    .. versionadded:: 0.6.4
+
+    """
+    global _fragment_cache
+    _fragment_cache = _FragmentCache(maxsize, max_bytes) if maxsize else None
+    _fragment_encoders.clear()
+
+
+def fragment_cache_info():
+    """Get statistics of the fragment cache.
+    See also :func:`set_fragment_cache_size()`.
+
+    :return: The numbers of hits and misses, the limits, and the current
+             number of values and total length of fragments in the cache.
+             All zero or :const:`None` when the cache is disabled.
+    :rtype: :class:`FragmentCacheInfo`
+
+    .. versionadded:: 0.6.4
+
+    """
+    cache = _fragment_cache
+    if cache is None:
+        return FragmentCacheInfo(0, 0, 0, None, 0, 0)
+    return cache.info()
+
+
+def _is_fragment_cacheable(cls):
+    return (issubclass(cls, (Map, List)) or
+            hasattr(cls, '__nirum_tag__') or
+            hasattr(cls, '__nirum_record_behind_name__'))
+
+
+def _cache_fragment_encoder(encode, cache):
+    def encode_cached(data):
+        fragment = cache.get(data)
+        if fragment is None:
+            encoded = encode(data)
+            if type(encoded) is tuple:
+                encoded = ''.join(_iter_fragments(encoded))
+            fragment = encoded
+            cache.put(data, fragment)
+        return fragment
+    return encode_cached
+
+
+def _compile_fragment_encoder_cached(cls):
+    encode = _compile_fragment_encoder(cls)
+    cache = _fragment_cache
+    if cache is not None and _is_fragment_cacheable(cls):
+        return _cache_fragment_encoder(encode, cache)
+    return encode
+
+
+def _encode_fragment(data):
+    cls = type(data)
+    try:
+        encode = _fragment_encoders[cls]
+    except KeyError:
+        encode = _get_cached(_fragment_encoders, cls,
+                             _compile_fragment_encoder_cached)
+    return encode(data)
+
+
+def _iter_fragments(encoded):
+    stack = []
+    while True:
+        if type(encoded) is tuple:
+            opening, items, closing = encoded
+            yield opening
+            stack.append((iter(items), closing))
+            separator = ''
+        else:
+            yield encoded
+            separator = ', '
+        while stack:
+            items, closing = stack[-1]
+            for prefix, value in items:
+                yield separator + prefix
+                encoded = _encode_fragment(value)
+                break
+            else:
+                stack.pop()
+                yield closing
+                separator = ', '
+                continue
+            break
+        else:
+            return
+
+
+def iter_serialize(data, chunk_size=65536):
+    """Serialize a value into a JSON document chunk by chunk, without
+    building the whole JSON-compatible tree nor the whole document in
+    memory.  The document represents the same JSON value as what
+    :func:`serialize_meta()` returns, though keys of objects may be in
+    a different order from what the standard :mod:`json` writes.
+
+    :param data: A value to serialize.
+    :param chunk_size: The approximate size of each chunk in bytes.
+    :type chunk_size: :class:`int`
+    :return: An iterator of chunks of the JSON document encoded in UTF-8.
+    :rtype: :class:`typing.Iterator`\\ [:class:`bytes`]
+
+    .. versionadded:: 0.6.4
+
+    """
+    buffer = []
+    size = 0
+    for fragment in _iter_fragments(_encode_fragment(data)):
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            del buffer[:]
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def serialize_to_stream(data, write, chunk_size=65536):
+    """Serialize a value into a JSON document, and write it chunk by chunk
+    to the given function (e.g., :meth:`io.RawIOBase.write()` of a file).
+    See also :func:`iter_serialize()`.
+
+    :param data: A value to serialize.
+    :param write: A function which takes a :class:`bytes` chunk.
+    :param chunk_size: The approximate size of each chunk in bytes.
+    :type chunk_size: :class:`int`
+
+    .. versionadded:: 0.6.4
+
+    """
+    for chunk in iter_serialize(data, chunk_size):
+        write(chunk)
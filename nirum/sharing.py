@@ -0,0 +1,515 @@
+""":mod:`nirum.sharing` --- Reference-sharing JSON encoding
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:func:`~nirum.serialize.serialize_meta()` writes a full copy of a record
+or a union every time it occurs in a value.  :func:`serialize_shared()`
+instead writes every record or union value which occurs more than once
+(i.e., values which are identical or equal to each other) only once into
+a table, and refers to it by its index in the table everywhere else::
+
+    {
+        "_refs": [
+            {"_type": "location", "name": "Seoul", ...}
+        ],
+        "_value": [
+            {"_type": "event", "location": {"_ref": 0}, ...},
+            {"_type": "event", "location": {"_ref": 0}, ...}
+        ]
+    }
+
+A reference ``{"_ref": n}`` can occur only where a record or a union is
+declared, and it's never confused with a record or a union since it has no
+``"_type"`` field.  Table entries can refer to other entries as well.
+:func:`deserialize_shared()` decodes every table entry only once, so that
+references to the same entry become the same instance.
+
+.. versionadded:: 0.6.4
+
+"""
+import typing
+import weakref
+
+from six import integer_types
+
+from ._compat import get_union_types, is_optional_type
+from .datastructures import Map
+from .deserialize import (_ITERABLE_PRIMITIVE_TYPES, _MISSING, _NONE_TYPE,
+                          _DeserializationError, get_deserializer,
+                          is_support_abstract_type, _compiled_caches,
+                          _find_union_tag, _format_unexpected_value,
+                          _format_unknown_tag, _get_cached,
+                          _get_collection_element_type)
+from .serialize import (_get_field_types, _get_typed_serializer,
+                        _get_unboxed_inner_type)
+from .validate import construct_trusted
+
+__all__ = 'deserialize_shared', 'serialize_shared'
+
+_visitors = weakref.WeakKeyDictionary()
+_encoders = weakref.WeakKeyDictionary()
+_decoders = weakref.WeakKeyDictionary()
+_field_visitors = weakref.WeakKeyDictionary()
+_field_encoders = weakref.WeakKeyDictionary()
+_field_decoders = weakref.WeakKeyDictionary()
+_compiled_caches.extend([_visitors, _encoders, _decoders, _field_visitors,
+                         _field_encoders, _field_decoders])
+
+_IN_PROGRESS = object()
+
+
+def _get_fields(cls):
+    """List the fields of the given record type or tag type.
+
+    :return: A pair of the header fields (i.e., ``"_type"`` and ``"_tag"``)
+             and the list of triples of the facial name, the behind name,
+             and the type of each field.
+
+    """
+    if hasattr(cls, '__nirum_tag__'):
+        header = {
+            '_type': cls.__nirum_union_behind_name__,
+            '_tag': cls.__nirum_tag__.value,
+        }
+        names = cls.__nirum_tag_names__
+    else:
+        header = {'_type': cls.__nirum_record_behind_name__}
+        names = cls.__nirum_field_names__
+    field_types = _get_field_types(cls)
+    return header, [
+        (slot, names[slot] if slot in names else slot, field_types[slot])
+        for slot in cls.__slots__
+    ]
+
+
+def _get_structure(cls):
+    """Classify the given declared type into how it's walked.
+
+    :return: A pair of the kind of the type (one of ``'shared'``,
+             ``'unboxed'``, ``'optional'``, ``'collection'``, ``'map'``,
+             and ``'leaf'``) and its inner type(s).
+
+    """
+    if (hasattr(cls, '__nirum_tag__') or hasattr(cls, 'Tag') or
+            hasattr(cls, '__nirum_record_behind_name__')):
+        return 'shared', None
+    elif (hasattr(cls, '__nirum_get_inner_type__') or
+          hasattr(cls, '__nirum_inner_type__')):
+        return 'unboxed', _get_unboxed_inner_type(cls)
+    elif is_support_abstract_type(cls):
+        origin = getattr(cls, '__origin__', None) or cls
+        params = getattr(cls, '__args__', None) or ()
+        if origin is typing.Mapping and len(params) == 2:
+            return 'map', params
+        elif origin in _ITERABLE_PRIMITIVE_TYPES:
+            primitive_type, elem_type = _get_collection_element_type(cls)
+            if elem_type is not None:
+                return 'collection', (primitive_type, elem_type)
+    elif is_optional_type(cls):
+        inner_types = [t for t in get_union_types(cls) if t is not _NONE_TYPE]
+        if len(inner_types) == 1:
+            return 'optional', inner_types[0]
+    return 'leaf', None
+
+
+class _Entry(object):
+    """The occurrences of a record or union value in a payload."""
+
+    __slots__ = 'value', 'count', 'index'
+
+    def __init__(self, value):
+        self.value = value
+        self.count = 1
+        self.index = None
+
+
+class _Occurrences(object):
+    """The record and union values found in a payload being serialized."""
+
+    __slots__ = 'ids', 'values', 'entries'
+
+    def __init__(self):
+        #: (:class:`dict`) The mapping of :func:`id()` of values to their
+        #: entries.
+        self.ids = {}
+        #: (:class:`dict`) The mapping of hashable values to their entries.
+        self.values = {}
+        #: (:class:`list`) The entries in the order they are found.
+        self.entries = []
+
+
+def _visit_shared(data, occurrences):
+    # Identical values are found by their identities without hashing them,
+    # and equal values by their hashes.
+    entry = occurrences.ids.get(id(data))
+    if entry is None:
+        try:
+            entry = occurrences.values.get(data)
+        except TypeError:  # unhashable
+            entry = None
+        if entry is None:
+            entry = _Entry(data)
+            occurrences.ids[id(data)] = entry
+            occurrences.entries.append(entry)
+            try:
+                occurrences.values[data] = entry
+            except TypeError:
+                pass
+            fields = _get_cached(_field_visitors, type(data),
+                                 _get_field_visitors)
+            for name, visit in fields:
+                visit(getattr(data, name), occurrences)
+            return
+        occurrences.ids[id(data)] = entry
+    # Fields of the same values are never visited twice.
+    entry.count += 1
+
+
+def _visit_nothing(data, occurrences):
+    pass
+
+
+def _compile_visitor(cls):
+    kind, params = _get_structure(cls)
+    if kind == 'shared':
+        return _visit_shared
+    elif kind == 'unboxed':
+        visit_inner = _get_visitor(params)
+        if visit_inner is _visit_nothing:
+            return _visit_nothing
+
+        def visit(data, occurrences):
+            visit_inner(data.value, occurrences)
+    elif kind == 'optional':
+        visit_inner = _get_visitor(params)
+        if visit_inner is _visit_nothing:
+            return _visit_nothing
+
+        def visit(data, occurrences):
+            if data is not None:
+                visit_inner(data, occurrences)
+    elif kind == 'collection':
+        visit_elem = _get_visitor(params[1])
+        if visit_elem is _visit_nothing:
+            return _visit_nothing
+
+        def visit(data, occurrences):
+            for elem in data:
+                visit_elem(elem, occurrences)
+    elif kind == 'map':
+        visit_key = _get_visitor(params[0])
+        visit_value = _get_visitor(params[1])
+        if visit_key is visit_value is _visit_nothing:
+            return _visit_nothing
+
+        def visit(data, occurrences):
+            for key, value in data.items():
+                visit_key(key, occurrences)
+                visit_value(value, occurrences)
+    else:
+        return _visit_nothing
+    return visit
+
+
+def _get_visitor(cls):
+    return _get_cached(_visitors, cls, _compile_visitor)
+
+
+def _get_field_visitors(cls):
+    # Fields which can't have any records or unions are skipped.
+    _, fields = _get_fields(cls)
+    visitors = [(name, _get_visitor(field_type))
+                for name, _, field_type in fields]
+    return [(name, visit) for name, visit in visitors
+            if visit is not _visit_nothing]
+
+
+def _get_field_encoders(cls):
+    header, fields = _get_fields(cls)
+    return header, [
+        (name, behind_name, _get_encoder(field_type))
+        for name, behind_name, field_type in fields
+    ]
+
+
+def _encode_fields(data, ids):
+    header, fields = _get_cached(_field_encoders, type(data),
+                                 _get_field_encoders)
+    encoded = dict(header)
+    for name, behind_name, encode in fields:
+        encoded[behind_name] = encode(getattr(data, name), ids)
+    return encoded
+
+
+def _encode_shared(data, ids):
+    index = ids[id(data)].index
+    if index is None:
+        return _encode_fields(data, ids)
+    return {'_ref': index}
+
+
+def _compile_encoder(cls):
+    kind, params = _get_structure(cls)
+    if kind == 'shared':
+        return _encode_shared
+    elif kind == 'unboxed':
+        encode_inner = _get_encoder(params)
+
+        def encode(data, ids):
+            return encode_inner(data.value, ids)
+    elif kind == 'optional':
+        encode_inner = _get_encoder(params)
+
+        def encode(data, ids):
+            return None if data is None else encode_inner(data, ids)
+    elif kind == 'collection':
+        encode_elem = _get_encoder(params[1])
+
+        def encode(data, ids):
+            return [encode_elem(elem, ids) for elem in data]
+    elif kind == 'map':
+        encode_key = _get_encoder(params[0])
+        encode_value = _get_encoder(params[1])
+
+        def encode(data, ids):
+            return [
+                {'key': encode_key(k, ids), 'value': encode_value(v, ids)}
+                for k, v in data.items()
+            ]
+    else:
+        serialize = _get_typed_serializer(cls)
+
+        def encode(data, ids):
+            return serialize(data)
+    return encode
+
+
+def _get_encoder(cls):
+    return _get_cached(_encoders, cls, _compile_encoder)
+
+
+def serialize_shared(data, type_hint):
+    """Serialize the given value into a JSON-compatible value, writing
+    every record or union value which occurs more than once only once.
+
+    :param data: A value to serialize.
+    :param type_hint: The declared type of ``data``.  Values are shared
+                      only where records or unions are declared.
+    :return: A JSON-compatible mapping of the table of shared values
+             (``"_refs"``) and the serialized value (``"_value"``).
+
+    """
+    occurrences = _Occurrences()
+    _get_visitor(type_hint)(data, occurrences)
+    shared = []
+    for entry in occurrences.entries:
+        if entry.count > 1:
+            entry.index = len(shared)
+            shared.append(entry.value)
+    ids = occurrences.ids
+    return {
+        '_refs': [_encode_fields(value, ids) for value in shared],
+        '_value': _get_encoder(type_hint)(data, ids),
+    }
+
+
+class _References(object):
+    """The table of shared values of a payload being decoded."""
+
+    __slots__ = 'refs', 'values'
+
+    def __init__(self, refs):
+        self.refs = refs
+        self.values = [_MISSING] * len(refs)
+
+
+def _get_field_decoders(cls):
+    _, fields = _get_fields(cls)
+    decoders = {}
+    for name, behind_name, field_type in fields:
+        decoders[name] = decoders[behind_name] = \
+            name, _get_decoder(field_type)
+    return [name for name, _, _ in fields], decoders
+
+
+def _decode_fields(tag_cls, value, refs, meta_fields):
+    names, fields = _get_cached(_field_decoders, tag_cls,
+                                _get_field_decoders)
+    args = {}
+    for key, item in value.items():
+        if key in meta_fields:
+            continue
+        try:
+            name, decode = fields[key]
+        except KeyError:
+            raise ValueError('{0} has no field "{1}".'.format(
+                typing._type_repr(tag_cls), key
+            ))
+        args[name] = decode(item, refs)
+    if len(args) < len(names):
+        for name in names:
+            if name not in args:
+                raise ValueError('"{0}" field is missing.'.format(name))
+    return construct_trusted(tag_cls, args)
+
+
+def _decode_record(cls, value, refs):
+    if not isinstance(value, dict):
+        raise ValueError('{0} must be an object, not {1!r}.'.format(
+            typing._type_repr(cls), value
+        ))
+    behind_name = cls.__nirum_record_behind_name__
+    type_name = value.get('_type', _MISSING)
+    if type_name is _MISSING:
+        raise ValueError('"_type" field is missing.')
+    elif type_name != behind_name:
+        raise _DeserializationError(
+            _format_unexpected_value, cls, '_type', behind_name, type_name
+        )
+    return _decode_fields(cls, value, refs, ('_type',))
+
+
+def _decode_union(cls, value, refs):
+    if not isinstance(value, dict):
+        raise ValueError('{0} must be an object, not {1!r}.'.format(
+            typing._type_repr(cls), value
+        ))
+    type_name = value.get('_type', _MISSING)
+    tag_name = value.get('_tag', _MISSING)
+    if type_name is _MISSING:
+        raise ValueError('"_type" field is missing.')
+    elif tag_name is _MISSING:
+        raise ValueError('"_tag" field is missing.')
+    found = _find_union_tag(cls, tag_name)
+    if found is None:
+        if hasattr(cls, '__nirum_tag__'):
+            raise _DeserializationError(
+                _format_unexpected_value,
+                cls, '_tag', cls.__nirum_tag__.value, tag_name
+            )
+        raise _DeserializationError(
+            _format_unknown_tag, cls, {'_type': type_name, '_tag': tag_name}
+        )
+    tag_cls = found[0]()
+    if type_name != tag_cls.__nirum_union_behind_name__:
+        raise _DeserializationError(
+            _format_unexpected_value,
+            tag_cls, '_type', tag_cls.__nirum_union_behind_name__, type_name
+        )
+    return _decode_fields(tag_cls, value, refs, ('_type', '_tag'))
+
+
+def _compile_shared_decoder(cls):
+    cls_ref = weakref.ref(cls)
+    if hasattr(cls, '__nirum_tag__') or hasattr(cls, 'Tag'):
+        decode_value = _decode_union
+    else:
+        decode_value = _decode_record
+
+    def decode(value, refs):
+        cls = cls_ref()
+        if not (isinstance(value, dict) and '_ref' in value):
+            return decode_value(cls, value, refs)
+        index = value['_ref']
+        if (len(value) != 1 or
+                not isinstance(index, integer_types) or
+                isinstance(index, bool) or
+                not 0 <= index < len(refs.values)):
+            raise ValueError('Invalid reference: {0!r}.'.format(value))
+        decoded = refs.values[index]
+        if decoded is _MISSING:
+            refs.values[index] = _IN_PROGRESS
+            decoded = decode_value(cls, refs.refs[index], refs)
+            refs.values[index] = decoded
+        elif decoded is _IN_PROGRESS:
+            raise ValueError('Reference {0} refers to itself.'.format(index))
+        elif not isinstance(decoded, cls):
+            raise ValueError(
+                'Reference {0} is not a value of {1}, but {2}.'.format(
+                    index, typing._type_repr(cls),
+                    typing._type_repr(type(decoded))
+                )
+            )
+        return decoded
+    return decode
+
+
+def _compile_decoder(cls):
+    kind, params = _get_structure(cls)
+    if kind == 'shared':
+        return _compile_shared_decoder(cls)
+    elif kind == 'unboxed':
+        cls_ref = weakref.ref(cls)
+        decode_inner = _get_decoder(params)
+
+        def decode(value, refs):
+            return cls_ref()(value=decode_inner(value, refs))
+    elif kind == 'optional':
+        decode_inner = _get_decoder(params)
+
+        def decode(value, refs):
+            return None if value is None else decode_inner(value, refs)
+    elif kind == 'collection':
+        primitive_type, elem_type = params
+        decode_elem = _get_decoder(elem_type)
+
+        def decode(value, refs):
+            if not isinstance(value, list):
+                raise ValueError('{0} must be an array, not {1!r}.'.format(
+                    typing._type_repr(cls), value
+                ))
+            elements = [decode_elem(elem, refs) for elem in value]
+            if primitive_type is list:
+                return elements
+            return primitive_type(elements)
+    elif kind == 'map':
+        decode_key = _get_decoder(params[0])
+        decode_value = _get_decoder(params[1])
+
+        def decode(value, refs):
+            if not isinstance(value, list):
+                raise ValueError('{0} must be an array, not {1!r}.'.format(
+                    typing._type_repr(cls), value
+                ))
+            items = {}
+            for item in value:
+                if not (isinstance(item, dict) and
+                        'key' in item and 'value' in item):
+                    raise ValueError(
+                        'map item must consist of "key" and "value" fields '
+                        'e.g. {"key": ..., "value": ...}'
+                    )
+                items[decode_key(item['key'], refs)] = \
+                    decode_value(item['value'], refs)
+            return Map._from_owned_dict(items)
+    else:
+        deserialize = get_deserializer(cls)
+
+        def decode(value, refs):
+            return deserialize(value)
+    return decode
+
+
+def _get_decoder(cls):
+    return _get_cached(_decoders, cls, _compile_decoder)
+
+
+def deserialize_shared(cls, data):
+    """Deserialize a JSON-compatible value serialized by
+    :func:`serialize_shared()` into the given type.  Every shared value
+    is deserialized only once, and all references to it become the same
+    instance.
+
+    :param cls: A type to deserialize the value into.
+    :param data: A JSON-compatible mapping of ``"_refs"`` and ``"_value"``.
+    :return: A deserialized value.
+    :raise ValueError: When the value is not deserializable into the type,
+                       or its references are invalid.
+
+    """
+    if not (isinstance(data, dict) and
+            isinstance(data.get('_refs'), list) and '_value' in data):
+        raise ValueError(
+            'expected an object of "_refs" and "_value" fields, not '
+            '{0!r}.'.format(data)
+        )
+    return _get_decoder(cls)(data['_value'], _References(data['_refs']))
@@ -16,16 +16,18 @@ __all__ = 'MockHttpResponse', 'MockOpener'
 
 class MockHttpResponse(HTTPResponse):
 
-    def __init__(self, body, status_code):
+    def __init__(self, body, status_code, content_type='application/json'):
         self.body = body
         self.code = status_code
         self.headers = email.message_from_string(
-            'Content-Type: application/json\n'
+            'Content-Type: {0}\n'.format(content_type)
         )
         if PY3:
             self.status = status_code
 
     def read(self):
+        if isinstance(self.body, bytes):
+            return self.body
         return self.body.encode('utf-8')
 
 
@@ -65,6 +67,7 @@ class MockOpener(urllib.request.OpenerDirector):
             path_only, data=req.data, headers=req.headers
         )
         return MockHttpResponse(
-            wsgi_response.get_data(as_text=True),
-            wsgi_response.status_code
+            wsgi_response.get_data(),
+            wsgi_response.status_code,
+            wsgi_response.mimetype
         )
@@ -3,14 +3,16 @@
 
 """
 import collections
+import threading
 import typing
 
 from ._compat import get_abstract_param_types, get_union_types, is_union_type
 
 __all__ = (
-    'validate_boxed_type', 'validate_record_type', 'validate_type',
-    'validate_unboxed_type', 'validate_union_type',
+    'construct_trusted', 'validate_boxed_type', 'validate_record_type',
+    'validate_type', 'validate_unboxed_type', 'validate_union_type',
 )
+_trusted = threading.local()
 
 
 def validate_type(data, type_):
@@ -50,7 +52,48 @@ validate_boxed_type = validate_unboxed_type
 #        remove it in the near future
 
 
+def construct_trusted(cls, args):
+    """Construct a record or union value from field values which are already
+    validated (e.g., by a deserializer), without validating them again.
+
+    If the type has a ``__nirum_construct_trusted__`` class method, it's
+    called with the field values as keyword arguments.  Otherwise, for
+    types generated by older compilers, the type is called as usual
+    while :func:`validate_record_type()` or :func:`validate_union_type()`
+    skips validation only once, for the first value of exactly the type
+    validated in the current thread (i.e., the value being constructed).
+    Other values validated meanwhile, e.g., ones built from untrusted input
+    by user code in ``__init__()``, are still validated.
+
+    :param cls: A record type or a union tag type.
+    :param args: The mapping of facial field names to their values.
+    :return: A record or union value.
+
+    .. versionadded:: 0.6.4
+
+    """
+    construct = getattr(cls, '__nirum_construct_trusted__', None)
+    if construct is not None:
+        return construct(**args)
+    trusted = getattr(_trusted, 'cls', None)
+    _trusted.cls = cls
+    try:
+        return cls(**args)
+    finally:
+        _trusted.cls = trusted
+
+
+def _is_trusted(value):
+    if getattr(_trusted, 'cls', None) is type(value):
+        # Trust only the value being constructed by construct_trusted().
+        _trusted.cls = None
+        return True
+    return False
+
+
 def validate_record_type(record):
+    if _is_trusted(record):
+        return record
     field_types = record.__nirum_field_types__
     if callable(field_types):
         field_types = field_types()
@@ -68,6 +111,8 @@ def validate_record_type(record):
 
 
 def validate_union_type(union):
+    if _is_trusted(union):
+        return union
     tag_types = union.__nirum_tag_types__
     if not callable(tag_types):  # generated by older compiler
         tag_types = tag_types.items
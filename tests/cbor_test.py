@@ -0,0 +1,121 @@
+import datetime
+import decimal
+import typing
+import uuid
+
+from fixture import ComplexKeyMap, Offset, Point, Rectangle
+from pytest import mark, raises
+
+from nirum._compat import utc
+from nirum.cbor import deserialize_cbor, loads, serialize_cbor
+from nirum.datastructures import List, Map
+from nirum.deserialize import DeserializationBudget
+from nirum.exc import DeserializationBudgetError
+from nirum.serialize import serialize_meta
+
+
+@mark.parametrize('value, encoded', [
+    (0, b'\x00'),
+    (23, b'\x17'),
+    (24, b'\x18\x18'),
+    (1000, b'\x19\x03\xe8'),
+    (1000000, b'\x1a\x00\x0f\x42\x40'),
+    (2 ** 64 - 1, b'\x1b\xff\xff\xff\xff\xff\xff\xff\xff'),
+    (2 ** 64, b'\xc2\x49\x01\x00\x00\x00\x00\x00\x00\x00\x00'),
+    (-1, b'\x20'),
+    (-1000, b'\x39\x03\xe7'),
+    (-2 ** 64 - 1, b'\xc3\x49\x01\x00\x00\x00\x00\x00\x00\x00\x00'),
+    (1.5, b'\xfa\x3f\xc0\x00\x00'),
+    (1.1, b'\xfb\x3f\xf1\x99\x99\x99\x99\x99\x9a'),
+    (False, b'\xf4'),
+    (True, b'\xf5'),
+    (None, b'\xf6'),
+    (u'', b'\x60'),
+    (u'\xfc', b'\x62\xc3\xbc'),
+    ([1, [2, 3]], b'\x82\x01\x82\x02\x03'),
+    ({u'a': 1}, b'\xa1\x61\x61\x01'),
+])
+def test_primitives(value, encoded):
+    # Examples from RFC 8949 Appendix A.
+    assert serialize_cbor(value) == encoded
+    assert loads(encoded) == value
+
+
+def test_half_precision_floats():
+    assert loads(b'\xf9\x3c\x00') == 1.0
+    assert loads(b'\xf9\x7b\xff') == 65504.0
+    assert loads(b'\xf9\x00\x01') == 5.960464477539063e-8
+    assert loads(b'\xf9\xfc\x00') == float('-inf')
+
+
+@mark.parametrize('value', [
+    Point(left=Offset(1.5), top=Offset(3.14)),
+    Rectangle(upper_left=Point(left=Offset(1.5), top=Offset(3.14)),
+              lower_right=Point(left=Offset(-2.0), top=Offset(0.0))),
+    ComplexKeyMap(value={
+        Point(left=Offset(1.5), top=Offset(3.14)):
+            Point(left=Offset(0.0), top=Offset(1.0)),
+    }),
+    Map({u'a': 1}),
+    List([u'a', u'b']),
+    [decimal.Decimal('3.14'), decimal.Decimal('-1.00'),
+     decimal.Decimal('1E+3'), decimal.Decimal('-0'), decimal.Decimal('NaN')],
+    [datetime.datetime(2016, 8, 5, 3, 46, 37, tzinfo=utc),
+     datetime.date(2016, 8, 5)],
+    uuid.UUID('7471A1F2-442E-4991-B6E8-77C6BD286785'),
+])
+def test_same_data_model_as_json(value):
+    assert loads(serialize_cbor(value)) == serialize_meta(value)
+
+
+def test_tagged_primitives():
+    u = uuid.UUID('7471A1F2-442E-4991-B6E8-77C6BD286785')
+    assert serialize_cbor(u) == b'\xd8\x25\x50' + u.bytes
+    assert serialize_cbor(decimal.Decimal('273.15')) == \
+        b'\xc4\x82\x21\x19\x6a\xb3'
+    assert serialize_cbor(datetime.date(2016, 8, 5)) == \
+        b'\xd9\x03\xec\x6a2016-08-05'
+    assert loads(b'\xd8\x20\x63abc') == u'abc'  # unknown tags are ignored
+    # Naive datetimes are not RFC 3339, so they are not tagged.
+    assert serialize_cbor(datetime.datetime(2016, 8, 5, 3, 46, 37)) == \
+        b'\x732016-08-05T03:46:37'
+    assert serialize_cbor(
+        datetime.datetime(2016, 8, 5, 3, 46, 37, tzinfo=utc)
+    ) == b'\xc0\x78\x192016-08-05T03:46:37+00:00'
+
+
+def test_deserialize_cbor():
+    rectangle = Rectangle(
+        upper_left=Point(left=Offset(1.5), top=Offset(3.14)),
+        lower_right=Point(left=Offset(-2.0), top=Offset(0.0))
+    )
+    assert deserialize_cbor(Rectangle, serialize_cbor(rectangle)) == rectangle
+    decimals = [decimal.Decimal('1.10'), decimal.Decimal('-3')]
+    assert deserialize_cbor(typing.Sequence[decimal.Decimal],
+                            serialize_cbor(decimals)) == decimals
+    budget = DeserializationBudget(max_elements=2)
+    with raises(DeserializationBudgetError):
+        deserialize_cbor(typing.Sequence[int], serialize_cbor([1, 2, 3]),
+                         budget)
+
+
+@mark.parametrize('data', [
+    b'',
+    b'\x18',  # truncated argument
+    b'\x62a',  # truncated text
+    b'\x9a\xff\xff\xff\xff',  # longer than the data
+    b'\x9f\x01\xff',  # indefinite length
+    b'\x01\x02',  # extra data
+    b'\xa1\x80\x01',  # unhashable key
+    b'\x62\xff\xff',  # invalid UTF-8
+    b'\xd8\x25\x41\x00',  # UUID of wrong length
+    b'\xf8\x20',  # unsupported simple value
+])
+def test_loads_invalid(data):
+    with raises(ValueError):
+        loads(data)
+
+
+def test_serialize_unsupported():
+    with raises(TypeError):
+        serialize_cbor(object())
@@ -0,0 +1,68 @@
+import decimal
+import json
+import typing
+
+from fixture import (Circle, ComplexKeyMap, Location, Offset, Point,
+                     Rectangle, Shape)
+from pytest import mark, raises
+from six import text_type
+
+from nirum.compact import deserialize_compact, serialize_compact
+from nirum.deserialize import deserialize_union_type
+from nirum.serialize import serialize_meta
+
+
+@mark.parametrize('value, type_hint, encoded', [
+    (Point(left=Offset(1.5), top=Offset(3.0)), Point, [1.5, 3.0]),
+    (Rectangle(upper_left=Point(left=Offset(1.5), top=Offset(3.0)),
+               lower_right=Point(left=Offset(-2.0), top=Offset(0.0))),
+     Shape, [u'rectangle', [1.5, 3.0], [-2.0, 0.0]]),
+    (Circle(origin=Point(left=Offset(0.0), top=Offset(1.0)),
+            radius=Offset(2.0)),
+     Circle, [[0.0, 1.0], 2.0]),  # the tag is fixed by the declared type
+    (Location(name=None, lat=decimal.Decimal('37.5665'),
+              lng=decimal.Decimal('126.9780')),
+     Location, [None, u'37.5665', u'126.9780']),
+    (ComplexKeyMap(value={Point(left=Offset(1.5), top=Offset(3.0)):
+                          Point(left=Offset(0.0), top=Offset(1.0))}),
+     ComplexKeyMap, [[[[1.5, 3.0], [0.0, 1.0]]]]),
+    ([Offset(1.5), None], typing.Sequence[typing.Optional[Offset]],
+     [1.5, None]),
+    ({u'a'}, typing.AbstractSet[text_type], [u'a']),
+])
+def test_compact(value, type_hint, encoded):
+    assert serialize_compact(value, type_hint) == encoded
+    decoded = deserialize_compact(type_hint, json.loads(json.dumps(encoded)))
+    assert decoded == value
+    assert type(decoded) is type(value)
+
+
+def test_compact_undeclared_types():
+    point = Point(left=Offset(1.5), top=Offset(3.0))
+    encoded = serialize_compact([point], typing.Sequence[object])
+    assert encoded == [serialize_meta(point)]
+
+
+def test_compact_lazy_values():
+    shape = Rectangle(upper_left=Point(left=Offset(1.5), top=Offset(3.0)),
+                      lower_right=Point(left=Offset(-2.0), top=Offset(0.0)))
+    lazy = deserialize_union_type(Shape, serialize_meta(shape), lazy=True)
+    assert type(lazy) is not Rectangle
+    assert serialize_compact(lazy, Shape) == serialize_compact(shape, Shape)
+
+
+@mark.parametrize('type_hint, encoded', [
+    (Point, {'left': 1.5, 'top': 3.0}),
+    (Point, [1.5]),
+    (Point, [1.5, 3.0, 4.5]),
+    (Shape, []),
+    (Shape, [u'triangle']),
+    (Shape, [[u'rectangle']]),
+    (Shape, [u'circle', [0.0, 1.0]]),
+    (Circle, [u'circle', [0.0, 1.0], 2.0]),
+    (ComplexKeyMap, [[[[1.5, 3.0]]]]),
+    (typing.Sequence[Point], [1.5, 3.0]),
+])
+def test_compact_invalid(type_hint, encoded):
+    with raises(ValueError):
+        deserialize_compact(type_hint, encoded)
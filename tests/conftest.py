@@ -1,4 +1,4 @@
-from fixture import (A, B, C, Circle, Location, Offset, Point,
+from fixture import (A, B, C, Circle, Counter, Location, Offset, Point,
                      Rectangle, Shape, Token)
 from pytest import fixture
 
@@ -49,6 +49,11 @@ def fx_location_record():
     return Location
 
 
+@fixture
+def fx_counter_type():
+    return Counter
+
+
 @fixture
 def fx_shape_type():
     return Shape
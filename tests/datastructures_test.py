@@ -83,6 +83,16 @@ def test_map_pickle():
     p(Map(d=Map(a=1, b=2)))
 
 
+def test_map_from_owned_dict():
+    value = {'a': 1, 'b': 2}
+    m = Map._from_owned_dict(value)
+    assert m == Map(a=1, b=2)
+    assert m.value is value
+    unpickled = pickle.loads(pickle.dumps(m))
+    assert unpickled == m
+    assert type(unpickled) is Map
+
+
 def test_map_bool():
     assert not Map()
     assert Map(a=1)
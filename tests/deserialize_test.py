@@ -1,22 +1,48 @@
 import collections
 import datetime
 import decimal
+import enum
+import gc
+import io
+import json
 import numbers
+import pickle
+import sys
 import typing
 import uuid
+import weakref
 
-from pytest import mark, raises
+from iso8601 import parse_date
+from pytest import importorskip, mark, raises
 from six import PY3, text_type
 
+from nirum import deserialize as deserialize_module
 from nirum._compat import utc
-from nirum.deserialize import (deserialize_meta,
+from nirum.compact import deserialize_compact
+from nirum.constructs import NameDict
+from nirum.deserialize import (DeserializationBudget,
+                               compile_deserializer,
+                               deserialize_any,
+                               deserialize_iter,
+                               deserialize_json,
+                               deserialize_many,
+                               deserialize_meta,
                                deserialize_optional,
+                               deserialize_parallel,
                                deserialize_primitive,
                                deserialize_record_type,
                                deserialize_tuple_type,
                                deserialize_unboxed_type,
-                               deserialize_union_type)
-from nirum.serialize import serialize_record_type
+                               deserialize_union_type,
+                               get_deserializer,
+                               intern_fields,
+                               is_field_loaded,
+                               precompile,
+                               set_primitive_cache_size,
+                               set_text_interning)
+from nirum.exc import DeserializationBudgetError
+from nirum.parser import parse_json
+from nirum.serialize import serialize_meta, serialize_record_type
 
 
 def test_deserialize_unboxed_type(fx_unboxed_type, fx_token_type):
@@ -43,6 +69,26 @@ def test_deserialize_record_type(fx_unboxed_type, fx_record_type):
     assert deserialized == instance
 
 
+@mark.parametrize('deserialize', [
+    deserialize_meta,
+    lambda cls, data: parse_json(cls, json.dumps(data)),
+    lambda cls, data: deserialize_compact(
+        cls, [data['count'], data['enabled']]
+    ),
+])
+def test_deserialize_record_type_scalar_fields(fx_counter_type, deserialize):
+    # Decoded records are constructed without validation, so the field
+    # deserializers themselves have to reject values of wrong types.
+    counter = deserialize(fx_counter_type,
+                          {'_type': 'counter', 'count': 3, 'enabled': True})
+    assert counter == fx_counter_type(count=3, enabled=True)
+    for count, enabled in [(u'abc', True), (3, u'yes'), (3, 1), (None, True),
+                           (True, True)]:
+        with raises(ValueError):
+            deserialize(fx_counter_type, {'_type': 'counter',
+                                          'count': count, 'enabled': enabled})
+
+
 def test_deserialize_union_type(fx_circle_type, fx_rectangle_type,
                                 fx_point, fx_shape_type):
     with raises(ValueError):
@@ -349,3 +395,574 @@ def test_deserialize_optional(fx_record_type):
         deserialize_optional(typing.Union[text_type, int], None)
     with raises(ValueError):
         deserialize_optional(typing.Optional[text_type], 1)
+
+
+@mark.parametrize('cls', [
+    int, text_type, uuid.UUID, datetime.datetime,
+    typing.Sequence[int], typing.Mapping[text_type, float],
+    typing.Optional[text_type], typing.Tuple[text_type, int],
+])
+def test_get_deserializer_cache(cls):
+    deserializer = get_deserializer(cls)
+    assert callable(deserializer)
+    assert get_deserializer(cls) is deserializer
+
+
+def test_get_deserializer_nominal_types(fx_record_type, fx_unboxed_type,
+                                        fx_shape_type, fx_point):
+    deserialize_point = get_deserializer(fx_record_type)
+    assert get_deserializer(fx_record_type) is deserialize_point
+    assert deserialize_point(
+        {'_type': 'point', 'x': 3.14, 'top': 1.592}
+    ) == fx_point
+    assert get_deserializer(fx_unboxed_type)(1.2) == fx_unboxed_type(1.2)
+    rectangle = get_deserializer(fx_shape_type)({
+        '_type': 'shape', '_tag': 'rectangle',
+        'upper_left': serialize_record_type(fx_point),
+        'lower_right': serialize_record_type(fx_point),
+    })
+    assert rectangle.upper_left == fx_point
+
+
+def test_compile_deserializer(fx_record_type, fx_point):
+    deserialize = compile_deserializer(typing.Sequence[fx_record_type])
+    assert compile_deserializer(typing.Sequence[fx_record_type]) \
+        is not deserialize
+    assert deserialize([serialize_record_type(fx_point)]) == [fx_point]
+    with raises(TypeError):
+        compile_deserializer(None)({})
+
+
+def test_deserialize_union_type_new_tag(fx_shape_type, fx_record_type,
+                                        fx_point):
+    # Index tags of the union before a new tag type is defined.
+    deserialize_union_type(fx_shape_type, {
+        '_type': 'shape', '_tag': 'rectangle',
+        'upper_left': serialize_record_type(fx_point),
+        'lower_right': serialize_record_type(fx_point),
+    })
+
+    class Triangle(fx_shape_type):
+
+        __slots__ = 'vertex',
+        __nirum_tag__ = enum.Enum('Tag', [('triangle', 'triangle')]).triangle
+        __nirum_tag_names__ = NameDict([('vertex', 'vertex')])
+
+        @staticmethod
+        def __nirum_tag_types__():
+            return [('vertex', fx_record_type)]
+
+        def __init__(self, vertex):
+            self.vertex = vertex
+
+    payload = {
+        '_type': 'shape', '_tag': 'triangle',
+        'vertex': serialize_record_type(fx_point),
+    }
+    triangle = deserialize_union_type(fx_shape_type, payload)
+    assert isinstance(triangle, Triangle)
+    assert triangle.vertex == fx_point
+    with raises(ValueError):
+        deserialize_union_type(fx_shape_type,
+                               {'_type': 'shape', '_tag': ['triangle']})
+
+
+@mark.parametrize('chunk_size', [1, 3, 7, 65536])
+def test_deserialize_iter(fx_record_type, fx_unboxed_type, chunk_size):
+    points = [
+        fx_record_type(left=fx_unboxed_type(i * 1.5),
+                       top=fx_unboxed_type(i * 123.0))
+        for i in range(10)
+    ]
+    payload = json.dumps([serialize_record_type(p) for p in points])
+    iterator = deserialize_iter(typing.Sequence[fx_record_type],
+                                io.BytesIO(payload.encode('utf-8')),
+                                chunk_size=chunk_size)
+    assert not isinstance(iterator, collections.Sequence)
+    assert list(iterator) == points
+    assert list(deserialize_iter(typing.Sequence[int],
+                                 [b' [ 12', b'3, 4', b'56 ,7', b'] '])) == \
+        [123, 456, 7]
+    # Numbers cut right after "." or "e" must not be decoded partially.
+    assert list(deserialize_iter(typing.Sequence[float],
+                                 [b'[1.', b'5, 2]'])) == [1.5, 2]
+    assert list(deserialize_iter(typing.Sequence[float],
+                                 [b'[1e', b'5]'])) == [1e5]
+    assert list(deserialize_iter(typing.Sequence[float],
+                                 [b'[-', b'2.5E', b'-', b'1 ,', b'3]'])) == \
+        [-0.25, 3]
+    assert list(deserialize_iter(typing.List[text_type],
+                                 [b'["\xea\xb0', b'\x80"]'])) == \
+        [u'\uac00']
+    assert list(deserialize_iter(typing.AbstractSet[int],
+                                 io.BytesIO(b'[]'),
+                                 chunk_size=chunk_size)) == []
+
+
+@mark.parametrize('cls, payload', [
+    (typing.Sequence[typing.Optional[bool]], u'[true, false, null]'),
+    (typing.Sequence[float], u'[-1.5e-3, -Infinity, 12, 0.25E+2]'),
+    (typing.Sequence[text_type], u'["x\\"\\u00e9\\ud83d\\ude00", "\\\\"]'),
+    (typing.Sequence[typing.Mapping[text_type, int]],
+     u'[[{"key": "a", "value": 1}], []]'),
+])
+def test_deserialize_iter_cut_everywhere(cls, payload):
+    expected = list(deserialize_meta(cls, json.loads(payload)))
+    for i in range(1, len(payload)):
+        chunks = [payload[:i].encode('utf-8'), payload[i:].encode('utf-8')]
+        assert list(deserialize_iter(cls, chunks)) == expected, i
+
+
+@mark.skipif(not hasattr(json, 'JSONDecodeError'),
+             reason='json.JSONDecodeError (Python 3.5+) is required to tell '
+                    'where errors are')
+def test_deserialize_iter_error_early():
+    read = []
+
+    def chunks():
+        yield b'[[1], [2, x], '
+        for i in range(1000):
+            read.append(i)
+            yield b'[3, 4], ' * 100
+        yield b'[5]]'
+    with raises(ValueError):
+        list(deserialize_iter(typing.Sequence[typing.Sequence[int]],
+                              chunks()))
+    # A syntax error is raised without reading the rest of the stream.
+    assert len(read) < 2
+
+
+@mark.parametrize('payload', [
+    b'{}', b'[1, 2', b'[1 2]', b'[1,]', b'[1] 2', b'', b'["a"]',
+])
+def test_deserialize_iter_error(payload):
+    with raises(ValueError):
+        list(deserialize_iter(typing.Sequence[int], io.BytesIO(payload),
+                              chunk_size=1))
+    with raises(TypeError):
+        list(deserialize_iter(typing.Mapping[int, int], io.BytesIO(payload)))
+
+
+def test_deserialize_many(fx_record_type, fx_unboxed_type):
+    values = [{'_type': 'point', 'x': float(i), 'top': 0.5} for i in range(5)]
+    expected = [
+        fx_record_type(left=fx_unboxed_type(float(i)),
+                       top=fx_unboxed_type(0.5))
+        for i in range(5)
+    ]
+    assert deserialize_many(fx_record_type, iter(values)) == expected
+    values[2] = {'_type': 'circle'}
+    with raises(ValueError):
+        deserialize_many(fx_record_type, values)
+    result = deserialize_many(fx_record_type, values, return_exceptions=True)
+    assert result[:2] == expected[:2]
+    assert isinstance(result[2], ValueError)
+    assert result[3:] == expected[3:]
+
+
+@mark.parametrize('executor_type', ['ThreadPoolExecutor',
+                                    'ProcessPoolExecutor'])
+def test_deserialize_parallel(executor_type, fx_record_type, fx_unboxed_type):
+    futures = importorskip('concurrent.futures')
+    values = [{'_type': 'point', 'x': float(i), 'top': 0.5}
+              for i in range(10)]
+    expected = [
+        fx_record_type(left=fx_unboxed_type(float(i)),
+                       top=fx_unboxed_type(0.5))
+        for i in range(10)
+    ]
+    cls = typing.Sequence[fx_record_type]
+    with getattr(futures, executor_type)(2) as executor:
+        assert deserialize_parallel(cls, values, threshold=1, chunk_size=3,
+                                    executor=executor) == expected
+        assert deserialize_parallel(typing.AbstractSet[int], [1, 2, 1],
+                                    threshold=1, chunk_size=1,
+                                    executor=executor) == {1, 2}
+        values[7] = {'_type': 'circle'}
+        with raises(ValueError):
+            deserialize_parallel(cls, values, threshold=1, chunk_size=3,
+                                 executor=executor)
+    assert deserialize_parallel(cls, values[:3]) == expected[:3]
+    with raises(TypeError):
+        deserialize_parallel(typing.Mapping[int, int], [])
+
+
+@mark.parametrize('data, expect', [
+    ('2016-08-04T01:42:43Z', datetime.datetime(2016, 8, 4, 1, 42, 43,
+                                               tzinfo=utc)),
+    ('2016-08-04T01:42:43', datetime.datetime(2016, 8, 4, 1, 42, 43,
+                                              tzinfo=utc)),
+    ('2016-08-04T10:42:43.5+09:00', datetime.datetime(2016, 8, 4, 1, 42, 43,
+                                                      500000, tzinfo=utc)),
+    ('2016-08-04T10:42:43.123456+09:00',
+     datetime.datetime(2016, 8, 4, 1, 42, 43, 123456, tzinfo=utc)),
+    ('2016-08-04T01:42:43.123Z',
+     datetime.datetime(2016, 8, 4, 1, 42, 43, 123000, tzinfo=utc)),
+    ('2016-08-03T20:12:43-05:30', datetime.datetime(2016, 8, 4, 1, 42, 43,
+                                                    tzinfo=utc)),
+    ('20160804T104243+0900', datetime.datetime(2016, 8, 4, 1, 42, 43,
+                                               tzinfo=utc)),
+    ('2016-08-04 01:42:43Z', datetime.datetime(2016, 8, 4, 1, 42, 43,
+                                               tzinfo=utc)),
+])
+def test_deserialize_datetime_forms(data, expect):
+    d = deserialize_primitive(datetime.datetime, data)
+    assert d == expect
+    assert d.tzinfo is not None
+    # The fast path for the canonical form should make the same time zones
+    # as iso8601 does.
+    parsed = parse_date(data)
+    assert d.utcoffset() == parsed.utcoffset()
+    assert isinstance(d.tzinfo, type(parsed.tzinfo))
+
+
+@mark.parametrize('data', [
+    '2016-13-04T01:42:43Z', '2016-02-30T01:42:43Z', '2016-08-04T25:42:43Z',
+    '2016-08-04T01:42:43+09:0', '2016-08-04T01:42:43Zx', '',
+])
+def test_deserialize_datetime_invalid_forms(data):
+    with raises(ValueError):
+        deserialize_primitive(datetime.datetime, data)
+
+
+def test_deserialize_date_forms():
+    assert deserialize_primitive(datetime.date, '2016-08-04') == \
+        datetime.date(2016, 8, 4)
+    assert deserialize_primitive(datetime.date, '20160804') == \
+        datetime.date(2016, 8, 4)
+    for data in ['2016-02-30', '2016-08-04x', '2016-8-4x', '']:
+        with raises(ValueError):
+            deserialize_primitive(datetime.date, data)
+
+
+@mark.parametrize('maxsize', [0, 2])
+def test_set_primitive_cache_size(maxsize, fx_location_record):
+    set_primitive_cache_size(maxsize)
+    try:
+        for _ in range(3):
+            for day in range(1, 5):
+                assert deserialize_meta(
+                    datetime.date, '2016-08-0{}'.format(day)
+                ) == datetime.date(2016, 8, day)
+        assert deserialize_meta(decimal.Decimal, '1.0') == \
+            decimal.Decimal('1.0')
+        assert str(deserialize_meta(decimal.Decimal, '1.00')) == '1.00'
+        with raises(ValueError):
+            deserialize_meta(datetime.date, 'a')
+        with raises(ValueError):
+            deserialize_meta(uuid.UUID, 'a')
+        location = deserialize_meta(fx_location_record, {
+            '_type': 'location', 'name': None, 'lat': '1.5', 'lng': '2.5',
+        })
+        assert location.lat == decimal.Decimal('1.5')
+    finally:
+        set_primitive_cache_size(0)
+
+
+def test_deserialize_record_type_lazy(fx_record_type, fx_unboxed_type,
+                                      fx_point):
+    serialized = {'_type': 'point', 'x': 3.14, 'top': 1.592}
+    lazy = deserialize_record_type(fx_record_type, serialized, lazy=True)
+    assert isinstance(lazy, fx_record_type)
+    assert lazy == fx_point
+    assert fx_point == lazy
+    assert hash(lazy) == hash(fx_point)
+    assert repr(lazy) == repr(fx_point)
+    assert serialize_meta(lazy) == serialized
+    assert pickle.loads(pickle.dumps(lazy)) == fx_point
+    # Fields are decoded when they're accessed first time.
+    broken = deserialize_record_type(
+        fx_record_type,
+        {'_type': 'point', 'x': 1.5, 'top': 'broken'},
+        lazy=True
+    )
+    assert broken.left == fx_unboxed_type(1.5)
+    assert serialize_meta(broken) == {
+        '_type': 'point', 'x': 1.5, 'top': 'broken',
+    }
+    with raises(ValueError):
+        broken.top
+    with raises(AttributeError):
+        broken.foo
+    with raises(ValueError):
+        deserialize_record_type(fx_record_type, {'_type': 'hello'}, lazy=True)
+    with raises(TypeError):
+        deserialize_record_type(fx_record_type,
+                                {'_type': 'point', 'x': 1.5}, lazy=True)
+
+
+def test_deserialize_record_type_lazy_does_not_leak(fx_record_type):
+    cls = type(fx_record_type)('Point', (fx_record_type,), {})
+    lazy = deserialize_record_type(
+        cls, {'_type': 'point', 'x': 1.5, 'top': 2.5}, lazy=True
+    )
+    assert isinstance(lazy, cls)
+    assert lazy.left.value == 1.5
+    ref = weakref.ref(cls)
+    del cls, lazy
+    gc.collect()
+    assert ref() is None
+
+
+def test_deserialize_union_type_lazy(fx_shape_type, fx_rectangle_type,
+                                     fx_point):
+    serialized = {
+        '_type': 'shape', '_tag': 'rectangle',
+        'upper_left': serialize_record_type(fx_point),
+        'lower_right': {'_type': 'point', 'x': 'broken', 'top': 0.0},
+    }
+    lazy = deserialize_union_type(fx_shape_type, serialized, lazy=True)
+    assert isinstance(lazy, fx_rectangle_type)
+    assert lazy.upper_left == fx_point
+    assert serialize_meta(lazy) == serialized
+    with raises(ValueError):
+        lazy.lower_right
+    serialized['lower_right'] = serialize_record_type(fx_point)
+    lazy = deserialize_union_type(fx_shape_type, serialized, lazy=True)
+    eager = deserialize_union_type(fx_shape_type, serialized)
+    assert lazy == eager
+    assert hash(lazy) == hash(eager)
+
+
+def test_deserialize_optional_probe(fx_record_type, fx_point):
+    optional_type = typing.Optional[
+        typing.Union[typing.Sequence[text_type], fx_record_type, int]
+    ]
+    assert deserialize_meta(optional_type, None) is None
+    assert deserialize_meta(optional_type, [u'a', u'b']) == [u'a', u'b']
+    assert deserialize_meta(optional_type,
+                            serialize_record_type(fx_point)) == fx_point
+    assert deserialize_meta(optional_type, 1) == 1
+    assert deserialize_meta(optional_type, u'1') == 1
+    with raises(ValueError) as e:
+        deserialize_meta(typing.Optional[typing.Sequence[text_type]], u'abc')
+    assert str(e.value) == "{0!r} is not deserializable as {1}.".format(
+        u'abc', typing._type_repr(typing.Optional[typing.Sequence[text_type]])
+    )
+
+
+def test_deserialize_error_message(fx_record_type, fx_shape_type):
+    with raises(ValueError) as e:
+        deserialize_meta(fx_record_type, {'_type': 'hello'})
+    assert str(e.value) == \
+        '{0} expect "_type" equal to "point", but found hello.'.format(
+            typing._type_repr(fx_record_type)
+        )
+    with raises(ValueError) as e:
+        deserialize_meta(fx_shape_type, {'_type': 'shape', '_tag': 'semo'})
+    assert str(e.value) == \
+        "{0!r} is not deserialzable tag of `{1}`.".format(
+            {'_type': 'shape', '_tag': 'semo'},
+            typing._type_repr(fx_shape_type)
+        )
+    with raises(ValueError) as e:
+        deserialize_meta(datetime.date, u'a')
+    assert str(e.value) == "'a' is not a date."
+
+
+@mark.parametrize('cls, data, expect', [
+    (typing.Sequence[int], [1, 2, 3], [1, 2, 3]),
+    (typing.Sequence[int], [1, True, 2.5, u'3'], [1, 1, 2, 3]),
+    (typing.Sequence[float], [1.5, 2.5], [1.5, 2.5]),
+    (typing.Sequence[float], [1, 2.5], [1.0, 2.5]),
+    (typing.AbstractSet[text_type], [u'a', u'b', u'a'], {u'a', u'b'}),
+    (typing.Sequence[bool], [True, False], [True, False]),
+    (typing.Sequence[int], iter([1, 2]), [1, 2]),
+])
+def test_deserialize_meta_native_iterable(cls, data, expect):
+    deserialized = deserialize_meta(cls, data)
+    assert deserialized == expect
+    assert [type(e) for e in sorted(deserialized)] == \
+        [type(e) for e in sorted(expect)]
+
+
+def test_deserialize_meta_native_map():
+    map_type = typing.Mapping[text_type, float]
+    assert deserialize_meta(map_type, [
+        {'key': u'a', 'value': 1.5},
+        {'key': u'b', 'value': 2.5},
+    ]) == {u'a': 1.5, u'b': 2.5}
+    converted = deserialize_meta(map_type, [
+        {'key': u'a', 'value': 1},
+    ])
+    assert converted == {u'a': 1.0}
+    assert isinstance(converted[u'a'], float)
+    with raises(ValueError):
+        deserialize_meta(map_type, [{'key': u'a'}])
+    with raises(ValueError):
+        deserialize_meta(map_type, [[u'a', 1.5]])
+    with raises(ValueError):
+        deserialize_meta(map_type, [{'key': 1, 'value': 1.5}])
+
+
+@mark.parametrize('budget, data', [
+    (DeserializationBudget(max_depth=2), [[[1]]]),
+    (DeserializationBudget(max_depth=2), [{'a': {'b': 1}}]),
+    (DeserializationBudget(max_elements=3), [1, 2, [3, 4]]),
+    (DeserializationBudget(max_elements=3), {'a': 1, 'b': 2, 'c': [3]}),
+    (DeserializationBudget(max_string_length=3), [u'abcd']),
+    (DeserializationBudget(max_string_length=3), [{u'abcd': 1}]),
+])
+def test_deserialization_budget(budget, data):
+    with raises(DeserializationBudgetError):
+        budget.check(data)
+    with raises(ValueError):
+        deserialize_meta(typing.Sequence[object], data, budget=budget)
+
+
+def test_deserialization_budget_ok():
+    budget = DeserializationBudget(max_depth=2, max_elements=5,
+                                   max_string_length=3, max_bytes=8)
+    data = [[1, u'abc'], {u'a': None}]
+    budget.check(data)
+    assert deserialize_meta(typing.Sequence[text_type], [u'abc'],
+                            budget) == [u'abc']
+    budget.check(u'abc')
+    budget.check_bytes(b'12345678')
+    with raises(DeserializationBudgetError):
+        budget.check_bytes(b'123456789')
+    deep = []
+    for _ in range(100000):
+        deep = [deep]
+    DeserializationBudget().check(deep)
+    with raises(DeserializationBudgetError):
+        DeserializationBudget(max_depth=64).check(deep)
+
+
+def test_precompile(fx_shape_type, fx_rectangle_type, fx_record_type,
+                    fx_unboxed_type):
+    deserialize_module._record_fields.clear()
+    deserialize_module._union_tags.clear()
+    assert precompile(fx_shape_type) >= 5
+    assert fx_shape_type in deserialize_module._union_tags
+    assert fx_rectangle_type in deserialize_module._union_tags
+    assert fx_record_type in deserialize_module._record_fields
+    assert fx_unboxed_type in deserialize_module._unboxed_inner_deserializers
+    module = sys.modules[fx_record_type.__module__]
+    assert precompile(module) > precompile(fx_shape_type)
+    assert precompile() == 0
+
+
+def test_deserialize_json(fx_point):
+    data = b'{"_type": "point", "x": 3.14, "top": 1.592}'
+    assert deserialize_json(type(fx_point), data) == fx_point
+    with raises(ValueError):
+        deserialize_json(type(fx_point), b'{')
+    with raises(DeserializationBudgetError):
+        deserialize_json(type(fx_point), data,
+                         DeserializationBudget(max_bytes=10))
+
+
+def test_text_interning(fx_location_record):
+    def location(name):
+        return {'_type': 'location', 'name': u''.join(name),
+                'lat': '1', 'lng': '2'}
+    try:
+        set_text_interning(2, max_length=3)
+        a = deserialize_meta(fx_location_record, location([u'a', u'b']))
+        b = deserialize_meta(fx_location_record, location([u'a', u'b']))
+        assert a.name == b.name and a.name is not b.name
+        intern_fields(fx_location_record, 'name')
+        a = deserialize_meta(fx_location_record, location([u'a', u'b']))
+        b = deserialize_meta(fx_location_record, location([u'a', u'b']))
+        assert a.name is b.name
+        lazy = deserialize_record_type(fx_location_record,
+                                       location([u'a', u'b']), lazy=True)
+        assert lazy.name is a.name
+        c = deserialize_meta(fx_location_record, location([u'abc', u'd']))
+        d = deserialize_meta(fx_location_record, location([u'abc', u'd']))
+        assert c.name is not d.name  # too long
+        deserialize_meta(fx_location_record, location([u'c', u'd']))
+        e = deserialize_meta(fx_location_record, location([u'e', u'f']))
+        f = deserialize_meta(fx_location_record, location([u'e', u'f']))
+        assert e.name is not f.name  # the table is full
+        assert deserialize_primitive(text_type, u''.join([u'a', u'b'])) \
+            is not a.name
+        set_text_interning(10, all_fields=True)
+        x = deserialize_primitive(text_type, u''.join([u'x', u'y']))
+        assert deserialize_primitive(text_type, u''.join([u'x', u'y'])) is x
+    finally:
+        set_text_interning(0)
+        deserialize_module._interned_fields.clear()
+    x = deserialize_primitive(text_type, u''.join([u'x', u'y']))
+    assert deserialize_primitive(text_type, u''.join([u'x', u'y'])) is not x
+
+
+def test_deserialize_enum_members():
+    class Color(enum.Enum):
+        red = 'red'
+        crimson = 'red'
+        blue = 'blue'
+    assert deserialize_meta(Color, 'red') is Color.red
+    assert deserialize_meta(Color, 'blue') is Color.blue
+    with raises(ValueError):
+        deserialize_meta(Color, 'green')
+    with raises(ValueError):
+        deserialize_meta(Color, ['red'])
+
+
+def test_deserialize_map_owns_dict():
+    data = [{'key': u'a', 'value': 1.5}, {'key': u'b', 'value': 2.5}]
+    for map_type in (typing.Mapping[text_type, float],
+                     typing.Mapping[text_type, decimal.Decimal]):
+        deserialized = deserialize_meta(map_type, data)
+        assert type(deserialized.value) is dict
+        assert sorted(deserialized) == [u'a', u'b']
+
+
+def test_deserialize_meta_fields(fx_shape_type, fx_rectangle_type,
+                                 fx_record_type, fx_unboxed_type):
+    data = {
+        '_type': 'shape', '_tag': 'rectangle',
+        'upper_left': {'_type': 'point', 'x': 1.0, 'top': 2.0},
+        'lower_right': {'_type': 'point', 'x': 3.0, 'top': 4.0},
+    }
+    eager = deserialize_meta(fx_shape_type, data)
+    assert all(is_field_loaded(eager, name)
+               for name in ('upper_left', 'lower_right'))
+    shape = deserialize_meta(fx_shape_type, data,
+                             fields={'upper_left': {'left'}, 'radius': None})
+    assert isinstance(shape, fx_rectangle_type)
+    assert is_field_loaded(shape, 'upper_left')
+    assert not is_field_loaded(shape, 'lower_right')
+    point = shape.upper_left
+    assert isinstance(point, fx_record_type)
+    assert is_field_loaded(point, 'left')
+    assert not is_field_loaded(point, 'top')
+    assert point.left == fx_unboxed_type(1.0)
+    assert serialize_meta(shape) == data
+    assert shape == eager
+    assert is_field_loaded(shape, 'lower_right')
+    shape = deserialize_meta(fx_shape_type, data, fields=['lower_right'])
+    assert not is_field_loaded(shape, 'upper_left')
+    assert is_field_loaded(shape, 'lower_right')
+    assert all(is_field_loaded(shape.lower_right, name)
+               for name in ('left', 'top'))
+    points = deserialize_meta(
+        typing.Sequence[typing.Optional[fx_record_type]],
+        [data['upper_left'], None],
+        fields={'top'}
+    )
+    assert points[1] is None
+    assert not is_field_loaded(points[0], 'left')
+    assert points[0] == eager.upper_left
+    with raises(ValueError):
+        deserialize_meta(fx_record_type, {'_type': 'circle', 'x': 1.0},
+                         fields={'left'})
+    with raises(TypeError):
+        deserialize_meta(fx_record_type, data['upper_left'], fields='left')
+
+
+def test_deserialize_any(fx_point, fx_rectangle, fx_circle_type):
+    precompile(fx_circle_type.__base__, type(fx_point))
+    assert deserialize_any(serialize_meta(fx_point)) == fx_point
+    assert deserialize_any(serialize_meta(fx_rectangle)) == fx_rectangle
+    lazy = deserialize_any(serialize_meta(fx_rectangle), lazy=True)
+    assert not is_field_loaded(lazy, 'upper_left')
+    assert lazy == fx_rectangle
+    with raises(ValueError):
+        deserialize_any({'_type': 'no-such-type'})
+    with raises(ValueError):
+        deserialize_any({'_type': 'shape', '_tag': 'no-such-tag'})
+    with raises(ValueError):
+        deserialize_any([])
@@ -0,0 +1,55 @@
+import json
+
+from pytest import fixture, importorskip, mark, raises
+
+from nirum.jsonlib import (BACKEND_NAMES, dumps_bytes, get_backend,
+                           load_backend, loads_bytes, set_backend)
+
+
+@fixture
+def fx_backend():
+    backend = get_backend()
+    yield
+    set_backend(backend)
+
+
+def test_default_backend():
+    assert get_backend() == 'json'
+    assert loads_bytes(b'{"a": [1, 2.5, "\\uac00"]}') == \
+        {u'a': [1, 2.5, u'\uac00']}
+    assert loads_bytes(u'[true]') == [True]
+    assert dumps_bytes({u'a': [1, None]}) == b'{"a": [1, null]}'
+    with raises(ValueError):
+        loads_bytes(b'{')
+    with raises(ValueError):
+        loads_bytes(b'"\xff"')
+
+
+@mark.parametrize('name', BACKEND_NAMES)
+def test_backend(fx_backend, name):
+    importorskip(name)
+    assert set_backend(name) == name
+    assert get_backend() == name
+    value = {u'a': [1, 2.5, u'\uac00', None, True]}
+    encoded = dumps_bytes(value)
+    assert isinstance(encoded, bytes)
+    assert loads_bytes(encoded) == value
+    with raises(ValueError):
+        loads_bytes(b'{')
+    # Values some backends cannot encode fall back to the standard json.
+    for value in [2 ** 64, -2 ** 70, {1: u'a'}, [{None: 1.5}]]:
+        assert json.loads(dumps_bytes(value).decode('utf-8')) == \
+            json.loads(json.dumps(value))
+    with raises(TypeError):
+        dumps_bytes(object())
+
+
+def test_auto_backend(fx_backend):
+    assert set_backend('auto') in BACKEND_NAMES
+    assert load_backend('auto')[0] == get_backend()
+
+
+def test_unknown_backend(fx_backend):
+    with raises(ValueError):
+        set_backend('yaml')
+    assert get_backend() == 'json'
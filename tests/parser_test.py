@@ -0,0 +1,109 @@
+import decimal
+import typing
+
+from fixture import Location, Offset, Point, Rectangle, Shape
+from pytest import mark, raises
+from six import text_type
+
+from nirum import deserialize as deserialize_module
+from nirum.datastructures import Map
+from nirum.deserialize import (deserialize_json, intern_fields,
+                               set_primitive_cache_size, set_text_interning)
+from nirum.parser import get_parser, parse_json
+from nirum.serialize import serialize_json
+
+
+point = Point(left=Offset(1.5), top=Offset(-2.0))
+rectangle = Rectangle(upper_left=point, lower_right=point)
+location = Location(name=None, lat=decimal.Decimal('37.5'),
+                    lng=decimal.Decimal('127.0'))
+
+
+@mark.parametrize('cls, value', [
+    (Point, point),
+    (Shape, rectangle),
+    (Rectangle, rectangle),
+    (Location, location),
+    (Offset, Offset(3.14)),
+    (typing.Sequence[Shape], [rectangle, rectangle]),
+    (typing.AbstractSet[int], {1, 2, 3}),
+    (typing.Mapping[text_type, Point], Map({u'a': point, u'b': point})),
+    (typing.Optional[Point], None),
+    (typing.Optional[Point], point),
+    (typing.Tuple[int, text_type], (1, u'a')),
+])
+def test_parse_json(cls, value):
+    document = serialize_json(value)
+    parsed = parse_json(cls, document)
+    assert parsed == value
+    assert parsed == deserialize_json(cls, document)
+    assert parse_json(cls, b' \n' + document + b'\n ') == value
+    assert parse_json(cls, document.decode('utf-8')) == value
+
+
+def test_parse_json_field_order():
+    document = b'''{
+        "upper_left": {"top": -2.0, "x": 1.5, "_type": "point"},
+        "_tag": "rectangle",
+        "lower_right": {"_type": "point", "x": 1.5, "top": -2.0},
+        "_type": "shape"
+    }'''
+    assert parse_json(Shape, document) == rectangle
+
+
+@mark.parametrize('cls, document', [
+    (Point, b'{"_type": "circle", "x": 1.0, "top": 2.0}'),
+    (Point, b'{"x": 1.0, "top": 2.0}'),
+    (Point, b'{"_type": "point", "x": 1.0 "top": 2.0}'),
+    (Point, b'{"_type": "point", "x": 1.0, "top": 2.0} x'),
+    (Point, b'[]'),
+    (Point, b''),
+    (Shape, b'{"_type": "shape", "_tag": "triangle"}'),
+    (Shape, b'{"_type": "shape"}'),
+    (Rectangle, b'{"_type": "shape", "_tag": "circle", "radius": 1.0}'),
+    (typing.Mapping[text_type, int], b'[{"key": "a"}]'),
+    (typing.Sequence[int], b'[1, 2'),
+    (typing.Sequence[int], b'[1, "a"]'),
+])
+def test_parse_json_error(cls, document):
+    with raises(ValueError):
+        parse_json(cls, document)
+
+
+@mark.parametrize('cls, document', [
+    (Point, b'{"_type": "point", "x": 1.0, "top": 2.0, "z": 0}'),
+    (Point, b'{"_type": "point", "x": 1.0}'),
+    (Rectangle, b'{"_type": "shape", "_tag": "rectangle", "z": 0}'),
+    (Shape, b'{"z": 0, "_type": "shape", "_tag": "rectangle"}'),
+    (Shape, b'{"_type": "shape", "_tag": "rectangle"}'),
+])
+def test_parse_json_field_errors(cls, document):
+    # Unknown fields and missing fields raise the same errors as
+    # deserialize_json() does.
+    with raises(Exception) as expected:
+        deserialize_json(cls, document)
+    with raises(expected.type):
+        parse_json(cls, document)
+
+
+def test_parse_json_text_interning():
+    document = b'{"_type": "location", "name": "ab", "lat": 1, "lng": 2}'
+    try:
+        set_text_interning(2)
+        intern_fields(Location, 'name')
+        assert parse_json(Location, document).name is \
+            parse_json(Location, document).name
+    finally:
+        set_text_interning(0)
+        deserialize_module._interned_fields.clear()
+    assert parse_json(Location, document).name is not \
+        parse_json(Location, document).name
+
+
+def test_parse_json_primitive_cache():
+    parser = get_parser(typing.Sequence[Point])
+    set_primitive_cache_size(16)
+    try:
+        assert get_parser(typing.Sequence[Point]) is not parser
+    finally:
+        set_primitive_cache_size(0)
@@ -0,0 +1,63 @@
+import collections
+import importlib
+import weakref
+
+from fixture import Circle, Point, Rectangle, Shape
+from pytest import fixture, raises
+
+from nirum import registry
+from nirum.registry import (lookup_type, register_lazy_module,
+                            register_module, register_type)
+
+
+@fixture
+def fx_registry(monkeypatch):
+    monkeypatch.setattr(registry, '_types', weakref.WeakValueDictionary())
+    monkeypatch.setattr(registry, '_lazy_modules', collections.deque())
+
+
+def test_register_type(fx_registry):
+    assert lookup_type('point') is None
+    assert register_type(Point)
+    assert lookup_type('point') is Point
+    assert lookup_type('point', 'point') is None
+    assert register_type(Shape)
+    assert lookup_type('shape', 'rectangle') is Rectangle
+    assert lookup_type('shape', 'circle') is Circle
+    assert lookup_type('shape') is None
+    assert not register_type(int)
+    assert lookup_type('shape', ['circle']) is None
+
+
+def test_register_module(fx_registry):
+    assert register_module(Point.__module__) > 3
+    assert lookup_type('point') is Point
+    assert lookup_type('shape', 'circle') is Circle
+
+
+def test_register_lazy_module(fx_registry):
+    register_lazy_module(Point.__module__)
+    assert registry._lazy_modules
+    assert lookup_type('point') is Point
+    assert not registry._lazy_modules
+    assert lookup_type('shape', 'rectangle') is Rectangle
+    assert lookup_type('no-such-type') is None
+
+
+def test_register_lazy_module_import_error(fx_registry, monkeypatch):
+    import_module = importlib.import_module
+    failures = []
+
+    def flaky_import_module(name):
+        if not failures:
+            failures.append(name)
+            raise ImportError(name)
+        return import_module(name)
+    monkeypatch.setattr(importlib, 'import_module', flaky_import_module)
+    register_lazy_module(Point.__module__)
+    with raises(ImportError):
+        lookup_type('point')
+    # The module is not dropped, but tried again.
+    assert list(registry._lazy_modules) == [Point.__module__]
+    assert lookup_type('point') is Point
+    assert not registry._lazy_modules
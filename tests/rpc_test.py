@@ -1,12 +1,17 @@
+import io
 import json
+import typing
 
 from fixture import BadRequest, MusicService, Unknown
 from pytest import fixture, mark, raises
 from six import text_type
-from werkzeug.test import Client as WTestClient
+from werkzeug.test import Client as WTestClient, EnvironBuilder
 from werkzeug.wrappers import Response
 
-from nirum.deserialize import deserialize_meta
+from nirum.cbor import (CONTENT_TYPE as CBOR_CONTENT_TYPE, loads as loads_cbor,
+                        serialize_cbor)
+from nirum.deserialize import DeserializationBudget, deserialize_meta
+from nirum.exc import UnexpectedNirumResponseError
 from nirum.rpc import Client, WsgiApp
 from nirum.serialize import serialize_meta
 from nirum.test import MockOpener
@@ -188,6 +193,142 @@ def test_wsgi_app_method(fx_test_client, payload, expected_json):
     assert data == expected_json
 
 
+def test_wsgi_app_budget():
+    app = WsgiApp(MusicServiceImpl(), budget=DeserializationBudget(
+        max_depth=2, max_string_length=20, max_bytes=100,
+    ))
+    client = WTestClient(app, Response)
+    url = '/?method=get_music_by_artist_name'
+    response = client.post(url, data=json.dumps({'artist_name': u'x' * 21}))
+    assert response.status_code == 400
+    assert '20 characters' in response.get_data(as_text=True)
+    response = client.post(url, data=json.dumps({'artist_name': [[1]]}))
+    assert response.status_code == 400
+    assert '2 levels' in response.get_data(as_text=True)
+    response = client.post(url, data=' ' * 101)
+    assert response.status_code == 413
+    response = client.post(url, data='[' * 100000)
+    assert response.status_code == 413
+    assert WsgiApp(MusicServiceImpl()).budget is WsgiApp.default_budget
+    response = WTestClient(WsgiApp(MusicServiceImpl()), Response).post(
+        url, data='[' * 100000 + ']' * 100000
+    )
+    assert response.status_code == 400
+
+
+@mark.parametrize('content_length', [None, 1024 * 1024])
+def test_wsgi_app_budget_reads_at_most_max_bytes(content_length):
+    app = WsgiApp(MusicServiceImpl(),
+                  budget=DeserializationBudget(max_bytes=100))
+    body = io.BytesIO(b' ' * (1024 * 1024))
+    environ = EnvironBuilder(
+        path='/', method='POST',
+        query_string='method=get_music_by_artist_name',
+        input_stream=body,
+    ).get_environ()
+    if content_length is None:
+        del environ['CONTENT_LENGTH']
+        environ['wsgi.input_terminated'] = True
+    else:
+        environ['CONTENT_LENGTH'] = str(content_length)
+    response = Response.from_app(app, environ)
+    assert response.status_code == 413
+    assert body.tell() == (0 if content_length else 101)
+
+
+def test_wsgi_app_streaming():
+    app = WsgiApp(MusicServiceImpl(), streaming=True)
+    client = WTestClient(app, Response)
+    response = client.post(
+        '/?method=get_music_by_artist_name',
+        data=json.dumps({'artist_name': u'damien rice'})
+    )
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/json'
+    assert json.loads(response.get_data(as_text=True)) == \
+        [u'9 crimes', u'Elephant']
+    response = client.post('/?method=incorrect_return')
+    assert response.status_code == 400
+    response = client.post(
+        '/?method=get_music_by_artist_name',
+        data=json.dumps({'artist_name': u'error'})
+    )
+    assert response.status_code == 400
+
+
+def test_wsgi_app_cbor(fx_test_client):
+    url = '/?method=get_music_by_artist_name'
+    payload = serialize_cbor({'artist_name': u'damien rice'})
+    response = fx_test_client.post(
+        url, data=payload, content_type='application/cbor',
+        headers={'Accept': 'application/cbor'}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'application/cbor'
+    assert loads_cbor(response.get_data()) == [u'9 crimes', u'Elephant']
+    # Falls back to JSON unless the client prefers CBOR.
+    for accept in [None, '*/*', 'application/json, application/cbor;q=0.5']:
+        response = fx_test_client.post(
+            url, data=payload, content_type='application/cbor',
+            headers={'Accept': accept} if accept else {}
+        )
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+    response = fx_test_client.post(
+        url, data=serialize_cbor({'artist_name': u'error'}),
+        content_type='application/cbor',
+        headers={'Accept': 'application/cbor'}
+    )
+    assert response.status_code == 400
+    assert response.mimetype == 'application/cbor'
+    assert loads_cbor(response.get_data()) == \
+        {'_type': 'hello_error', '_tag': 'unknown'}
+    response = fx_test_client.post(url, data=b'\x9f',
+                                   content_type='application/cbor')
+    assert response.status_code == 400
+    assert 'Invalid CBOR' in response.get_data(as_text=True)
+
+
+def test_wsgi_app_compact(fx_test_client):
+    url = '/?method=get_music_by_artist_name'
+    payload = json.dumps({'artist_name': u'damien rice'})
+    response = fx_test_client.post(
+        url, data=payload, content_type='application/vnd.nirum.compact+json',
+        headers={'Accept': 'application/vnd.nirum.compact+json'}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'application/vnd.nirum.compact+json'
+    assert json.loads(response.get_data(as_text=True)) == \
+        [u'9 crimes', u'Elephant']
+    # Old clients keep receiving the regular JSON.
+    response = fx_test_client.post(url, data=payload)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    response = fx_test_client.post(
+        url, data=json.dumps({'artist_name': u'error'}),
+        headers={'Accept': 'application/vnd.nirum.compact+json'}
+    )
+    assert response.status_code == 400
+    assert json.loads(response.get_data(as_text=True)) == \
+        {'_type': 'hello_error', '_tag': 'unknown'}
+    response = fx_test_client.post(
+        url, data=json.dumps({'artist_name': [u'damien rice']}),
+        content_type='application/vnd.nirum.compact+json'
+    )
+    assert response.status_code == 400
+
+
+def test_wsgi_app_method_types(fx_music_wsgi, fx_test_client):
+    fx_test_client.post('/?method=get_music_by_artist_name',
+                        data=json.dumps({'artist_name': u'damien rice'}))
+    arguments, return_type = \
+        fx_music_wsgi._method_types['get_music_by_artist_name']
+    assert arguments == [('artist_name', 'artist_name', text_type)]
+    assert return_type == typing.Sequence[text_type]
+    assert fx_music_wsgi._get_method_types('get_music_by_artist_name') == \
+        (arguments, return_type)
+
+
 def test_wsgi_app_http_error(fx_test_client):
     response = fx_test_client.post('/foobar')
     assert response.status_code == 404
@@ -378,6 +519,46 @@ def test_rpc_client_make_request(method_name):
         )
 
 
+def test_client_binary():
+    url = u'http://foobar.com/rpc/'
+    client = Client(url, MockOpener(url, MusicServiceImpl), binary=True)
+    _, _, headers, content = client.make_request(
+        u'POST', url, [], {'artist_name': u'damien rice'}
+    )
+    assert loads_cbor(content) == {'artist_name': u'damien rice'}
+    assert client.remote_call_data(
+        'get_music_by_artist_name', {'artist_name': u'damien rice'}
+    ) == [u'9 crimes', u'Elephant']
+    assert json.loads(client.remote_call(
+        'get_music_by_artist_name', {'artist_name': u'damien rice'}
+    )) == [u'9 crimes', u'Elephant']
+    client = MusicService_DeprecatedClient(
+        url, MockOpener(url, MusicServiceImpl), binary=True
+    )
+    assert client.get_artist_by_music(u'9 crimes') == u'damien rice'
+    json_client = Client(url, MockOpener(url, MusicServiceImpl))
+    assert json_client.remote_call_data(
+        'get_music_by_artist_name', {'artist_name': u'damien rice'}
+    ) == [u'9 crimes', u'Elephant']
+
+
+@mark.parametrize('content', [
+    b'\x42\xff\xfe',  # a byte string (which is not even UTF-8 on Python 2)
+    b'\xd8\x20\x42\xff\xfe',  # a byte string of an unknown tag
+    b'\xff',  # invalid CBOR
+])
+def test_client_binary_unexpected_response(content):
+    class BinaryResponseClient(Client):
+        def _call(self, method_name, payload):
+            return CBOR_CONTENT_TYPE, content
+
+    url = u'http://foobar.com/rpc/'
+    client = BinaryResponseClient(url, MockOpener(url, MusicServiceImpl),
+                                  binary=True)
+    with raises(UnexpectedNirumResponseError):
+        client.remote_call('get_music_by_artist_name', {})
+
+
 def test_client_ping():
     url = u'http://foobar.com/rpc/'
     client = Client(url, MockOpener(url, MusicServiceImpl))
@@ -1,14 +1,23 @@
 import datetime
 import decimal
+import gc
+import json
+import typing
 import uuid
+import weakref
 
 from fixture import ComplexKeyMap, Offset, Point
 from pytest import mark
+from six import PY3, text_type
 
 from nirum._compat import utc
-from nirum.datastructures import List
-from nirum.serialize import (serialize_meta, serialize_record_type,
-                             serialize_unboxed_type, serialize_union_type)
+from nirum.datastructures import List, Map
+from nirum.serialize import (fragment_cache_info, get_serializer,
+                             iter_serialize, serialize_json, serialize_meta,
+                             serialize_record_type, serialize_to_stream,
+                             serialize_unboxed_type, serialize_union_type,
+                             set_fragment_cache_size,
+                             set_primitive_cache_size)
 
 
 def test_serialize_unboxed_type(fx_offset, fx_token_type):
@@ -136,3 +145,222 @@ def test_serialize_meta_map(fx_point):
             },
         ],
     })
+
+
+@mark.parametrize('maxsize', [0, 2])
+def test_set_primitive_cache_size(maxsize):
+    set_primitive_cache_size(maxsize)
+    try:
+        kst = datetime.timezone(datetime.timedelta(hours=9)) if PY3 else None
+        for _ in range(3):
+            d = datetime.datetime(2016, 8, 5, 3, 46, 37, tzinfo=utc)
+            assert serialize_meta(d) == '2016-08-05T03:46:37+00:00'
+            if kst is not None:
+                assert serialize_meta(d.astimezone(kst)) == \
+                    '2016-08-05T12:46:37+09:00'
+            assert serialize_meta(datetime.date(2016, 8, 5)) == '2016-08-05'
+            if kst is not None:
+                # Datetimes declared as dates don't share cached dates.
+                assert serialize_meta(d, datetime.date) == \
+                    '2016-08-05T03:46:37+00:00'
+                assert serialize_meta(d.astimezone(kst), datetime.date) == \
+                    '2016-08-05T12:46:37+09:00'
+            u = uuid.UUID('7471A1F2-442E-4991-B6E8-77C6BD286785')
+            assert serialize_meta(u) == '7471a1f2-442e-4991-b6e8-77c6bd286785'
+        assert serialize_meta(decimal.Decimal('1.0')) == '1.0'
+        assert serialize_meta(decimal.Decimal('1.00')) == '1.00'
+    finally:
+        set_primitive_cache_size(0)
+
+
+def test_serialize_meta_native_collections(fx_point):
+    data = [1, 2.5, u'a', True, None]
+    serialized = serialize_meta(data)
+    assert serialized == data
+    assert serialized is not data
+    assert serialize_meta(List(data)) == data
+    assert serialize_meta([fx_point, 1]) == [
+        {'_type': 'point', 'x': 3.14, 'top': 1.592}, 1,
+    ]
+    assert serialize_meta(Map({u'a': 1.5})) == [{'key': u'a', 'value': 1.5}]
+
+
+def test_serialize_json(fx_point):
+    assert json.loads(serialize_json(fx_point).decode('utf-8')) == \
+        {'_type': 'point', 'x': 3.14, 'top': 1.592}
+    assert serialize_json([1, u'a']) == b'[1, "a"]'
+
+
+def test_get_serializer(fx_point, fx_circle_type, fx_offset):
+    serialize = get_serializer(type(fx_point))
+    assert get_serializer(type(fx_point)) is serialize
+    assert serialize(fx_point) == {'_type': 'point', 'x': 3.14, 'top': 1.592}
+    circle = fx_circle_type(origin=fx_point, radius=fx_offset)
+    assert get_serializer(type(circle))(circle) == {
+        '_type': 'shape', '_tag': 'circle',
+        'origin': {'_type': 'point', 'x': 3.14, 'top': 1.592},
+        'radius': 1.2,
+    }
+    assert get_serializer(int)(1) == 1
+    assert get_serializer(decimal.Decimal)(decimal.Decimal('1.5')) == '1.5'
+
+
+def test_serialize_meta_subclasses():
+    class Tags(tuple):
+        pass
+
+    class Text(type(u'')):
+        pass
+
+    assert serialize_meta(Tags([datetime.date(2016, 8, 5)])) == ['2016-08-05']
+    assert serialize_meta(Text(u'a')) == u'a'
+    assert serialize_meta(object) is object
+
+
+@mark.parametrize('chunk_size', [1, 16, 65536])
+def test_iter_serialize(fx_point, fx_circle_type, fx_offset, chunk_size):
+    circle = fx_circle_type(origin=fx_point, radius=fx_offset)
+    values = [
+        fx_point, circle, [circle, fx_point], [], Map(), List([1, 2]),
+        ComplexKeyMap(value={fx_point: fx_point}),
+        [1, 2.5, float('inf'), u'\xe9"\n', None, True, False],
+        [decimal.Decimal('3.14'), datetime.date(2016, 8, 5),
+         uuid.UUID('7471A1F2-442E-4991-B6E8-77C6BD286785')],
+    ]
+    for value in values:
+        chunks = list(iter_serialize(value, chunk_size))
+        assert all(isinstance(chunk, bytes) for chunk in chunks)
+        # Keys of objects can be in any order.
+        assert json.loads(b''.join(chunks).decode('utf-8')) == \
+            json.loads(json.dumps(serialize_meta(value)))
+    assert len(list(iter_serialize(list(range(100)), 16))) > 1
+
+
+def test_serialize_to_stream(fx_point):
+    chunks = []
+    serialize_to_stream([fx_point] * 10, chunks.append, chunk_size=64)
+    assert len(chunks) > 1
+    assert json.loads(b''.join(chunks).decode('utf-8')) == \
+        [serialize_meta(fx_point)] * 10
+
+
+def parse_json_bytes(data):
+    return json.loads(data.decode('utf-8'))
+
+
+def test_fragment_cache(fx_point, fx_circle_type, fx_offset):
+    assert fragment_cache_info() == (0, 0, 0, None, 0, 0)
+    circle = fx_circle_type(origin=fx_point, radius=fx_offset)
+    # Fragments are cached as the runtime itself encodes them.
+    circle_encoded = b''.join(iter_serialize(circle))
+    point_size = len(b''.join(iter_serialize(fx_point)))
+    set_fragment_cache_size(2)
+    try:
+        assert parse_json_bytes(serialize_json([circle, circle])) == \
+            [serialize_meta(circle)] * 2
+        # The second circle hits; its point is never looked up again.
+        info = fragment_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+        assert info.currbytes == len(circle_encoded) + point_size
+        assert b''.join(iter_serialize(circle)) == circle_encoded
+        assert fragment_cache_info().hits == 2
+        # Equal but distinct values are cached separately.
+        other = Point(left=Offset(3.14), top=Offset(1.592))
+        assert other == fx_point
+        serialize_json(other)
+        info = fragment_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (2, 3, 2)
+        assert serialize_json(Map({u'a': 1})) == b'[{"key": "a", "value": 1}]'
+        assert serialize_json([1, u'a']) == b'[1, "a"]'
+    finally:
+        set_fragment_cache_size(0)
+    assert fragment_cache_info() == (0, 0, 0, None, 0, 0)
+
+
+def test_fragment_cache_max_bytes():
+    set_fragment_cache_size(100, max_bytes=60)
+    try:
+        points = [Point(left=Offset(i * 1.5), top=Offset(2.5))
+                  for i in range(3)]
+        for point in points + [points]:
+            serialize_json(point)
+        info = fragment_cache_info()
+        assert info.currbytes <= 60
+        point_size = len(json.dumps(serialize_meta(points[0])))
+        assert info.currsize == 60 // point_size
+    finally:
+        set_fragment_cache_size(0)
+
+
+class UnhashableHint(object):
+
+    __hash__ = None
+
+
+def test_fragment_cache_type_hint(fx_point, fx_circle_type, fx_offset):
+    circle = fx_circle_type(origin=fx_point, radius=fx_offset)
+    shape_type = type(circle).__bases__[0]
+    cases = [
+        ([circle, circle], typing.Sequence[shape_type]),
+        ([fx_offset, None], typing.Sequence[typing.Optional[Offset]]),
+        (None, typing.Optional[Point]),
+        ([[1, 2]], typing.Sequence[typing.Sequence[int]]),
+        (Map({u'a': fx_point}), typing.Mapping[text_type, Point]),
+        ([fx_point, 1], typing.Sequence[object]),
+        # Unhashable type hints are compiled every time without being cached.
+        ([fx_point], UnhashableHint()),
+    ]
+    set_fragment_cache_size(8)
+    try:
+        for data, type_hint in cases:
+            # The type hint is respected through the fragment cache too.
+            assert parse_json_bytes(serialize_json(data, type_hint)) == \
+                serialize_meta(data, type_hint)
+        assert fragment_cache_info().hits > 0
+    finally:
+        set_fragment_cache_size(0)
+
+
+def test_serializer_caches_do_not_leak(fx_point):
+    cls = type(Point)('Point', (Point,), {})
+    point = cls(left=fx_point.left, top=fx_point.top)
+    expected = serialize_meta(fx_point)
+    assert serialize_meta(point) == expected
+    assert serialize_meta(point, cls) == expected
+    assert parse_json_bytes(b''.join(iter_serialize(point))) == expected
+    assert parse_json_bytes(serialize_json(point, cls)) == expected
+    ref = weakref.ref(cls)
+    del cls, point
+    gc.collect()
+    assert ref() is None
+
+
+def test_serialize_meta_type_hint(fx_point, fx_circle_type, fx_offset):
+    circle = fx_circle_type(origin=fx_point, radius=fx_offset)
+    serialized_point = {'_type': 'point', 'x': 3.14, 'top': 1.592}
+    cases = [
+        (fx_point, Point, serialized_point),
+        (circle, type(circle).__bases__[0], serialize_meta(circle)),
+        (fx_offset, Offset, 1.2),
+        ([1, 2], typing.Sequence[int], [1, 2]),
+        ({u'a'}, typing.AbstractSet[text_type], [u'a']),
+        ([fx_point], typing.Sequence[Point], [serialized_point]),
+        ([fx_offset, None], typing.Sequence[typing.Optional[Offset]],
+         [1.2, None]),
+        (Map({u'a': u'b'}), typing.Mapping[text_type, text_type],
+         [{'key': u'a', 'value': u'b'}]),
+        (Map({u'a': fx_point}), typing.Mapping[text_type, Point],
+         [{'key': u'a', 'value': serialized_point}]),
+        ([datetime.date(2016, 8, 5)], typing.Sequence[datetime.date],
+         ['2016-08-05']),
+        (decimal.Decimal('3.14'), decimal.Decimal, '3.14'),
+        ([fx_point, 1], typing.Sequence[object], [serialized_point, 1]),
+        (fx_point, typing.Optional[object], serialized_point),
+    ]
+    for data, type_hint, expected in cases:
+        assert serialize_meta(data, type_hint) == expected
+        assert serialize_meta(data, type_hint) == serialize_meta(data)
+    # Elements of JSON-native types are passed through without inspection.
+    elements = [object()]
+    assert serialize_meta(elements, typing.Sequence[int]) == elements
+    assert serialize_json([1], typing.Sequence[int]) == b'[1]'
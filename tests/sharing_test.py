@@ -0,0 +1,92 @@
+import decimal
+import json
+import typing
+
+from fixture import (Circle, ComplexKeyMap, Location, Offset, Point,
+                     Rectangle, Shape)
+from pytest import mark, raises
+
+from nirum.serialize import serialize_meta
+from nirum.sharing import deserialize_shared, serialize_shared
+
+
+def test_serialize_shared():
+    point = Point(left=Offset(1.5), top=Offset(3.0))
+    circle = Circle(origin=point, radius=Offset(1.0))
+    shapes = [
+        Rectangle(upper_left=point,
+                  lower_right=Point(left=Offset(1.5), top=Offset(3.0))),
+        circle,
+        circle,
+        Circle(origin=Point(left=Offset(0.0), top=Offset(0.0)),
+               radius=Offset(2.0)),
+    ]
+    encoded = serialize_shared(shapes, typing.Sequence[Shape])
+    assert encoded == {
+        '_refs': [
+            serialize_meta(point),
+            dict(serialize_meta(circle), origin={'_ref': 0}),
+        ],
+        '_value': [
+            dict(serialize_meta(shapes[0]),
+                 upper_left={'_ref': 0}, lower_right={'_ref': 0}),
+            {'_ref': 1},
+            {'_ref': 1},
+            serialize_meta(shapes[3]),
+        ],
+    }
+    decoded = deserialize_shared(typing.Sequence[Shape],
+                                 json.loads(json.dumps(encoded)))
+    assert decoded == shapes
+    assert decoded[0].upper_left is decoded[0].lower_right
+    assert decoded[0].upper_left is decoded[1].origin
+    assert decoded[1] is decoded[2]
+
+
+@mark.parametrize('value, type_hint', [
+    (Location(name=None, lat=decimal.Decimal('37.5665'),
+              lng=decimal.Decimal('126.9780')), Location),
+    (ComplexKeyMap(value={Point(left=Offset(1.5), top=Offset(3.0)):
+                          Point(left=Offset(1.5), top=Offset(3.0))}),
+     ComplexKeyMap),
+    ([Offset(1.5), None], typing.Sequence[typing.Optional[Offset]]),
+])
+def test_serialize_shared_round_trip(value, type_hint):
+    encoded = serialize_shared(value, type_hint)
+    assert deserialize_shared(type_hint, encoded) == value
+
+
+def test_serialize_shared_undeclared_types():
+    point = Point(left=Offset(1.5), top=Offset(3.0))
+    encoded = serialize_shared([point, point], typing.Sequence[object])
+    assert encoded == {'_refs': [], '_value': [serialize_meta(point)] * 2}
+
+
+@mark.parametrize('data', [
+    [{'_type': 'point', 'x': 1.5, 'top': 3.0}],
+    {'_value': {'_type': 'point', 'x': 1.5, 'top': 3.0}},
+    {'_refs': [], '_value': {'_ref': 0}},
+    {'_refs': [{'_ref': 0}], '_value': {'_ref': 0}},
+    {'_refs': [{'_type': 'point', 'x': 1.5, 'top': 3.0}],
+     '_value': {'_ref': '0'}},
+    {'_refs': [{'_type': 'point', 'x': 1.5, 'top': 3.0}],
+     '_value': {'_ref': 0, '_type': 'point'}},
+    {'_refs': [], '_value': {'_type': 'point', 'x': 1.5}},
+    {'_refs': [], '_value': {'_type': 'point', 'x': 1.5, 'y': 3.0}},
+])
+def test_deserialize_shared_invalid(data):
+    with raises(ValueError):
+        deserialize_shared(Point, data)
+
+
+def test_deserialize_shared_type_mismatch():
+    point = {'_type': 'point', 'x': 1.5, 'top': 3.0}
+    data = {
+        '_refs': [point],
+        '_value': {'_type': 'shape', '_tag': 'rectangle',
+                   'upper_left': {'_ref': 0}, 'lower_right': {'_ref': 0}},
+    }
+    assert deserialize_shared(Shape, data).upper_left.left == Offset(1.5)
+    data['_value'] = [data['_value'], {'_ref': 0}]
+    with raises(ValueError):
+        deserialize_shared(typing.Sequence[Shape], data)
@@ -5,8 +5,9 @@ from pytest import raises
 from six import text_type
 
 from nirum.datastructures import List
-from nirum.validate import (validate_record_type, validate_type,
-                            validate_unboxed_type, validate_union_type)
+from nirum.validate import (construct_trusted, validate_record_type,
+                            validate_type, validate_unboxed_type,
+                            validate_union_type)
 
 
 def test_validate_unboxed_type():
@@ -28,6 +29,49 @@ def test_validate_record_type(fx_point, fx_record_type, fx_offset,
     )
 
 
+def test_construct_trusted(fx_record_type, fx_rectangle_type, fx_point):
+    # Wrong field values pass because they are trusted.
+    record = construct_trusted(fx_record_type, {'left': 1, 'top': 2})
+    assert record.left == 1
+    union = construct_trusted(fx_rectangle_type,
+                              {'upper_left': 1, 'lower_right': fx_point})
+    assert union.upper_left == 1
+    with raises(TypeError):
+        construct_trusted(fx_record_type, {'left': 1})
+    with raises(TypeError):
+        fx_record_type(left=1, top=2)
+
+    class Trusted(object):
+        def __init__(self, **kwargs):
+            raise AssertionError('must not be called')
+
+        @classmethod
+        def __nirum_construct_trusted__(cls, **kwargs):
+            instance = cls.__new__(cls)
+            instance.fields = kwargs
+            return instance
+    assert construct_trusted(Trusted, {'a': 1}).fields == {'a': 1}
+
+
+def test_construct_trusted_scope(fx_record_type, fx_rectangle_type, fx_point):
+    class Untrusted(fx_record_type):
+        def __init__(self, left, top):
+            # Values built by user code while the trusted value is being
+            # constructed are still validated.
+            fx_rectangle_type(upper_left=1, lower_right=fx_point)
+            super(Untrusted, self).__init__(left=left, top=top)
+
+    with raises(TypeError):
+        construct_trusted(Untrusted, {'left': 1, 'top': 2})
+    with raises(TypeError):
+        fx_record_type(left=1, top=2)
+    # Trust is consumed by the value being constructed, and doesn't leak
+    # into values constructed later.
+    assert construct_trusted(fx_record_type, {'left': 1, 'top': 2}).top == 2
+    with raises(TypeError):
+        fx_record_type(left=1, top=2)
+
+
 def test_validate_union_type(fx_rectangle, fx_rectangle_type, fx_point):
     assert validate_union_type(fx_rectangle)
     with raises(TypeError):